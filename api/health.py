@@ -0,0 +1,23 @@
+from fastapi.responses import JSONResponse
+from fastapi import APIRouter
+
+from core.warmup import readiness
+
+
+
+
+router = APIRouter(prefix="/health", tags=["Health 🩺"])
+
+
+@router.get("/live")
+async def get_liveness():
+
+
+    return {"status": "alive"}
+
+
+@router.get("/ready")
+async def get_readiness():
+
+
+    return JSONResponse(readiness.status(), status_code=503 if readiness.draining else 200)
@@ -1,5 +1,6 @@
 
-from fastapi import APIRouter, Path, Query
+from fastapi import APIRouter, Path, Query, Request, HTTPException
+from fastapi.responses import StreamingResponse
 from fastapi.params import Depends
 
 from sqlalchemy.orm import Session
@@ -8,11 +9,14 @@ from typing import List, Annotated
 from uuid import UUID
 
 from schemas.accesses import RequestsAccesses, RequestAccessToUpdate, ResponsesAccesses, AccessStatus, \
-    ResponseDeleteAccesses
+    ResponseDeleteAccesses, RequestsBulkGrant, RequestsBulkRevoke, RequestsBulkExtend, ResponseBulkAccessItem, \
+    ResponseAccessChange, status_state
 from service.access_service import AccessesService
-from service.users_service import UserService
-from service.resources_service import ResourcesService
-from core.database import get_db
+from service.access_changes_service import poll_changes, change_events
+from core.database import get_db, session_for
+from core.pagination import MAX_PAGE_LIMIT, split_page, wants_ndjson, ndjson_response
+from core.serialization import json_page, dump_access_line
+from core.change_feed import CHANGE_FEED_MAX_WAIT
 
 
 
@@ -21,30 +25,72 @@ router = APIRouter(prefix="/accesses", tags=["Accesses 🗝️"])
 
 
 @router.get("", response_model=List[ResponsesAccesses])
-async def get_access(user_id: Annotated[UUID, Query(title="ID владельца доступа")] = None,
-                     resource_id: Annotated[UUID, Query(title="ID ресурса")] = None,
-                     status: Annotated[AccessStatus, Query(title="Текущее состояние доступа")] = None,
-                     expires_at: Annotated[str, Query(title="Дата/время истечения доступа")] = None,
-                     db: Session = Depends(get_db)):
-
+def get_access(request: Request,
+               user_id: Annotated[UUID, Query(title="ID владельца доступа")] = None,
+               resource_id: Annotated[UUID, Query(title="ID ресурса")] = None,
+               status: Annotated[AccessStatus, Query(title="Текущее состояние доступа")] = None,
+               expires_at: Annotated[str, Query(title="Дата/время истечения доступа")] = None,
+               cursor: Annotated[UUID, Query(title="Курсор: ID последнего доступа предыдущей страницы")] = None,
+               limit: Annotated[int, Query(title="Размер страницы", ge=1, le=MAX_PAGE_LIMIT)] = None,
+               history: Annotated[bool, Query(title="Искать в архиве истекших и отозванных доступов")] = False,
+               db: Session = Depends(get_db)):
+
+
+    if wants_ndjson(request):
+        return ndjson_response(
+            lambda database: AccessesService(database).stream(
+                user_id=user_id,
+                resource_id=resource_id,
+                status=status_state(status),
+                expires_at=expires_at,
+                cursor=cursor,
+                history=history
+            ),
+            render=dump_access_line,
+            sessions=session_for(request)
+        )
 
     service = AccessesService(db)
-    service.update_access_status()
-
-    return service.search(
+    rows = service.search_rows(
         user_id=user_id,
         resource_id=resource_id,
-        status=status,
-        expires_at=expires_at
+        status=status_state(status),
+        expires_at=expires_at,
+        cursor=cursor,
+        limit=limit,
+        history=history
     )
 
+    return json_page(*split_page(rows, limit))
+
+
+@router.get("/changes", response_model=List[ResponseAccessChange])
+async def get_access_changes(request: Request,
+                             since: Annotated[int, Query(title="Номер последнего полученного изменения", ge=0)] = 0,
+                             limit: Annotated[int, Query(title="Максимальное количество изменений", ge=1,
+                                                         le=MAX_PAGE_LIMIT)] = MAX_PAGE_LIMIT,
+                             wait: Annotated[float, Query(title="Время ожидания новых изменений, секунд", ge=0,
+                                                          le=CHANGE_FEED_MAX_WAIT)] = 0):
+
+
+    if "text/event-stream" in request.headers.get("accept", ""):
+        last_event_id = request.headers.get("last-event-id")
+        if last_event_id is not None:
+            if not last_event_id.isdigit():
+                raise HTTPException(status_code=400, detail="Некорректный заголовок Last-Event-ID")
+            since = int(last_event_id)
+        return StreamingResponse(change_events(since, limit, request.is_disconnected),
+                                 media_type="text/event-stream",
+                                 headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+    return await poll_changes(since, limit, wait)
+
 
 @router.get("/{access_id}", response_model=ResponsesAccesses)
-async def get_access_item(access_id: Annotated[UUID, Path(title="ID доступа")], db: Session = Depends(get_db)):
+def get_access_item(access_id: Annotated[UUID, Path(title="ID доступа")], db: Session = Depends(get_db)):
 
 
     service = AccessesService(db)
-    service.update_access_status()
 
     access = service.get_by_id(access_id)
 
@@ -52,24 +98,45 @@ async def get_access_item(access_id: Annotated[UUID, Path(title="ID доступ
 
 
 @router.post("", response_model=ResponsesAccesses)
-async def create_access(access_data: RequestsAccesses, db: Session = Depends(get_db)):
+def create_access(access_data: RequestsAccesses, db: Session = Depends(get_db)):
 
 
-    user_service = UserService(db)
-    resource_service = ResourcesService(db)
     access_service = AccessesService(db)
 
-    user = user_service.check_user_for_access(access_data.user_id)
-    resource = resource_service.check_resource_for_access(access_data.resource_id)
-    access_service.is_duplicate_access(user_id=access_data.user_id,resource_id=access_data.resource_id)
-
     return access_service.create_access(access_data)
 
 
+@router.post("/bulk/grant", response_model=List[ResponseBulkAccessItem])
+def bulk_grant_access(bulk_data: RequestsBulkGrant, db: Session = Depends(get_db)):
+
+
+    service = AccessesService(db)
+
+    return service.bulk_grant(bulk_data.items)
+
+
+@router.post("/bulk/revoke", response_model=List[ResponseBulkAccessItem])
+def bulk_revoke_access(bulk_data: RequestsBulkRevoke, db: Session = Depends(get_db)):
+
+
+    service = AccessesService(db)
+
+    return service.bulk_revoke(bulk_data.items)
+
+
+@router.post("/bulk/extend", response_model=List[ResponseBulkAccessItem])
+def bulk_extend_access(bulk_data: RequestsBulkExtend, db: Session = Depends(get_db)):
+
+
+    service = AccessesService(db)
+
+    return service.bulk_extend(bulk_data.items)
+
+
 @router.patch("/{access_id}", response_model=ResponsesAccesses)
-async def partial_update_access(access_id: Annotated[UUID, Path(title="ID доступа")],
-                                update_access_data: RequestAccessToUpdate,
-                                db: Session = Depends(get_db)):
+def partial_update_access(access_id: Annotated[UUID, Path(title="ID доступа")],
+                          update_access_data: RequestAccessToUpdate,
+                          db: Session = Depends(get_db)):
 
 
     service = AccessesService(db)
@@ -77,7 +144,7 @@ async def partial_update_access(access_id: Annotated[UUID, Path(title="ID дос
 
 
 @router.delete("/{access_id}", response_model=ResponseDeleteAccesses)
-async def delete_access(
+def delete_access(
         access_id: Annotated[UUID, Path(title="ID доступа")],
         db: Session = Depends(get_db)):
 
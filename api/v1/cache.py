@@ -0,0 +1,19 @@
+
+from fastapi import APIRouter
+
+from typing import List
+
+from schemas.cache import ResponseCacheStats
+from core.cache import users_cache, resources_cache, access_stats_cache
+
+
+
+
+router = APIRouter(prefix="/cache", tags=["Cache 📦"])
+
+
+@router.get("/stats", response_model=List[ResponseCacheStats])
+async def get_cache_stats():
+
+
+    return [users_cache.stats(), resources_cache.stats(), access_stats_cache.stats()]
@@ -0,0 +1,29 @@
+
+from fastapi import APIRouter, Query
+from starlette.concurrency import run_in_threadpool
+
+from typing import Annotated
+from uuid import UUID
+
+from schemas.accesses import ResponseAccessCheck
+from service.access_service import read_effective_grants
+from core.access_index import access_index
+
+
+
+
+router = APIRouter(prefix="/check", tags=["Check ✅"])
+
+
+@router.get("", response_model=ResponseAccessCheck)
+async def check_access(user_id: Annotated[UUID, Query(title="ID владельца доступа")],
+                       resource_id: Annotated[UUID, Query(title="ID ресурса")]):
+
+
+    if await access_index.refresh():
+        allowed, expires_at = access_index.check(user_id, resource_id)
+    else:
+        grants = await run_in_threadpool(read_effective_grants, user_id, resource_id)
+        allowed, expires_at = (True, grants[0][1]) if grants else (False, None)
+
+    return ResponseAccessCheck(user_id=user_id, resource_id=resource_id, allowed=allowed, expires_at=expires_at)
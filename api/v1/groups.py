@@ -0,0 +1,123 @@
+from fastapi import APIRouter, Path, Query, Response
+from fastapi.params import Depends
+
+from sqlalchemy.orm import Session
+
+from typing import List, Annotated
+from uuid import UUID
+
+from schemas.groups import RequestsGroups, ResponsesGroups, ResponseDeleteGroups, ResponsesGroupMember, \
+    RequestsGroupGrant, ResponsesGroupGrant
+from service.groups_service import GroupsService
+from core.database import get_db
+from core.pagination import MAX_PAGE_LIMIT, paginate
+
+
+
+
+router = APIRouter(prefix="/groups", tags=["Groups 👥"])
+
+
+@router.get("", response_model=List[ResponsesGroups])
+def get_groups(response: Response,
+               cursor: Annotated[UUID, Query(title="Курсор: ID последней группы предыдущей страницы")] = None,
+               limit: Annotated[int, Query(title="Размер страницы", ge=1, le=MAX_PAGE_LIMIT)] = None,
+               db: Session = Depends(get_db)):
+
+
+    service = GroupsService(db)
+
+    return paginate(service.get_all_groups(cursor=cursor, limit=limit), limit, response)
+
+
+@router.get("/{group_id}", response_model=ResponsesGroups)
+def get_group_item(group_id: Annotated[UUID, Path(title="ID группы")], db: Session = Depends(get_db)):
+
+
+    service = GroupsService(db)
+
+    return service.get_by_id(group_id)
+
+
+@router.post("", response_model=ResponsesGroups)
+def create_group(group_data: RequestsGroups, db: Session = Depends(get_db)):
+
+
+    service = GroupsService(db)
+
+    return service.create_group(group_data)
+
+
+@router.delete("/{group_id}", response_model=ResponseDeleteGroups)
+def delete_group(group_id: Annotated[UUID, Path(title="ID группы")], db: Session = Depends(get_db)):
+
+
+    service = GroupsService(db)
+
+    return service.delete_group(group_id)
+
+
+@router.get("/{group_id}/members", response_model=List[ResponsesGroupMember])
+def get_group_members(response: Response,
+                      group_id: Annotated[UUID, Path(title="ID группы")],
+                      cursor: Annotated[UUID, Query(title="Курсор: ID последнего участника предыдущей страницы")] = None,
+                      limit: Annotated[int, Query(title="Размер страницы", ge=1, le=MAX_PAGE_LIMIT)] = None,
+                      db: Session = Depends(get_db)):
+
+
+    service = GroupsService(db)
+
+    return paginate(service.get_members(group_id, cursor=cursor, limit=limit), limit, response, key="user_id")
+
+
+@router.put("/{group_id}/members/{user_id}", response_model=ResponsesGroupMember)
+def add_group_member(group_id: Annotated[UUID, Path(title="ID группы")],
+                     user_id: Annotated[UUID, Path(title="ID пользователя")],
+                     db: Session = Depends(get_db)):
+
+
+    service = GroupsService(db)
+
+    return service.add_member(group_id, user_id)
+
+
+@router.delete("/{group_id}/members/{user_id}", response_model=ResponsesGroupMember)
+def remove_group_member(group_id: Annotated[UUID, Path(title="ID группы")],
+                        user_id: Annotated[UUID, Path(title="ID пользователя")],
+                        db: Session = Depends(get_db)):
+
+
+    service = GroupsService(db)
+
+    return service.remove_member(group_id, user_id)
+
+
+@router.get("/{group_id}/grants", response_model=List[ResponsesGroupGrant])
+def get_group_grants(group_id: Annotated[UUID, Path(title="ID группы")], db: Session = Depends(get_db)):
+
+
+    service = GroupsService(db)
+
+    return service.get_grants(group_id)
+
+
+@router.put("/{group_id}/grants", response_model=ResponsesGroupGrant)
+def put_group_grant(group_id: Annotated[UUID, Path(title="ID группы")],
+                    grant_data: RequestsGroupGrant,
+                    db: Session = Depends(get_db)):
+
+
+    service = GroupsService(db)
+
+    return service.put_grant(group_id, grant_data)
+
+
+@router.delete("/{group_id}/grants/{resource_id}", response_model=ResponsesGroupGrant)
+def revoke_group_grant(group_id: Annotated[UUID, Path(title="ID группы")],
+                       resource_id: Annotated[UUID, Path(title="ID ресурса")],
+                       db: Session = Depends(get_db)):
+
+
+    service = GroupsService(db)
+
+    return service.revoke_grant(group_id, resource_id)
@@ -0,0 +1,62 @@
+from fastapi import APIRouter, Path, Query, Response
+from fastapi.params import Depends
+
+from sqlalchemy.orm import Session
+
+from typing import List, Annotated
+from uuid import UUID
+
+from schemas.jobs import RequestsJobs, ResponsesJobs
+from models.jobs import JobKind, JobState
+from service.jobs_service import JobsService
+from service.job_runner import job_runner
+from core.database import get_db
+from core.pagination import MAX_PAGE_LIMIT, paginate
+
+
+
+
+router = APIRouter(prefix="/jobs", tags=["Jobs ⏳"])
+
+
+@router.get("", response_model=List[ResponsesJobs])
+def get_jobs(response: Response,
+             status: Annotated[JobState, Query(title="Состояние задачи")] = None,
+             kind: Annotated[JobKind, Query(title="Тип задачи")] = None,
+             cursor: Annotated[UUID, Query(title="Курсор: ID последней задачи предыдущей страницы")] = None,
+             limit: Annotated[int, Query(title="Размер страницы", ge=1, le=MAX_PAGE_LIMIT)] = None,
+             db: Session = Depends(get_db)):
+
+
+    service = JobsService(db)
+
+    return paginate(service.get_all(status=status, kind=kind, cursor=cursor, limit=limit), limit, response)
+
+
+@router.get("/{job_id}", response_model=ResponsesJobs)
+def get_job_item(job_id: Annotated[UUID, Path(title="ID задачи")], db: Session = Depends(get_db)):
+
+
+    service = JobsService(db)
+
+    return service.get_by_id(job_id)
+
+
+@router.post("", response_model=ResponsesJobs, status_code=202)
+def submit_job(job_data: RequestsJobs, db: Session = Depends(get_db)):
+
+
+    service = JobsService(db)
+
+    job = service.submit(job_data)
+    job_runner.submit(job.id)
+    return job
+
+
+@router.post("/{job_id}/cancel", response_model=ResponsesJobs)
+def cancel_job(job_id: Annotated[UUID, Path(title="ID задачи")], db: Session = Depends(get_db)):
+
+
+    service = JobsService(db)
+
+    return service.cancel(job_id)
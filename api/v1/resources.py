@@ -1,5 +1,5 @@
 
-from fastapi import APIRouter, Path, Query
+from fastapi import APIRouter, Path, Query, Request, Response
 from fastapi.params import Depends
 
 from typing import List, Annotated
@@ -9,7 +9,12 @@ from sqlalchemy.orm import Session
 
 from service.resources_service import ResourcesService
 from schemas.resources import RequestsResources, RequestResourceToUpdate, ResponsesResources, ResponseDeleteResources
-from core.database import get_db
+from schemas.stats import ResponseResourceHolders
+from service.access_stats_service import AccessStatsService
+from core.database import get_db, session_for
+from core.pagination import MAX_PAGE_LIMIT, NEXT_CURSOR_HEADER, paginate, wants_ndjson, ndjson_response
+from core.search import SEARCH_LIMIT
+from core.http_cache import request_etag, not_modified, cache_headers
 
 
 
@@ -18,28 +23,73 @@ router = APIRouter(prefix="/resources", tags=["Resources 🛠️"])
 
 
 @router.get("", response_model=List[ResponsesResources])
-async def get_resources(name: Annotated[str, Query(title="Название ресурса")] = None,
-                        is_enabled: Annotated[bool, Query(title="Признак активности ресурса")] = None,
-                        db: Session = Depends(get_db)):
-
+def get_resources(request: Request, response: Response,
+                  name: Annotated[str, Query(title="Название ресурса")] = None,
+                  is_enabled: Annotated[bool, Query(title="Признак активности ресурса")] = None,
+                  prefix: Annotated[bool, Query(title="Поиск только по началу слов")] = False,
+                  cursor: Annotated[UUID, Query(title="Курсор: ID последнего ресурса предыдущей страницы")] = None,
+                  limit: Annotated[int, Query(title="Размер страницы", ge=1, le=MAX_PAGE_LIMIT)] = None,
+                  db: Session = Depends(get_db)):
+
+
+    etag = request_etag(request, "resources")
+    if not_modified(request, etag):
+        return cache_headers(Response(status_code=304), etag, vary="Accept")
+    cache_headers(response, etag, vary="Accept")
+
+    if wants_ndjson(request):
+        return cache_headers(ndjson_response(
+            lambda database: ResourcesService(database).stream_resources(name=name, is_enabled=is_enabled,
+                                                                         cursor=cursor),
+            ResponsesResources,
+            sessions=session_for(request)
+        ), etag, vary="Accept")
 
     service = ResourcesService(db)
 
-    return service.get_all_resource(name=name, is_enabled=is_enabled)
+    if name:
+        return service.search_resources(name=name, is_enabled=is_enabled, prefix=prefix, cursor=cursor,
+                                        limit=limit or SEARCH_LIMIT)
+
+    resources = service.get_all_resource(name=name, is_enabled=is_enabled, cursor=cursor, limit=limit)
+
+    return paginate(resources, limit, response)
 
 
 @router.get("/{resource_id}", response_model=ResponsesResources)
-async def get_resources_item(resource_id: Annotated[UUID, Path(..., title="ID ресурса")],
-                             db: Session = Depends(get_db)):
+def get_resources_item(request: Request, response: Response,
+                       resource_id: Annotated[UUID, Path(..., title="ID ресурса")],
+                       db: Session = Depends(get_db)):
 
 
+    etag = request_etag(request, "resources")
+    if not_modified(request, etag):
+        return cache_headers(Response(status_code=304), etag)
+    cache_headers(response, etag)
+
     service = ResourcesService(db)
 
     return service.get_by_id(resource_id)
 
 
+@router.get("/{resource_id}/holders", response_model=ResponseResourceHolders)
+def get_resource_holders(response: Response,
+                         resource_id: Annotated[UUID, Path(..., title="ID ресурса")],
+                         cursor: Annotated[UUID, Query(title="Курсор: ID последнего пользователя предыдущей страницы")] = None,
+                         limit: Annotated[int, Query(title="Размер страницы", ge=1, le=MAX_PAGE_LIMIT)] = None,
+                         db: Session = Depends(get_db)):
+
+
+    service = AccessStatsService(db)
+    holders, next_cursor = service.resource_holders(resource_id=resource_id, cursor=cursor, limit=limit)
+
+    if next_cursor is not None:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+    return holders
+
+
 @router.post("", response_model=ResponsesResources)
-async def create_resources(resources_data: RequestsResources, db: Session = Depends(get_db)):
+def create_resources(resources_data: RequestsResources, db: Session = Depends(get_db)):
 
 
     service = ResourcesService(db)
@@ -48,9 +98,9 @@ async def create_resources(resources_data: RequestsResources, db: Session = Depe
 
 
 @router.patch("/{resource_id}", response_model=ResponsesResources)
-async def partial_update_resource(resource_id: UUID,
-                                  update_resource_data: RequestResourceToUpdate,
-                                  db: Session = Depends(get_db)):
+def partial_update_resource(resource_id: UUID,
+                            update_resource_data: RequestResourceToUpdate,
+                            db: Session = Depends(get_db)):
 
 
     service = ResourcesService(db)
@@ -58,7 +108,7 @@ async def partial_update_resource(resource_id: UUID,
     return service.update_resource(update_data=update_resource_data, resource_id=resource_id)
 
 @router.delete("/{resource_id}", response_model=ResponseDeleteResources)
-async def delete_resource(
+def delete_resource(
         resource_id: Annotated[UUID, Path(title="ID ресурса")],
         db: Session = Depends(get_db)):
 
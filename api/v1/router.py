@@ -1,8 +1,14 @@
 from fastapi import APIRouter
-from api.v1 import users, resources, accesses
+from api.v1 import users, resources, accesses, check, cache, snapshots, groups, stats, jobs
 
 router = APIRouter(prefix="/v1")
 
 router.include_router(users.router)
 router.include_router(resources.router)
-router.include_router(accesses.router)
\ No newline at end of file
+router.include_router(accesses.router)
+router.include_router(check.router)
+router.include_router(cache.router)
+router.include_router(snapshots.router)
+router.include_router(groups.router)
+router.include_router(stats.router)
+router.include_router(jobs.router)
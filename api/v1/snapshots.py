@@ -0,0 +1,49 @@
+from fastapi import APIRouter, HTTPException, Path, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+
+from sqlalchemy.exc import IntegrityError
+
+from typing import Annotated
+from tempfile import SpooledTemporaryFile
+
+import pyarrow as pa
+
+from schemas.snapshots import SnapshotTable, ResponseSnapshotImport
+from core.snapshot import ARROW_MEDIA_TYPE, export_stream, import_stream
+
+
+
+
+router = APIRouter(prefix="/snapshots", tags=["Snapshots 💾"])
+
+
+@router.get("/{table}", response_class=StreamingResponse)
+def export_table(table: Annotated[SnapshotTable, Path(title="Таблица")]):
+
+
+    return StreamingResponse(
+        export_stream(table.value),
+        media_type=ARROW_MEDIA_TYPE,
+        headers={"Content-Disposition": f'attachment; filename="{table.value}.arrow"'}
+    )
+
+
+@router.post("/{table}", response_model=ResponseSnapshotImport)
+async def import_table(request: Request, table: Annotated[SnapshotTable, Path(title="Таблица")]):
+
+
+    with SpooledTemporaryFile(max_size=64 * 1024 * 1024) as body:
+        async for chunk in request.stream():
+            body.write(chunk)
+        body.seek(0)
+
+        try:
+            rows = await run_in_threadpool(import_stream, table.value, body)
+        except IntegrityError:
+            raise HTTPException(status_code=409,
+                                detail="Снимок конфликтует с существующими данными или нарушает связи между таблицами")
+        except (pa.ArrowInvalid, ValueError):
+            raise HTTPException(status_code=400, detail="Некорректный снимок: ожидается Arrow IPC поток таблицы")
+
+    return {"table": table, "rows": rows}
@@ -0,0 +1,55 @@
+from fastapi import APIRouter, Query
+from fastapi.params import Depends
+from pydantic import Field
+
+from typing import List, Annotated
+from uuid import UUID
+
+from sqlalchemy.orm import Session
+
+from schemas.accesses import AccessStatus, status_state
+from schemas.stats import ResponseStatusCount, ResponseResourceCount, ResponseExpiryBucket
+from service.access_stats_service import AccessStatsService, EXPIRY_BUCKET_DAYS
+from core.database import get_db
+from core.pagination import MAX_PAGE_LIMIT
+
+
+
+
+router = APIRouter(prefix="/stats", tags=["Statistics 📊"])
+
+ExpiryDay = Annotated[int, Field(ge=1)]
+
+
+@router.get("/accesses/status", response_model=List[ResponseStatusCount])
+def get_status_counts(resource_id: Annotated[UUID, Query(title="ID ресурса")] = None,
+                      history: Annotated[bool, Query(title="Учитывать архив истекших и отозванных доступов")] = False,
+                      db: Session = Depends(get_db)):
+
+
+    service = AccessStatsService(db)
+
+    return service.status_counts(resource_id=resource_id, history=history)
+
+
+@router.get("/accesses/resources", response_model=List[ResponseResourceCount])
+def get_resource_counts(status: Annotated[AccessStatus, Query(title="Текущее состояние доступа")] = AccessStatus.ACTIVE,
+                        limit: Annotated[int, Query(title="Количество ресурсов", ge=1, le=MAX_PAGE_LIMIT)] = 100,
+                        db: Session = Depends(get_db)):
+
+
+    service = AccessStatsService(db)
+
+    return service.resource_counts(status=status_state(status), limit=limit)
+
+
+@router.get("/accesses/expiring", response_model=List[ResponseExpiryBucket])
+def get_expiry_buckets(resource_id: Annotated[UUID, Query(title="ID ресурса")] = None,
+                       days: Annotated[List[ExpiryDay], Query(title="Границы интервалов, дней", min_length=1,
+                                                              max_length=20)] = list(EXPIRY_BUCKET_DAYS),
+                       db: Session = Depends(get_db)):
+
+
+    service = AccessStatsService(db)
+
+    return service.expiry_buckets(resource_id=resource_id, days=days)
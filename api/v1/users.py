@@ -1,5 +1,5 @@
 
-from fastapi import APIRouter, Path, Query
+from fastapi import APIRouter, Path, Query, Request, Response
 from fastapi.params import Depends
 
 from typing import List, Annotated
@@ -8,7 +8,11 @@ from uuid import UUID
 from sqlalchemy.orm import Session
 
 from schemas.users import RequestsUsers, RequestUserToUpdate, ResponsesUsers, ResponseDeleteUsers
-from core.database import get_db
+from schemas.accesses import ResponseEffectiveAccess
+from core.database import get_db, session_for
+from core.pagination import MAX_PAGE_LIMIT, paginate, wants_ndjson, ndjson_response
+from core.search import SEARCH_LIMIT
+from core.http_cache import request_etag, not_modified, cache_headers
 from service.users_service import UserService
 
 
@@ -18,29 +22,71 @@ router = APIRouter(prefix="/users", tags=["Users 🧑🏻‍💻"])
 
 
 @router.get("",response_model=List[ResponsesUsers])
-async def get_users(search: Annotated[str, Query(title="Поиск по имени или почте пользователя")] = None,
-                    is_active: Annotated[bool, Query(title="Признак активности пользователя")] = None,
-                    db: Session = Depends(get_db)):
-
+def get_users(request: Request, response: Response,
+              search: Annotated[str, Query(title="Поиск по имени или почте пользователя")] = None,
+              is_active: Annotated[bool, Query(title="Признак активности пользователя")] = None,
+              prefix: Annotated[bool, Query(title="Поиск только по началу слов")] = False,
+              cursor: Annotated[UUID, Query(title="Курсор: ID последнего пользователя предыдущей страницы")] = None,
+              limit: Annotated[int, Query(title="Размер страницы", ge=1, le=MAX_PAGE_LIMIT)] = None,
+              db: Session = Depends(get_db)):
+
+
+    etag = request_etag(request, "users")
+    if not_modified(request, etag):
+        return cache_headers(Response(status_code=304), etag, vary="Accept")
+    cache_headers(response, etag, vary="Accept")
+
+    if wants_ndjson(request):
+        return cache_headers(ndjson_response(
+            lambda database: UserService(database).stream_users(search=search, is_active=is_active, cursor=cursor),
+            ResponsesUsers,
+            sessions=session_for(request)
+        ), etag, vary="Accept")
 
     service = UserService(db)
-    users = service.get_all_users(search=search, is_active=is_active)
 
-    return users
+    if search:
+        return service.search_users(search=search, is_active=is_active, prefix=prefix, cursor=cursor,
+                                    limit=limit or SEARCH_LIMIT)
+
+    users = service.get_all_users(search=search, is_active=is_active, cursor=cursor, limit=limit)
+
+    return paginate(users, limit, response)
 
 
 @router.get("/{user_id}", response_model=ResponsesUsers)
-async def get_user(user_id: Annotated[UUID, Path(..., title="ID пользователя")],
-                   db: Session = Depends(get_db)):
+def get_user(request: Request, response: Response,
+             user_id: Annotated[UUID, Path(..., title="ID пользователя")],
+             db: Session = Depends(get_db)):
 
 
+    etag = request_etag(request, "users")
+    if not_modified(request, etag):
+        return cache_headers(Response(status_code=304), etag)
+    cache_headers(response, etag)
+
     service = UserService(db)
 
     return service.get_user(user_id)
 
 
+@router.get("/{user_id}/effective-access", response_model=List[ResponseEffectiveAccess])
+def get_user_effective_access(request: Request, response: Response,
+                              user_id: Annotated[UUID, Path(..., title="ID пользователя")],
+                              db: Session = Depends(get_db)):
+
+
+    service = UserService(db)
+    grants, etag = service.get_effective_access(user_id)
+
+    if not_modified(request, etag):
+        return cache_headers(Response(status_code=304), etag)
+    cache_headers(response, etag)
+    return grants
+
+
 @router.post("", response_model=ResponsesUsers)
-async def create_users(user_data: RequestsUsers, db: Session = Depends(get_db)):
+def create_users(user_data: RequestsUsers, db: Session = Depends(get_db)):
 
 
     service = UserService(db)
@@ -50,7 +96,7 @@ async def create_users(user_data: RequestsUsers, db: Session = Depends(get_db)):
 
 
 @router.patch('/{user_id}', response_model=ResponsesUsers)
-async def partial_update_user(
+def partial_update_user(
         user_id: Annotated[UUID, Path(title="ID пользователя")],
         update_user_data: RequestUserToUpdate,
         db: Session = Depends(get_db)):
@@ -62,7 +108,7 @@ async def partial_update_user(
 
 
 @router.delete("/{user_id}", response_model=ResponseDeleteUsers)
-async def delete_user(
+def delete_user(
         user_id: Annotated[UUID, Path(title="ID пользователя")],
         db: Session = Depends(get_db)):
 
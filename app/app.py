@@ -1,18 +1,53 @@
 
 from fastapi import FastAPI
-from core.database import Base, engine
+from contextlib import asynccontextmanager
+from core.migrations import migrate
 from api.v1.router import router
+from api import metrics, health
+from core.instrumentation import InstrumentationMiddleware
+from core.admission import ADMISSION_ENABLED, AdmissionMiddleware
+from core.warmup import MIGRATE_ON_STARTUP, readiness, warm_up_before_serving, drain_on_sigterm
+from core.replicas import REPLICA_URLS, ReadAfterWriteMiddleware
+from service.expiry_scheduler import expiry_scheduler
+from service.archive_scheduler import archive_scheduler
+from service.job_runner import job_runner
+import asyncio
 import os
 import uvicorn
 
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    loop = asyncio.get_running_loop()
+    if MIGRATE_ON_STARTUP:
+        await loop.run_in_executor(None, migrate)
+    await warm_up_before_serving()
+    drain_on_sigterm(loop)
+    expiry_scheduler.start()
+    archive_scheduler.start()
+    job_runner.start()
+    yield
+    readiness.mark_draining()
+    await expiry_scheduler.stop()
+    await archive_scheduler.stop()
+    await job_runner.stop()
+
+
 app = FastAPI(title="Access Control Manager",
               description="API для управления пользователями, ресурсами и доступами к ним. \
               Поддерживает создание, частичное редактирование, поиск и фильтрацию. \
-              Предназначен для внутренних сотрудников, без удаления данных.",)
-Base.metadata.create_all(bind=engine)
+              Предназначен для внутренних сотрудников, без удаления данных.",
+              lifespan=lifespan)
+
+if ADMISSION_ENABLED:
+    app.add_middleware(AdmissionMiddleware)
+app.add_middleware(InstrumentationMiddleware)
+if REPLICA_URLS:
+    app.add_middleware(ReadAfterWriteMiddleware)
 
 app.include_router(router)
+app.include_router(metrics.router)
+app.include_router(health.router)
 
 if __name__ == "__main__":
     port = int(os.getenv("APIPORT"))
@@ -0,0 +1,58 @@
+import argparse
+import logging
+import os
+
+import uvicorn
+
+from core.database import engine
+from core.migrations import migrate
+
+
+
+
+logger = logging.getLogger(__name__)
+
+
+def default_workers():
+    return int(os.getenv("WEB_CONCURRENCY") or os.cpu_count() or 1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the API with several worker processes")
+    parser.add_argument("--workers", type=int, default=default_workers())
+    parser.add_argument("--host", default=os.getenv("APIHOST", "0.0.0.0"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("APIPORT", "8000")))
+    parser.add_argument("--skip-migrate", action="store_true", help="schema is managed by a separate migrate step")
+    parser.add_argument("--graceful-timeout", type=int, default=int(os.getenv("GRACEFUL_TIMEOUT", "30")))
+    parser.add_argument("--drain-delay", type=float, default=float(os.getenv("DRAIN_DELAY", "5")),
+                        help="seconds /health/ready reports draining after SIGTERM before workers stop listening")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+
+    if not args.skip_migrate:
+        migrate()
+    engine.dispose()
+    os.environ["MIGRATE_ON_STARTUP"] = "false"
+    os.environ["DRAIN_DELAY"] = str(args.drain_delay)
+
+    if args.workers > 1 and os.getenv("CACHE_BACKEND", "local") != "postgres":
+        os.environ["ACCESS_INDEX_ENABLED"] = "false"
+        logger.warning("CACHE_BACKEND is not 'postgres': cache invalidations will not reach the other %s workers, "
+                       "the in-memory access index is disabled and access checks read the database",
+                       args.workers - 1)
+    logger.info("Starting %s workers; each holds up to %s database connections", args.workers,
+                int(os.getenv("DB_POOL_SIZE", "10")) + int(os.getenv("DB_MAX_OVERFLOW", "20")))
+
+    uvicorn.run(
+        "app.app:app",
+        host=args.host,
+        port=args.port,
+        workers=args.workers,
+        timeout_graceful_shutdown=args.graceful_timeout,
+        proxy_headers=True,
+    )
+
+
+if __name__ == "__main__":
+    main()
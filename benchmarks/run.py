@@ -0,0 +1,429 @@
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import func, select, not_
+from sqlalchemy.orm import Session
+import argparse
+import asyncio
+import json
+import platform
+import random
+import statistics
+import sys
+import time
+import uuid
+
+import httpx
+
+from app.app import app
+from core.access_index import access_index
+from core.cache import cache_backend
+from core.database import engine, get_db, session_local
+from core.search import users_search, resources_search
+from models.accesses import AccessModel, AccessState
+from models.resources import ResourcesModel
+from models.users import UserModel
+from core.serialization import dump_accesses
+from repository.accesses_repository import AccessesRepository
+from schemas.accesses import AccessStatus, ResponsesAccesses, RequestsAccesses, RequestAccessToUpdate, BulkAccessKey, \
+    BulkAccessExtend
+from schemas.resources import RequestsResources, RequestResourceToUpdate
+from schemas.users import RequestsUsers, RequestUserToUpdate
+from service.access_service import AccessesService
+from service.resources_service import ResourcesService
+from service.users_service import UserService
+
+
+
+
+SAMPLE_SIZE = 10000
+BULK_SIZE = 50
+
+
+@contextmanager
+def rolled_back():
+    connection = engine.connect()
+    transaction = connection.begin()
+    if engine.dialect.name == "sqlite":
+        connection.exec_driver_sql("BEGIN IMMEDIATE")
+    db = Session(bind=connection, autoflush=False, join_transaction_mode="create_savepoint")
+    try:
+        yield db
+    finally:
+        db.close()
+        transaction.rollback()
+        connection.close()
+
+
+def get_rolled_back_db():
+    with rolled_back() as db:
+        yield db
+
+
+def forget_writes():
+    cache_backend.publish(None, None)
+    access_index.invalidate()
+    users_search.invalidate()
+    resources_search.invalidate()
+
+
+def free_pairs(db, users, resources):
+    users = users[:1000]
+    if not users or not resources:
+        return []
+
+    held = set(db.execute(
+        select(AccessModel.user_id, AccessModel.resource_id)
+        .where(AccessModel.status == AccessState.ACTIVE, AccessModel.user_id.in_(users))
+    ).all())
+    pairs = {(random.choice(users), random.choice(resources)) for _ in range(SAMPLE_SIZE)}
+    return list(pairs - held)
+
+
+def load_samples(db):
+    def sample(column):
+        return list(db.scalars(select(column).limit(SAMPLE_SIZE)))
+
+    pairs = db.execute(
+        select(AccessModel.user_id, AccessModel.resource_id).where(AccessModel.status == AccessState.ACTIVE)
+        .limit(SAMPLE_SIZE)
+    ).all()
+    effective = AccessesRepository.effective_status_filter(AccessState.ACTIVE, datetime.now(timezone.utc))
+    grants = db.execute(
+        select(AccessModel.id, AccessModel.user_id, AccessModel.resource_id).where(effective).limit(SAMPLE_SIZE)
+    ).all()
+    inactive = list(db.scalars(select(AccessModel.id).where(not_(effective)).limit(SAMPLE_SIZE)))
+    active_users = list(db.scalars(select(UserModel.id).where(UserModel.is_active.is_(True)).limit(SAMPLE_SIZE)))
+    enabled_resources = list(db.scalars(
+        select(ResourcesModel.id).where(ResourcesModel.is_enabled.is_(True)).limit(SAMPLE_SIZE)
+    ))
+
+    return {
+        "users": sample(UserModel.id),
+        "resources": sample(ResourcesModel.id),
+        "accesses": sample(AccessModel.id),
+        "names": [name.split()[0] for name in sample(UserModel.full_name) if name],
+        "pairs": pairs,
+        "grants": grants,
+        "inactive_accesses": inactive,
+        "active_users": active_users,
+        "enabled_resources": enabled_resources,
+        "free_pairs": free_pairs(db, active_users, enabled_resources),
+        "counts": {
+            "users": db.scalar(select(func.count()).select_from(UserModel)),
+            "resources": db.scalar(select(func.count()).select_from(ResourcesModel)),
+            "accesses": db.scalar(select(func.count()).select_from(AccessModel)),
+        },
+    }
+
+
+def route_scenarios(samples):
+    pick = random.choice
+
+    return {
+        "GET /v1/users/{id}": lambda: f"/v1/users/{pick(samples['users'])}",
+        "GET /v1/users?limit=100": lambda: "/v1/users?limit=100",
+        "GET /v1/users?search": lambda: f"/v1/users?search={pick(samples['names'])}&limit=20",
+        "GET /v1/users/{id}/effective-access": lambda: f"/v1/users/{pick(samples['users'])}/effective-access",
+        "GET /v1/resources/{id}": lambda: f"/v1/resources/{pick(samples['resources'])}",
+        "GET /v1/resources?limit=100": lambda: "/v1/resources?limit=100",
+        "GET /v1/accesses/{id}": lambda: f"/v1/accesses/{pick(samples['accesses'])}",
+        "GET /v1/accesses?user_id": lambda: f"/v1/accesses?user_id={pick(samples['users'])}",
+        "GET /v1/accesses?resource_id&status&limit=100":
+            lambda: f"/v1/accesses?resource_id={pick(samples['resources'])}&status={AccessStatus.ACTIVE.value}"
+                    f"&limit=100",
+        "GET /v1/accesses?limit=1000": lambda: "/v1/accesses?limit=1000",
+        "GET /v1/check": lambda: "/v1/check?user_id={}&resource_id={}".format(*pick(samples["pairs"])),
+        "GET /v1/stats/accesses/status": lambda: "/v1/stats/accesses/status",
+        "GET /v1/stats/accesses/expiring": lambda: "/v1/stats/accesses/expiring",
+        "GET /v1/resources/{id}/holders?limit=100": lambda: f"/v1/resources/{pick(samples['resources'])}/holders?limit=100",
+    }
+
+
+def future():
+    return datetime.now(timezone.utc) + timedelta(days=random.randint(1, 365))
+
+
+def grant_payload(samples):
+    user_id, resource_id = random.choice(samples["free_pairs"])
+    return {"user_id": str(user_id), "resource_id": str(resource_id), "expires_at": future().isoformat()}
+
+
+def key_payload(samples):
+    _, user_id, resource_id = random.choice(samples["grants"])
+    return {"user_id": str(user_id), "resource_id": str(resource_id)}
+
+
+def user_payload():
+    token = uuid.uuid4().hex
+    return {"email": f"bench.{token}@example.com", "full_name": f"Benchmark User {token}"}
+
+
+def resource_payload():
+    return {"name": f"bench-{uuid.uuid4().hex}", "description": "benchmark"}
+
+
+def write_route_scenarios(samples):
+    pick = random.choice
+
+    return {
+        "POST /v1/users": lambda: ("POST", "/v1/users", user_payload()),
+        "PATCH /v1/users/{id} (deactivate)":
+            lambda: ("PATCH", f"/v1/users/{pick(samples['active_users'])}", {"is_active": False}),
+        "DELETE /v1/users/{id}": lambda: ("DELETE", f"/v1/users/{pick(samples['users'])}", None),
+        "POST /v1/resources": lambda: ("POST", "/v1/resources", resource_payload()),
+        "PATCH /v1/resources/{id}":
+            lambda: ("PATCH", f"/v1/resources/{pick(samples['resources'])}", {"description": "benchmark"}),
+        "DELETE /v1/resources/{id}": lambda: ("DELETE", f"/v1/resources/{pick(samples['resources'])}", None),
+        "POST /v1/accesses": lambda: ("POST", "/v1/accesses", grant_payload(samples)),
+        "PATCH /v1/accesses/{id}":
+            lambda: ("PATCH", f"/v1/accesses/{pick(samples['grants'])[0]}", {"expires_at": future().isoformat()}),
+        "DELETE /v1/accesses/{id}": lambda: ("DELETE", f"/v1/accesses/{pick(samples['inactive_accesses'])}", None),
+        f"POST /v1/accesses/bulk/grant x{BULK_SIZE}": lambda: (
+            "POST", "/v1/accesses/bulk/grant", {"items": [grant_payload(samples) for _ in range(BULK_SIZE)]}
+        ),
+        f"POST /v1/accesses/bulk/revoke x{BULK_SIZE}": lambda: (
+            "POST", "/v1/accesses/bulk/revoke", {"items": [key_payload(samples) for _ in range(BULK_SIZE)]}
+        ),
+        f"POST /v1/accesses/bulk/extend x{BULK_SIZE}": lambda: (
+            "POST", "/v1/accesses/bulk/extend",
+            {"items": [{**key_payload(samples), "expires_at": future().isoformat()} for _ in range(BULK_SIZE)]}
+        ),
+    }
+
+
+def service_scenarios(samples):
+    pick = random.choice
+
+    return {
+        "UserService.get_user": lambda db: UserService(db).get_user(pick(samples["users"])),
+        "UserService.search_users": lambda db: UserService(db).search_users(
+            search=pick(samples["names"]), is_active=None, limit=20
+        ),
+        "ResourcesService.get_by_id": lambda db: ResourcesService(db).get_by_id(pick(samples["resources"])),
+        "AccessesService.get_by_id": lambda db: AccessesService(db).get_by_id(pick(samples["accesses"])),
+        "AccessesService.search(user_id)": lambda db: AccessesService(db).search(user_id=pick(samples["users"])),
+        "AccessesService.search(limit=1000)": lambda db: AccessesService(db).search(limit=1000),
+        "ResponsesAccesses serialization x1000": lambda db: [
+            ResponsesAccesses.model_validate(access).model_dump_json()
+            for access in AccessesService(db).search(limit=1000)
+        ],
+        "dump_accesses serialization x1000": lambda db: dump_accesses(AccessesService(db).search_rows(limit=1000)),
+    }
+
+
+def write_service_scenarios(samples):
+    pick = random.choice
+
+    return {
+        "UserService.create_user": lambda db: UserService(db).create_user(RequestsUsers(**user_payload())),
+        "UserService.update_user (deactivate)": lambda db: UserService(db).update_user(
+            user_id=pick(samples["active_users"]), update_data=RequestUserToUpdate(is_active=False)
+        ),
+        "ResourcesService.create_resource": lambda db: ResourcesService(db).create_resource(
+            RequestsResources(**resource_payload())
+        ),
+        "ResourcesService.update_resource": lambda db: ResourcesService(db).update_resource(
+            resource_id=pick(samples["resources"]), update_data=RequestResourceToUpdate(description="benchmark")
+        ),
+        "AccessesService.create_access": lambda db: AccessesService(db).create_access(
+            RequestsAccesses(**grant_payload(samples))
+        ),
+        "AccessesService.update_access": lambda db: AccessesService(db).update_access(
+            access_id=pick(samples["grants"])[0], update_data=RequestAccessToUpdate(expires_at=future())
+        ),
+        "AccessesService.delete_access":
+            lambda db: AccessesService(db).delete_access(pick(samples["inactive_accesses"])),
+        f"AccessesService.bulk_grant x{BULK_SIZE}": lambda db: AccessesService(db).bulk_grant(
+            [RequestsAccesses(**grant_payload(samples)) for _ in range(BULK_SIZE)]
+        ),
+        f"AccessesService.bulk_revoke x{BULK_SIZE}": lambda db: AccessesService(db).bulk_revoke(
+            [BulkAccessKey(**key_payload(samples)) for _ in range(BULK_SIZE)]
+        ),
+        f"AccessesService.bulk_extend x{BULK_SIZE}": lambda db: AccessesService(db).bulk_extend(
+            [BulkAccessExtend(**key_payload(samples), expires_at=future()) for _ in range(BULK_SIZE)]
+        ),
+    }
+
+
+def summarize(latencies, errors, elapsed):
+    latencies = sorted(latencies)
+    count = len(latencies)
+    quantiles = statistics.quantiles(latencies, n=100, method="inclusive") if count > 1 else latencies * 99
+
+    return {
+        "count": count,
+        "errors": errors,
+        "throughput_rps": round(count / elapsed, 2) if elapsed else 0.0,
+        "mean_ms": round(statistics.fmean(latencies) * 1000, 3) if count else 0.0,
+        "p50_ms": round(quantiles[49] * 1000, 3) if count else 0.0,
+        "p90_ms": round(quantiles[89] * 1000, 3) if count else 0.0,
+        "p99_ms": round(quantiles[98] * 1000, 3) if count else 0.0,
+        "max_ms": round(latencies[-1] * 1000, 3) if count else 0.0,
+    }
+
+
+async def bench_route(client, make_path, requests, concurrency):
+    latencies = []
+    errors = 0
+    remaining = iter(range(requests))
+
+    async def worker():
+        nonlocal errors
+        for _ in remaining:
+            request = make_path()
+            method, path, payload = ("GET", request, None) if isinstance(request, str) else request
+            started = time.perf_counter()
+            response = await client.request(method, path, json=payload)
+            latencies.append(time.perf_counter() - started)
+            if response.status_code >= 400:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return summarize(latencies, errors, time.perf_counter() - started)
+
+
+async def bench_routes(scenarios, requests, concurrency, warmup):
+    transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+    results = {}
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for name, make_path in scenarios.items():
+            await bench_route(client, make_path, warmup, concurrency)
+            results[name] = await bench_route(client, make_path, requests, concurrency)
+            print(format_line(name, results[name]))
+
+    return results
+
+
+async def bench_write_routes(scenarios, requests, concurrency, warmup):
+    app.dependency_overrides[get_db] = get_rolled_back_db
+    try:
+        return await bench_routes(scenarios, requests, concurrency, warmup)
+    finally:
+        app.dependency_overrides.pop(get_db, None)
+        forget_writes()
+
+
+def bench_services(scenarios, iterations, warmup, sessions=session_local):
+    results = {}
+
+    for name, call in scenarios.items():
+        latencies = []
+        errors = 0
+        started = time.perf_counter()
+
+        for i in range(warmup + iterations):
+            with sessions() as db:
+                try:
+                    call_started = time.perf_counter()
+                    call(db)
+                    elapsed = time.perf_counter() - call_started
+                except Exception:
+                    errors += 1
+                    elapsed = None
+
+            if i == warmup - 1:
+                started = time.perf_counter()
+            if i >= warmup and elapsed is not None:
+                latencies.append(elapsed)
+
+        results[name] = summarize(latencies, errors, time.perf_counter() - started)
+        print(format_line(name, results[name]))
+
+    return results
+
+
+def bench_write_services(scenarios, iterations, warmup):
+    try:
+        return bench_services(scenarios, iterations, warmup, sessions=rolled_back)
+    finally:
+        forget_writes()
+
+
+def format_line(name, result):
+    return (f"{name:<55} {result['throughput_rps']:>10.1f} rps  p50 {result['p50_ms']:>8.3f} ms  "
+            f"p99 {result['p99_ms']:>8.3f} ms  errors {result['errors']}")
+
+
+def compare(current, baseline, threshold):
+    regressions = []
+
+    for section in ("routes", "services"):
+        for name, result in current.get(section, {}).items():
+            previous = baseline.get(section, {}).get(name)
+            if not previous:
+                continue
+            for metric in ("p50_ms", "p99_ms"):
+                if previous[metric] and result[metric] > previous[metric] * (1 + threshold):
+                    regressions.append(f"{section} {name}: {metric} {previous[metric]} -> {result[metric]}")
+            if previous["throughput_rps"] and result["throughput_rps"] < previous["throughput_rps"] * (1 - threshold):
+                regressions.append(f"{section} {name}: throughput_rps {previous['throughput_rps']} -> "
+                                   f"{result['throughput_rps']}")
+
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark routes and services against DATABASE_URL")
+    parser.add_argument("--requests", type=int, default=1000, help="requests per route")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--iterations", type=int, default=200, help="calls per service method")
+    parser.add_argument("--warmup", type=int, default=50)
+    parser.add_argument("--only", default=None, help="run only scenarios whose name contains this text")
+    parser.add_argument("--no-writes", dest="writes", action="store_false",
+                        help="skip write scenarios; each write is rolled back after the call")
+    parser.add_argument("--output", default="benchmark-results.json")
+    parser.add_argument("--baseline", default=None, help="previous results to compare against")
+    parser.add_argument("--threshold", type=float, default=0.2, help="allowed relative slowdown")
+    args = parser.parse_args()
+
+    db = session_local()
+    try:
+        samples = load_samples(db)
+    finally:
+        db.close()
+
+    routes = route_scenarios(samples)
+    services = service_scenarios(samples)
+    write_routes = write_route_scenarios(samples) if args.writes else {}
+    write_services = write_service_scenarios(samples) if args.writes else {}
+    if args.only:
+        routes = {name: scenario for name, scenario in routes.items() if args.only in name}
+        services = {name: scenario for name, scenario in services.items() if args.only in name}
+        write_routes = {name: scenario for name, scenario in write_routes.items() if args.only in name}
+        write_services = {name: scenario for name, scenario in write_services.items() if args.only in name}
+
+    results = {
+        "meta": {
+            "started_at": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "dataset": samples["counts"],
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "iterations": args.iterations,
+        },
+        "routes": {
+            **asyncio.run(bench_routes(routes, args.requests, args.concurrency, args.warmup)),
+            **asyncio.run(bench_write_routes(write_routes, args.requests, args.concurrency, args.warmup)),
+        },
+        "services": {
+            **bench_services(services, args.iterations, args.warmup),
+            **bench_write_services(write_services, args.iterations, args.warmup),
+        },
+    }
+
+    with open(args.output, "w", encoding="utf-8") as file:
+        json.dump(results, file, indent=2, ensure_ascii=False)
+    print(f"Results written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as file:
+            regressions = compare(results, json.load(file), args.threshold)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
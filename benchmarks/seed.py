@@ -0,0 +1,115 @@
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import insert
+from faker import Faker
+import argparse
+import random
+import time
+import uuid
+
+from core.database import engine
+from core.migrations import migrate
+from models.accesses import AccessModel, AccessState
+from models.resources import ResourcesModel
+from models.users import UserModel
+
+
+
+
+def chunks(rows, size):
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def user_rows(fake, count):
+    for i in range(count):
+        yield {
+            "id": uuid.uuid4(),
+            "email": f"{i}.{fake.user_name()}@{fake.free_email_domain()}",
+            "full_name": f"{fake.name()} {i}",
+            "is_active": random.random() > 0.05,
+        }
+
+
+def resource_rows(fake, count):
+    for i in range(count):
+        yield {
+            "id": uuid.uuid4(),
+            "name": f"{fake.domain_word()}-{i}",
+            "description": fake.sentence(),
+            "is_enabled": random.random() > 0.02,
+        }
+
+
+def access_rows(fake, count, user_ids, resource_ids):
+    now = datetime.now(timezone.utc)
+    offsets = [random.randrange(len(resource_ids)) for _ in user_ids]
+
+    for i in range(count):
+        user = i % len(user_ids)
+        resource = (i // len(user_ids) + offsets[user]) % len(resource_ids)
+        roll = random.random()
+
+        if roll < 0.8:
+            status, expires_at = AccessState.ACTIVE, now + timedelta(days=random.randint(1, 365))
+        elif roll < 0.95:
+            status, expires_at = AccessState.EXPIRED, now - timedelta(days=random.randint(1, 365))
+        else:
+            status, expires_at = AccessState.REVOKED, now - timedelta(days=random.randint(1, 365))
+
+        yield {
+            "id": uuid.uuid4(),
+            "user_id": user_ids[user],
+            "resource_id": resource_ids[resource],
+            "granted_at": expires_at - timedelta(days=random.randint(1, 365)),
+            "expires_at": expires_at,
+            "status": status,
+            "comment": fake.sentence() if roll < 0.1 else "",
+        }
+
+
+def insert_all(model, rows, chunk_size, label):
+    started = time.perf_counter()
+    total = 0
+    ids = []
+
+    for chunk in chunks(rows, chunk_size):
+        with engine.begin() as connection:
+            connection.execute(insert(model), chunk)
+        ids.extend(row["id"] for row in chunk)
+        total += len(chunk)
+        print(f"\r{label}: {total}", end="", flush=True)
+
+    print(f"\r{label}: {total} in {time.perf_counter() - started:.1f}s")
+    return ids
+
+
+def seed(users, resources, accesses, chunk_size=10000, seed_value=None):
+    if accesses > users * resources:
+        raise ValueError("accesses must not exceed users * resources")
+
+    random.seed(seed_value)
+    fake = Faker()
+    fake.seed_instance(seed_value)
+    migrate()
+
+    user_ids = insert_all(UserModel, user_rows(fake, users), chunk_size, "Users")
+    resource_ids = insert_all(ResourcesModel, resource_rows(fake, resources), chunk_size, "Resources")
+    insert_all(AccessModel, access_rows(fake, accesses, user_ids, resource_ids), chunk_size, "Accesses")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Seed the database configured by DATABASE_URL with fake data")
+    parser.add_argument("--users", type=int, default=10000)
+    parser.add_argument("--resources", type=int, default=1000)
+    parser.add_argument("--accesses", type=int, default=100000)
+    parser.add_argument("--chunk-size", type=int, default=10000)
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    seed(args.users, args.resources, args.accesses, args.chunk_size, args.seed)
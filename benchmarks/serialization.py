@@ -0,0 +1,60 @@
+import argparse
+import time
+
+from core.database import session_local
+from core.serialization import dump_accesses
+from schemas.accesses import ResponsesAccesses
+from service.access_service import AccessesService
+
+
+
+
+def orm_path(db, limit):
+    accesses = AccessesService(db).search(limit=limit)
+    body = "[" + ",".join(ResponsesAccesses.model_validate(access).model_dump_json() for access in accesses) + "]"
+    return len(accesses), body.encode()
+
+
+def row_path(db, limit):
+    rows = AccessesService(db).search_rows(limit=limit)
+    return len(rows), dump_accesses(rows)
+
+
+def measure(path, limit, iterations):
+    rows = 0
+    size = 0
+    elapsed = 0.0
+
+    for _ in range(iterations):
+        db = session_local()
+        try:
+            started = time.perf_counter()
+            count, body = path(db, limit)
+            elapsed += time.perf_counter() - started
+            rows += count
+            size += len(body)
+        finally:
+            db.close()
+
+    return (rows / elapsed if elapsed else 0.0), size
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare rows/sec of the ORM and column-row access serializers")
+    parser.add_argument("--limit", type=int, default=1000)
+    parser.add_argument("--iterations", type=int, default=20)
+    args = parser.parse_args()
+
+    for path in (orm_path, row_path):
+        measure(path, args.limit, 1)
+
+    orm, orm_size = measure(orm_path, args.limit, args.iterations)
+    rows, rows_size = measure(row_path, args.limit, args.iterations)
+
+    print(f"{'ORM + pydantic':<22} {orm:>12.0f} rows/s {orm_size:>14} bytes")
+    print(f"{'column rows + orjson':<22} {rows:>12.0f} rows/s {rows_size:>14} bytes")
+    print(f"{'speedup':<22} {rows / orm if orm else 0.0:>12.2f}x")
+
+
+if __name__ == "__main__":
+    main()
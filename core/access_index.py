@@ -0,0 +1,334 @@
+from datetime import datetime, timezone
+from threading import Lock, Event, Thread
+import asyncio
+import logging
+import os
+import time
+
+from core.cache import cache_backend, users_cache, resources_cache
+from core.change_feed import CHANGE_FEED_NAMESPACE
+from core.database import session_local
+from models.accesses import AccessModel, AccessState
+from models.groups import GroupMemberModel, GroupGrantModel
+from models.resources import ResourcesModel
+from models.users import UserModel
+
+
+
+
+ACCESS_INDEX_TTL = float(os.getenv("ACCESS_INDEX_TTL", "30"))
+ACCESS_INDEX_WAIT = float(os.getenv("ACCESS_INDEX_WAIT", "5"))
+ACCESS_INDEX_ENABLED = os.getenv("ACCESS_INDEX_ENABLED", "true").lower() in ("1", "true", "yes")
+ACCESS_INDEX_NAMESPACES = (None, CHANGE_FEED_NAMESPACE, users_cache.namespace, resources_cache.namespace)
+
+logger = logging.getLogger(__name__)
+
+
+def as_utc(value):
+    if value is not None and value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value
+
+
+def later(first, second):
+    if first is None or second is None:
+        return None
+    return max(first, second)
+
+
+def bits(mask):
+    while mask:
+        bit = mask & -mask
+        yield bit.bit_length() - 1
+        mask ^= bit
+
+
+class AccessIndex:
+    def __init__(self, ttl=ACCESS_INDEX_TTL, enabled=ACCESS_INDEX_ENABLED):
+        self.ttl = ttl
+        self.enabled = enabled
+        self.grants = {}
+        self.by_user = {}
+        self.inactive_users = set()
+        self.disabled_resources = set()
+        self.group_slots = {}
+        self.slot_grants = []
+        self.member_masks = {}
+        self.resource_masks = {}
+        self.loaded_at = None
+        self.changes = 0
+        self.loaded_changes = None
+        self.reading_changes = None
+        self.loading = False
+        self.journal = None
+        self.pending = None
+        self.ready = Event()
+        self.lock = Lock()
+
+    def is_stale(self):
+        return self.loaded_at is None or time.monotonic() - self.loaded_at > self.ttl
+
+    def is_current(self):
+        return self.loaded_at is not None and self.loaded_changes == self.changes
+
+    def claim_reload(self):
+        with self.lock:
+            if self.loading or not self.is_stale() and self.is_current():
+                return False
+            self.loading = True
+            self.journal = []
+            return True
+
+    def load(self, db):
+        grants = {
+            (user_id, resource_id): as_utc(expires_at)
+            for user_id, resource_id, expires_at in db.query(
+                AccessModel.user_id, AccessModel.resource_id, AccessModel.expires_at
+            ).filter(AccessModel.status == AccessState.ACTIVE)
+        }
+        by_user = {}
+        for (user_id, resource_id), expires_at in grants.items():
+            by_user.setdefault(user_id, {})[resource_id] = expires_at
+
+        inactive_users = {
+            user_id for (user_id,) in db.query(UserModel.id).filter(UserModel.is_active.is_(False))
+        }
+        disabled_resources = {
+            resource_id for (resource_id,) in db.query(ResourcesModel.id).filter(ResourcesModel.is_enabled.is_(False))
+        }
+
+        group_slots = {}
+        slot_grants = []
+        resource_masks = {}
+        for group_id, resource_id, expires_at in db.query(
+            GroupGrantModel.group_id, GroupGrantModel.resource_id, GroupGrantModel.expires_at
+        ):
+            slot = group_slots.setdefault(group_id, len(group_slots))
+            if slot == len(slot_grants):
+                slot_grants.append({})
+            slot_grants[slot][resource_id] = as_utc(expires_at)
+            resource_masks[resource_id] = resource_masks.get(resource_id, 0) | 1 << slot
+
+        member_masks = {}
+        for group_id, user_id in db.query(GroupMemberModel.group_id, GroupMemberModel.user_id):
+            slot = group_slots.setdefault(group_id, len(group_slots))
+            if slot == len(slot_grants):
+                slot_grants.append({})
+            member_masks[user_id] = member_masks.get(user_id, 0) | 1 << slot
+
+        with self.lock:
+            self.grants = grants
+            self.by_user = by_user
+            self.inactive_users = inactive_users
+            self.disabled_resources = disabled_resources
+            self.group_slots = group_slots
+            self.slot_grants = slot_grants
+            self.member_masks = member_masks
+            self.resource_masks = resource_masks
+            for change, args in self.journal or ():
+                change(*args)
+            self.journal = None
+            self.loaded_changes = self.reading_changes
+            self.loaded_at = time.monotonic()
+            self.loading = False
+        self.ready.set()
+
+    def reload(self):
+        with self.lock:
+            if self.journal is None:
+                self.journal = []
+            self.reading_changes = self.changes
+        db = session_local()
+        try:
+            self.load(db)
+        except Exception:
+            with self.lock:
+                self.loading = False
+                self.journal = None
+            raise
+        finally:
+            db.close()
+            self.ready.set()
+
+    def reload_quietly(self):
+        try:
+            self.reload()
+        except Exception:
+            logger.exception("Access index reload failed")
+
+    def ensure_loaded(self, timeout=ACCESS_INDEX_WAIT):
+        if not self.enabled:
+            return False
+        if self.claim_reload():
+            if self.loaded_at is None:
+                self.reload_quietly()
+            else:
+                Thread(target=self.reload_quietly, name="access-index-reload", daemon=True).start()
+        elif self.loaded_at is None:
+            self.ready.wait(timeout)
+        return self.is_current()
+
+    async def refresh(self, timeout=ACCESS_INDEX_WAIT):
+        if not self.enabled:
+            return False
+        if self.claim_reload():
+            self.pending = asyncio.get_running_loop().run_in_executor(None, self.reload_quietly)
+        if self.loaded_at is None and self.pending is not None:
+            try:
+                await asyncio.wait_for(asyncio.shield(self.pending), timeout)
+            except asyncio.TimeoutError:
+                pass
+        return self.is_current()
+
+    def invalidate(self):
+        with self.lock:
+            self.changes += 1
+            if self.loaded_at is not None:
+                self.loaded_at = float("-inf")
+
+    def on_remote_change(self, namespace, key):
+        if namespace in ACCESS_INDEX_NAMESPACES:
+            self.invalidate()
+
+    def apply(self, change, *args):
+        with self.lock:
+            change(*args)
+            if self.journal is not None:
+                self.journal.append((change, args))
+
+    def put(self, user_id, resource_id, status, expires_at):
+        self.apply(self.apply_put, user_id, resource_id, status, expires_at)
+
+    def apply_put(self, user_id, resource_id, status, expires_at):
+        if status != AccessState.ACTIVE:
+            self.apply_discard(user_id, resource_id)
+            return
+        self.grants[(user_id, resource_id)] = as_utc(expires_at)
+        self.by_user.setdefault(user_id, {})[resource_id] = as_utc(expires_at)
+
+    def discard(self, user_id, resource_id):
+        self.apply(self.apply_discard, user_id, resource_id)
+
+    def apply_discard(self, user_id, resource_id):
+        self.grants.pop((user_id, resource_id), None)
+        self.by_user.get(user_id, {}).pop(resource_id, None)
+
+    def set_user_active(self, user_id, is_active):
+        self.apply(self.apply_user_active, user_id, is_active)
+
+    def apply_user_active(self, user_id, is_active):
+        if is_active:
+            self.inactive_users.discard(user_id)
+        else:
+            self.inactive_users.add(user_id)
+
+    def set_resource_enabled(self, resource_id, is_enabled):
+        self.apply(self.apply_resource_enabled, resource_id, is_enabled)
+
+    def apply_resource_enabled(self, resource_id, is_enabled):
+        if is_enabled:
+            self.disabled_resources.discard(resource_id)
+        else:
+            self.disabled_resources.add(resource_id)
+
+    def slot(self, group_id):
+        slot = self.group_slots.get(group_id)
+        if slot is None:
+            slot = self.group_slots[group_id] = len(self.slot_grants)
+            self.slot_grants.append({})
+        return slot
+
+    def add_member(self, group_id, user_id):
+        self.apply(self.apply_add_member, group_id, user_id)
+
+    def apply_add_member(self, group_id, user_id):
+        self.member_masks[user_id] = self.member_masks.get(user_id, 0) | 1 << self.slot(group_id)
+
+    def remove_member(self, group_id, user_id):
+        self.apply(self.apply_remove_member, group_id, user_id)
+
+    def apply_remove_member(self, group_id, user_id):
+        slot = self.group_slots.get(group_id)
+        if slot is not None and user_id in self.member_masks:
+            self.member_masks[user_id] &= ~(1 << slot)
+
+    def put_group_grant(self, group_id, resource_id, expires_at):
+        self.apply(self.apply_group_grant, group_id, resource_id, expires_at)
+
+    def apply_group_grant(self, group_id, resource_id, expires_at):
+        slot = self.slot(group_id)
+        self.slot_grants[slot][resource_id] = as_utc(expires_at)
+        self.resource_masks[resource_id] = self.resource_masks.get(resource_id, 0) | 1 << slot
+
+    def discard_group_grant(self, group_id, resource_id):
+        self.apply(self.apply_discard_group_grant, group_id, resource_id)
+
+    def apply_discard_group_grant(self, group_id, resource_id):
+        slot = self.group_slots.get(group_id)
+        if slot is None:
+            return
+        self.slot_grants[slot].pop(resource_id, None)
+        if resource_id in self.resource_masks:
+            self.resource_masks[resource_id] &= ~(1 << slot)
+
+    def drop_group(self, group_id):
+        self.apply(self.apply_drop_group, group_id)
+
+    def apply_drop_group(self, group_id):
+        slot = self.group_slots.get(group_id)
+        if slot is None:
+            return
+        for resource_id in self.slot_grants[slot]:
+            self.resource_masks[resource_id] &= ~(1 << slot)
+        self.slot_grants[slot] = {}
+
+    def lookup(self, user_id, resource_id):
+        key = (user_id, resource_id)
+        found = key in self.grants
+        expires_at = self.grants.get(key)
+
+        shared = self.member_masks.get(user_id, 0) & self.resource_masks.get(resource_id, 0)
+        for slot in bits(shared):
+            if resource_id not in self.slot_grants[slot]:
+                continue
+            group_expires_at = self.slot_grants[slot][resource_id]
+            expires_at = later(expires_at, group_expires_at) if found else group_expires_at
+            found = True
+
+        return found, expires_at
+
+    def check(self, user_id, resource_id, now=None):
+        with self.lock:
+            found, expires_at = self.lookup(user_id, resource_id)
+            blocked = user_id in self.inactive_users or resource_id in self.disabled_resources
+        if not found:
+            return False, None
+
+        if blocked:
+            return False, expires_at
+        if expires_at is None:
+            return True, None
+
+        now = now or datetime.now(timezone.utc)
+        return expires_at > now, expires_at
+
+    def effective(self, user_id, now=None):
+        now = now or datetime.now(timezone.utc)
+        with self.lock:
+            if user_id in self.inactive_users:
+                return []
+            merged = dict(self.by_user.get(user_id, {}))
+            for slot in bits(self.member_masks.get(user_id, 0)):
+                for resource_id, expires_at in self.slot_grants[slot].items():
+                    merged[resource_id] = later(merged[resource_id], expires_at) if resource_id in merged \
+                        else expires_at
+            grants = [
+                (resource_id, expires_at) for resource_id, expires_at in merged.items()
+                if resource_id not in self.disabled_resources and (expires_at is None or expires_at > now)
+            ]
+
+        return sorted(grants, key=lambda grant: str(grant[0]))
+
+
+access_index = AccessIndex()
+cache_backend.subscribe_remote(access_index.on_remote_change)
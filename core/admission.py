@@ -0,0 +1,234 @@
+from collections import OrderedDict, deque
+from starlette.responses import JSONResponse
+import asyncio
+import math
+import os
+import re
+import time
+
+from core.database import pool_options
+from core.instrumentation import registry, Counter, Gauge, Histogram
+
+
+
+
+POOL_CAPACITY = pool_options()["pool_size"] + pool_options()["max_overflow"]
+
+ADMISSION_ENABLED = os.getenv("ADMISSION_ENABLED", "true").lower() in ("1", "true", "yes")
+ADMISSION_CAPACITY = int(os.getenv("ADMISSION_CAPACITY", str(POOL_CAPACITY)))
+ADMISSION_SCAN_LIMIT = int(os.getenv("ADMISSION_SCAN_LIMIT", str(max(1, ADMISSION_CAPACITY // 2))))
+ADMISSION_WRITE_LIMIT = int(os.getenv("ADMISSION_WRITE_LIMIT", str(max(1, ADMISSION_CAPACITY // 2))))
+ADMISSION_QUEUE_SIZE = int(os.getenv("ADMISSION_QUEUE_SIZE", str(ADMISSION_CAPACITY * 4)))
+ADMISSION_QUEUE_TIMEOUT = float(os.getenv("ADMISSION_QUEUE_TIMEOUT", "1"))
+ADMISSION_CLIENT_RATE = float(os.getenv("ADMISSION_CLIENT_RATE", "0"))
+ADMISSION_CLIENT_BURST = float(os.getenv("ADMISSION_CLIENT_BURST", str(max(1.0, ADMISSION_CLIENT_RATE * 2))))
+ADMISSION_CLIENT_HEADER = os.getenv("ADMISSION_CLIENT_HEADER", "").lower()
+ADMISSION_MAX_CLIENTS = int(os.getenv("ADMISSION_MAX_CLIENTS", "100000"))
+ADMISSION_EXEMPT_PATHS = ("/v1/accesses/changes",)
+
+DEADLINE_HEADER = b"x-request-timeout"
+ITEM_PATH = re.compile(r"^/v1/[^/]+/[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}$")
+
+ITEM = "item"
+WRITE = "write"
+SCAN = "scan"
+PRIORITY = (ITEM, WRITE, SCAN)
+
+
+def request_class(method, path):
+    if method not in ("GET", "HEAD"):
+        return WRITE
+    if path == "/v1/check" or ITEM_PATH.match(path):
+        return ITEM
+    return SCAN
+
+
+class Rejected(Exception):
+
+    def __init__(self, reason, retry_after):
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+
+    def __init__(self, capacity=ADMISSION_CAPACITY, scan_limit=ADMISSION_SCAN_LIMIT, write_limit=ADMISSION_WRITE_LIMIT,
+                 queue_size=ADMISSION_QUEUE_SIZE):
+        self.capacity = capacity
+        self.limits = {ITEM: capacity, WRITE: min(write_limit, capacity), SCAN: min(scan_limit, capacity)}
+        self.queue_size = queue_size
+        self.in_flight = 0
+        self.active = {name: 0 for name in PRIORITY}
+        self.waiters = {name: deque() for name in PRIORITY}
+        self.service_time = {name: 0.0 for name in PRIORITY}
+
+    def can_run(self, name):
+        return self.in_flight < self.capacity and self.active[name] < self.limits[name]
+
+    def start(self, name):
+        self.in_flight += 1
+        self.active[name] += 1
+
+    def expected_wait(self, name):
+        ahead = sum(len(self.waiters[other]) for other in PRIORITY[:PRIORITY.index(name) + 1])
+        return (ahead + 1) * self.service_time[name] / self.limits[name]
+
+    async def acquire(self, name, timeout):
+        if self.can_run(name) and not self.waiters[name]:
+            self.start(name)
+            return
+
+        expected = self.expected_wait(name)
+        if len(self.waiters[name]) >= self.queue_size:
+            raise Rejected("queue_full", expected)
+        if expected > timeout:
+            raise Rejected("deadline", expected)
+
+        waiter = asyncio.get_running_loop().create_future()
+        self.waiters[name].append(waiter)
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), timeout)
+        except asyncio.TimeoutError:
+            if waiter.done():
+                return
+            waiter.cancel()
+            raise Rejected("deadline", self.expected_wait(name))
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                self.release(name, None)
+            else:
+                waiter.cancel()
+            raise
+        finally:
+            if waiter in self.waiters[name]:
+                self.waiters[name].remove(waiter)
+
+    def release(self, name, elapsed):
+        self.in_flight -= 1
+        self.active[name] -= 1
+        if elapsed is not None:
+            previous = self.service_time[name]
+            self.service_time[name] = elapsed if not previous else previous * 0.9 + elapsed * 0.1
+        self.dispatch()
+
+    def dispatch(self):
+        for name in PRIORITY:
+            queue = self.waiters[name]
+            while queue and self.can_run(name):
+                waiter = queue.popleft()
+                if not waiter.done():
+                    self.start(name)
+                    waiter.set_result(None)
+
+    def queue_depth(self, name):
+        return sum(1 for waiter in self.waiters[name] if not waiter.done())
+
+
+class TokenBuckets:
+
+    def __init__(self, rate=ADMISSION_CLIENT_RATE, burst=ADMISSION_CLIENT_BURST, max_clients=ADMISSION_MAX_CLIENTS):
+        self.rate = rate
+        self.burst = burst
+        self.max_clients = max_clients
+        self.buckets = OrderedDict()
+
+    def take(self, client):
+        now = time.monotonic()
+        tokens, updated = self.buckets.pop(client, (self.burst, now))
+        tokens = min(self.burst, tokens + (now - updated) * self.rate)
+
+        if tokens < 1:
+            self.buckets[client] = (tokens, now)
+            raise Rejected("rate_limited", (1 - tokens) / self.rate)
+
+        self.buckets[client] = (tokens - 1, now)
+        while len(self.buckets) > self.max_clients:
+            self.buckets.popitem(last=False)
+
+
+admission_controller = AdmissionController()
+client_buckets = TokenBuckets()
+
+admission_rejections = registry.register(Counter(
+    "admission_rejections_total", "Requests rejected by admission control", ("class", "reason")
+))
+admission_queue_wait = registry.register(Histogram(
+    "admission_queue_wait_seconds", "Time spent waiting for an admission slot", ("class",)
+))
+admission_queue_depth = registry.register(Gauge(
+    "admission_queue_depth", "Requests waiting for an admission slot", ("class",)
+))
+admission_in_flight = registry.register(Gauge(
+    "admission_in_flight", "Requests holding an admission slot", ("class",)
+))
+
+
+@registry.collector
+def collect_admission_metrics():
+    for name in PRIORITY:
+        admission_queue_depth.set(name, value=admission_controller.queue_depth(name))
+        admission_in_flight.set(name, value=admission_controller.active[name])
+
+
+def client_key(scope):
+    if ADMISSION_CLIENT_HEADER:
+        for header, value in scope.get("headers", []):
+            if header.decode("latin-1") == ADMISSION_CLIENT_HEADER:
+                return value.decode("latin-1").split(",")[0].strip()
+    client = scope.get("client")
+    return client[0] if client else ""
+
+
+def request_timeout(scope, default=ADMISSION_QUEUE_TIMEOUT):
+    for header, value in scope.get("headers", []):
+        if header == DEADLINE_HEADER:
+            try:
+                return max(0.0, min(float(value), default))
+            except ValueError:
+                return default
+    return default
+
+
+def rejection(status_code, detail, retry_after):
+    return JSONResponse({"detail": detail}, status_code=status_code,
+                        headers={"Retry-After": str(max(1, math.ceil(retry_after)))})
+
+
+class AdmissionMiddleware:
+
+    def __init__(self, app, controller=admission_controller, buckets=client_buckets):
+        self.app = app
+        self.controller = controller
+        self.buckets = buckets
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not scope["path"].startswith("/v1/") or \
+                scope["path"].startswith(ADMISSION_EXEMPT_PATHS):
+            await self.app(scope, receive, send)
+            return
+
+        name = request_class(scope["method"], scope["path"])
+
+        try:
+            if self.buckets.rate > 0:
+                self.buckets.take(client_key(scope))
+        except Rejected as error:
+            admission_rejections.inc(name, error.reason)
+            await rejection(429, "Превышен лимит запросов, повторите запрос позже", error.retry_after)(
+                scope, receive, send)
+            return
+
+        queued = time.perf_counter()
+        try:
+            await self.controller.acquire(name, request_timeout(scope))
+        except Rejected as error:
+            admission_rejections.inc(name, error.reason)
+            await rejection(503, "Сервер перегружен, повторите запрос позже", error.retry_after)(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        admission_queue_wait.observe(started - queued, name)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.controller.release(name, time.perf_counter() - started)
@@ -0,0 +1,229 @@
+from collections import OrderedDict
+from threading import Lock, Thread
+import json
+import logging
+import os
+import select
+import time
+import uuid
+
+from sqlalchemy import text
+
+from core.database import engine
+from core.instrumentation import registry, Counter, Gauge
+from core.replicas import REPLICA_URLS, REPLICA_MAX_LAG
+
+
+
+
+CACHE_BACKEND = os.getenv("CACHE_BACKEND", "local")
+CACHE_MAXSIZE = int(os.getenv("CACHE_MAXSIZE", "10000"))
+CACHE_TTL = float(os.getenv("CACHE_TTL", "60"))
+CACHE_NEGATIVE_TTL = float(os.getenv("CACHE_NEGATIVE_TTL", "5"))
+CACHE_CHANNEL = os.getenv("CACHE_CHANNEL", "acm_cache_invalidation")
+CACHE_REPLICA_FENCE = REPLICA_MAX_LAG if REPLICA_URLS else 0.0
+ACCESS_STATS_TTL = float(os.getenv("ACCESS_STATS_TTL", "5"))
+ACCESS_STATS_MAXSIZE = int(os.getenv("ACCESS_STATS_MAXSIZE", "1000"))
+
+NEGATIVE = object()
+
+logger = logging.getLogger(__name__)
+
+
+class LocalInvalidationBackend:
+
+    def __init__(self):
+        self.subscribers = []
+        self.remote_subscribers = []
+
+    def subscribe(self, callback):
+        self.subscribers.append(callback)
+
+    def subscribe_remote(self, callback):
+        self.remote_subscribers.append(callback)
+
+    def dispatch(self, namespace, key):
+        for callback in self.subscribers:
+            callback(namespace, key)
+
+    def dispatch_remote(self, namespace, key):
+        self.dispatch(namespace, key)
+        for callback in self.remote_subscribers:
+            callback(namespace, key)
+
+    def publish(self, namespace, key):
+        self.dispatch(namespace, key)
+
+    def is_shared(self):
+        return False
+
+
+class PostgresInvalidationBackend(LocalInvalidationBackend):
+
+    def __init__(self, channel=CACHE_CHANNEL):
+        super().__init__()
+        self.channel = channel
+        self.origin = uuid.uuid4().hex
+        self.listener = None
+        self.listening = False
+
+    def is_shared(self):
+        return self.listening
+
+    def subscribe(self, callback):
+        super().subscribe(callback)
+        self.start_listener()
+
+    def subscribe_remote(self, callback):
+        super().subscribe_remote(callback)
+        self.start_listener()
+
+    def start_listener(self):
+        if self.listener is None:
+            self.listener = Thread(target=self.listen, name="cache-invalidation", daemon=True)
+            self.listener.start()
+
+    def publish(self, namespace, key):
+        self.dispatch(namespace, key)
+
+        payload = json.dumps({"origin": self.origin, "namespace": namespace, "key": key})
+        with engine.connect() as connection:
+            connection.execute(text("SELECT pg_notify(:channel, :payload)"),
+                               {"channel": self.channel, "payload": payload})
+            connection.commit()
+
+    def listen(self):
+        while True:
+            try:
+                connection = engine.raw_connection()
+                connection.detach()
+                raw = connection.driver_connection
+                raw.autocommit = True
+                raw.cursor().execute(f'LISTEN "{self.channel}"')
+
+                self.dispatch_remote(None, None)
+                self.listening = True
+                while True:
+                    if select.select([raw], [], [], 5) == ([], [], []):
+                        continue
+                    raw.poll()
+                    while raw.notifies:
+                        message = json.loads(raw.notifies.pop(0).payload)
+                        if message["origin"] != self.origin:
+                            self.dispatch_remote(message["namespace"], message["key"])
+            except Exception:
+                self.listening = False
+                logger.exception("Cache invalidation listener failed, reconnecting")
+                time.sleep(1)
+
+
+class ReadThroughCache:
+
+    def __init__(self, namespace, backend, maxsize=CACHE_MAXSIZE, ttl=CACHE_TTL, negative_ttl=CACHE_NEGATIVE_TTL,
+                 fence=CACHE_REPLICA_FENCE):
+        self.namespace = namespace
+        self.backend = backend
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.fence = fence
+        self.fences = {}
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.generation = 0
+        self.lock = Lock()
+        backend.subscribe(self.on_invalidate)
+
+    def get_or_load(self, key, loader):
+        key = str(key)
+        now = time.monotonic()
+
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and entry[0] > now:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return None if entry[1] is NEGATIVE else entry[1]
+            self.misses += 1
+            generation = self.generation
+
+        value = loader()
+
+        if value is not None:
+            self.store(key, value, self.fenced(key, now, now + self.ttl), generation)
+        elif self.negative_ttl > 0:
+            self.store(key, NEGATIVE, self.fenced(key, now, now + self.negative_ttl), generation)
+        return value
+
+    def fenced(self, key, now, expires_at):
+        for fence_key in (key, None):
+            fence = self.fences.get(fence_key)
+            if fence is not None and fence > now:
+                expires_at = min(expires_at, fence)
+        return expires_at
+
+    def store(self, key, value, expires_at, generation):
+        with self.lock:
+            if generation != self.generation:
+                return
+            self.entries[key] = (expires_at, value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, key):
+        self.backend.publish(self.namespace, str(key))
+
+    def on_invalidate(self, namespace, key):
+        if namespace is not None and namespace != self.namespace:
+            return
+        with self.lock:
+            self.generation += 1
+            if key is None:
+                self.entries.clear()
+            else:
+                self.entries.pop(key, None)
+
+            if self.fence > 0:
+                now = time.monotonic()
+                if len(self.fences) >= self.maxsize:
+                    self.fences = {fence_key: fence for fence_key, fence in self.fences.items() if fence > now}
+                self.fences[key] = now + self.fence
+
+    def stats(self):
+        return {
+            "name": self.namespace,
+            "size": len(self.entries),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+
+def make_backend(name=CACHE_BACKEND):
+    if name == "postgres":
+        return PostgresInvalidationBackend()
+    return LocalInvalidationBackend()
+
+
+cache_backend = make_backend()
+users_cache = ReadThroughCache("users", cache_backend)
+resources_cache = ReadThroughCache("resources", cache_backend)
+access_stats_cache = ReadThroughCache("access_stats", cache_backend, maxsize=ACCESS_STATS_MAXSIZE, ttl=ACCESS_STATS_TTL,
+                                      negative_ttl=0)
+
+cache_requests = registry.register(Counter("cache_requests_total", "Read-through cache lookups", ("cache", "result")))
+cache_entries = registry.register(Gauge("cache_entries", "Entries held by the read-through cache", ("cache",)))
+
+
+@registry.collector
+def collect_cache_metrics():
+    for cache in (users_cache, resources_cache, access_stats_cache):
+        stats = cache.stats()
+        cache_requests.set(cache.namespace, "hit", value=stats["hits"])
+        cache_requests.set(cache.namespace, "miss", value=stats["misses"])
+        cache_entries.set(cache.namespace, value=stats["size"])
@@ -0,0 +1,72 @@
+from threading import Lock
+import asyncio
+import os
+
+from core.cache import cache_backend
+
+
+
+
+CHANGE_FEED_NAMESPACE = "access_changes"
+CHANGE_FEED_POLL_INTERVAL = float(os.getenv("CHANGE_FEED_POLL_INTERVAL", "1"))
+CHANGE_FEED_MAX_WAIT = float(os.getenv("CHANGE_FEED_MAX_WAIT", "60"))
+CHANGE_FEED_HEARTBEAT = float(os.getenv("CHANGE_FEED_HEARTBEAT", "15"))
+
+
+class ChangeWaiter:
+
+    def __init__(self, feed):
+        self.feed = feed
+        self.loop = asyncio.get_running_loop()
+        self.event = asyncio.Event()
+
+    def __enter__(self):
+        self.feed.add(self)
+        return self
+
+    def __exit__(self, *exc_info):
+        self.feed.remove(self)
+
+    def wake(self):
+        self.loop.call_soon_threadsafe(self.event.set)
+
+    async def wait(self, timeout):
+        try:
+            await asyncio.wait_for(self.event.wait(), min(timeout, CHANGE_FEED_POLL_INTERVAL))
+        except asyncio.TimeoutError:
+            pass
+        self.event.clear()
+
+
+class ChangeFeed:
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.waiters = set()
+        self.lock = Lock()
+        backend.subscribe(self.on_change)
+
+    def waiter(self):
+        return ChangeWaiter(self)
+
+    def add(self, waiter):
+        with self.lock:
+            self.waiters.add(waiter)
+
+    def remove(self, waiter):
+        with self.lock:
+            self.waiters.discard(waiter)
+
+    def notify(self):
+        self.backend.publish(CHANGE_FEED_NAMESPACE, None)
+
+    def on_change(self, namespace, key):
+        if namespace is not None and namespace != CHANGE_FEED_NAMESPACE:
+            return
+        with self.lock:
+            waiters = list(self.waiters)
+        for waiter in waiters:
+            waiter.wake()
+
+
+change_feed = ChangeFeed(cache_backend)
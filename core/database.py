@@ -2,20 +2,52 @@
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy import create_engine
+from fastapi import Request
 
 import os
 
+from core.replicas import REPLICA_URLS, ReplicaPool, wants_primary
+from core.instrumentation import registry
 
 
 
+
+def pool_options():
+    return {
+        "pool_size": int(os.getenv("DB_POOL_SIZE", "10")),
+        "max_overflow": int(os.getenv("DB_MAX_OVERFLOW", "20")),
+        "pool_timeout": float(os.getenv("DB_POOL_TIMEOUT", "30")),
+        "pool_recycle": int(os.getenv("DB_POOL_RECYCLE", "1800")),
+        "pool_pre_ping": os.getenv("DB_POOL_PRE_PING", "true").lower() in ("1", "true", "yes"),
+    }
+
+
 SQL_DB_URL = os.getenv("DATABASE_URL")
-engine = create_engine(SQL_DB_URL)
+
+engine = create_engine(SQL_DB_URL, **pool_options())
 session_local = sessionmaker(autoflush=False, autocommit=False, bind=engine)
+
+replica_pool = ReplicaPool(REPLICA_URLS, pool_options())
+registry.collector(replica_pool.collect)
+
 Base = declarative_base()
 
 
-def get_db():
-    db = session_local()
+def read_session():
+    replica = replica_pool.choose()
+    if replica is None:
+        return session_local()
+    return replica.sessions()
+
+
+def session_for(request):
+    if request is None or wants_primary(request):
+        return session_local
+    return read_session
+
+
+def get_db(request: Request = None):
+    db = session_for(request)()
     try:
         yield db
     finally:
@@ -0,0 +1,86 @@
+from threading import Lock
+import hashlib
+import os
+import time
+import uuid
+
+from core.cache import cache_backend, CACHE_REPLICA_FENCE
+
+
+
+
+HTTP_CACHE_MAX_AGE = int(os.getenv("HTTP_CACHE_MAX_AGE", "0"))
+VERSIONS_NAMESPACE = "table_versions"
+
+
+class TableVersions:
+
+    def __init__(self, backend, fence=CACHE_REPLICA_FENCE):
+        self.backend = backend
+        self.fence = fence
+        self.versions = {}
+        self.changed_at = {}
+        self.lock = Lock()
+        backend.subscribe(self.on_invalidate)
+
+    def get(self, table):
+        with self.lock:
+            version = self.versions.get(table)
+            if version is None:
+                version = self.versions[table] = uuid.uuid4().hex
+            return version
+
+    def bump(self, *tables):
+        for table in tables:
+            self.backend.publish(VERSIONS_NAMESPACE, f"{table}:{uuid.uuid4().hex}")
+
+    def on_invalidate(self, namespace, key):
+        if namespace is not None and namespace != VERSIONS_NAMESPACE:
+            return
+
+        with self.lock:
+            if key is None:
+                self.versions.clear()
+                self.changed_at[None] = time.monotonic()
+            else:
+                table, version = key.split(":", 1)
+                self.versions[table] = version
+                self.changed_at[table] = time.monotonic()
+
+    def settled(self, table):
+        if self.fence <= 0:
+            return True
+        now = time.monotonic()
+        return all(now - self.changed_at.get(key, now - self.fence) >= self.fence for key in (table, None))
+
+    def etag(self, table, *parts):
+        if not self.backend.is_shared() or not self.settled(table):
+            return None
+        digest = hashlib.sha1("|".join(str(part) for part in (table, self.get(table), *parts)).encode())
+        return f'"{digest.hexdigest()}"'
+
+
+def request_etag(request, table, *parts):
+    return table_versions.etag(table, request.url.path, request.url.query, request.headers.get("accept", ""),
+                               *parts)
+
+
+def not_modified(request, etag):
+    if etag is None:
+        return False
+    candidates = {tag.strip().removeprefix("W/") for tag in request.headers.get("if-none-match", "").split(",")}
+    return etag in candidates or "*" in candidates
+
+
+def cache_headers(response, etag, vary=None):
+    if etag is None:
+        response.headers["Cache-Control"] = "no-cache"
+    else:
+        response.headers["ETag"] = etag
+        response.headers["Cache-Control"] = f"private, max-age={HTTP_CACHE_MAX_AGE}, must-revalidate"
+    if vary:
+        response.headers["Vary"] = vary
+    return response
+
+
+table_versions = TableVersions(cache_backend)
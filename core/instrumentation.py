@@ -0,0 +1,277 @@
+from collections import deque
+from contextvars import ContextVar
+from threading import Lock, Thread, get_ident
+import logging
+import os
+import sys
+import time
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+
+
+
+QUERY_COUNT_WARNING = int(os.getenv("QUERY_COUNT_WARNING", "10"))
+PROFILE_SLOW_REQUEST_MS = float(os.getenv("PROFILE_SLOW_REQUEST_MS", "0"))
+PROFILE_INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", "5"))
+PROFILE_OUTPUT_DIR = os.getenv("PROFILE_OUTPUT_DIR", "profiles")
+
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 100)
+
+logger = logging.getLogger(__name__)
+
+
+class RequestStats:
+
+    def __init__(self):
+        self.queries = 0
+        self.query_time = 0.0
+        self.threads = {get_ident()}
+
+
+request_stats = ContextVar("request_stats", default=None)
+
+
+def format_labels(names, values):
+    if not names:
+        return ""
+    return "{" + ",".join(f'{name}="{str(value).replace(chr(34), chr(39))}"' for name, value in zip(names, values)) + "}"
+
+
+class Counter:
+
+    def __init__(self, name, documentation, labels=()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+        self.values = {}
+        self.lock = Lock()
+
+    def inc(self, *labels, amount=1):
+        with self.lock:
+            self.values[labels] = self.values.get(labels, 0) + amount
+
+    def set(self, *labels, value):
+        with self.lock:
+            self.values[labels] = value
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        for labels, value in sorted(self.values.items()):
+            lines.append(f"{self.name}{format_labels(self.labels, labels)} {value}")
+        return lines
+
+
+class Gauge(Counter):
+
+    def render(self):
+        lines = super().render()
+        lines[1] = f"# TYPE {self.name} gauge"
+        return lines
+
+
+class Histogram:
+
+    def __init__(self, name, documentation, labels=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+        self.buckets = buckets
+        self.series = {}
+        self.lock = Lock()
+
+    def observe(self, value, *labels):
+        with self.lock:
+            series = self.series.get(labels)
+            if series is None:
+                series = self.series[labels] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[0][i] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        names = self.labels + ("le",)
+        for labels, (counts, total, count) in sorted(self.series.items()):
+            for bound, bucket in zip(self.buckets, counts):
+                lines.append(f"{self.name}_bucket{format_labels(names, labels + (bound,))} {bucket}")
+            lines.append(f"{self.name}_bucket{format_labels(names, labels + ('+Inf',))} {count}")
+            lines.append(f"{self.name}_sum{format_labels(self.labels, labels)} {total}")
+            lines.append(f"{self.name}_count{format_labels(self.labels, labels)} {count}")
+        return lines
+
+
+class Registry:
+
+    def __init__(self):
+        self.metrics = []
+        self.collectors = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def collector(self, callback):
+        self.collectors.append(callback)
+        return callback
+
+    def render(self):
+        for callback in self.collectors:
+            callback()
+        return "\n".join(line for metric in self.metrics for line in metric.render()) + "\n"
+
+
+registry = Registry()
+
+http_request_duration = registry.register(Histogram(
+    "http_request_duration_seconds", "HTTP request latency", ("method", "route", "status")
+))
+db_query_duration = registry.register(Histogram(
+    "db_query_duration_seconds", "SQL statement latency"
+))
+db_queries_per_request = registry.register(Histogram(
+    "db_queries_per_request", "SQL statements issued per HTTP request", ("method", "route"), COUNT_BUCKETS
+))
+db_time_per_request = registry.register(Histogram(
+    "db_time_per_request_seconds", "Time spent in SQL per HTTP request", ("method", "route")
+))
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def before_cursor_execute(connection, cursor, statement, parameters, context, executemany):
+    context.query_started = time.perf_counter()
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def after_cursor_execute(connection, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - context.query_started
+    db_query_duration.observe(elapsed)
+
+    stats = request_stats.get()
+    if stats is not None:
+        stats.queries += 1
+        stats.query_time += elapsed
+        stats.threads.add(get_ident())
+
+
+def frame_stack(frame):
+    stack = []
+    while frame is not None:
+        code = frame.f_code
+        stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+        frame = frame.f_back
+    return ";".join(reversed(stack))
+
+
+class StackSampler:
+
+    def __init__(self, interval_ms=PROFILE_INTERVAL_MS, output_dir=PROFILE_OUTPUT_DIR, capacity=100000):
+        self.interval = interval_ms / 1000
+        self.output_dir = output_dir
+        self.samples = deque(maxlen=capacity)
+        self.active = 0
+        self.thread = None
+        self.lock = Lock()
+
+    def enter(self):
+        with self.lock:
+            self.active += 1
+            if self.thread is None:
+                self.thread = Thread(target=self.run, name="stack-sampler", daemon=True)
+                self.thread.start()
+
+    def leave(self):
+        with self.lock:
+            self.active -= 1
+
+    def run(self):
+        own = get_ident()
+        while True:
+            if self.active:
+                now = time.perf_counter()
+                for thread_id, frame in sys._current_frames().items():
+                    if thread_id != own:
+                        self.samples.append((now, thread_id, frame_stack(frame)))
+            time.sleep(self.interval)
+
+    def dump(self, started, finished, threads, method, path):
+        folded = {}
+        for at, thread_id, stack in list(self.samples):
+            if started <= at <= finished and thread_id in threads:
+                folded[stack] = folded.get(stack, 0) + 1
+        if not folded:
+            return None
+
+        os.makedirs(self.output_dir, exist_ok=True)
+        name = f"{time.strftime('%Y%m%dT%H%M%S')}{int(time.time() * 1000) % 1000:03d}-{method}-{path.strip('/').replace('/', '_') or 'root'}.folded"
+        filename = os.path.join(self.output_dir, name)
+        with open(filename, "w", encoding="utf-8") as file:
+            for stack, count in sorted(folded.items()):
+                file.write(f"{stack} {count}\n")
+        return filename
+
+
+sampler = StackSampler() if PROFILE_SLOW_REQUEST_MS > 0 else None
+
+
+class InstrumentationMiddleware:
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats()
+        token = request_stats.set(stats)
+        started = time.perf_counter()
+        status = 500
+
+        if sampler is not None:
+            sampler.enter()
+
+        async def send_with_timing(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                elapsed = (time.perf_counter() - started) * 1000
+                headers = list(message.get("headers", []))
+                headers.append((b"x-query-count", str(stats.queries).encode()))
+                headers.append((b"server-timing",
+                                f"app;dur={elapsed:.2f}, db;dur={stats.query_time * 1000:.2f}".encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            finished = time.perf_counter()
+            request_stats.reset(token)
+            self.record(scope, stats, status, started, finished)
+
+    def record(self, scope, stats, status, started, finished):
+        route = scope.get("route")
+        route = route.path if route is not None else "unmatched"
+        method = scope["method"]
+        elapsed = finished - started
+
+        http_request_duration.observe(elapsed, method, route, status)
+        db_queries_per_request.observe(stats.queries, method, route)
+        db_time_per_request.observe(stats.query_time, method, route)
+
+        if stats.queries > QUERY_COUNT_WARNING:
+            logger.warning("%s %s issued %s SQL statements", method, route, stats.queries)
+
+        if sampler is not None:
+            sampler.leave()
+            if elapsed * 1000 >= PROFILE_SLOW_REQUEST_MS:
+                filename = sampler.dump(started, finished, stats.threads, method, scope["path"])
+                if filename:
+                    logger.warning("%s %s took %.1f ms, stack samples written to %s",
+                                   method, route, elapsed * 1000, filename)
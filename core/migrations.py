@@ -0,0 +1,329 @@
+from sqlalchemy import MetaData, Table, Column, Integer, String, DateTime, func, select, insert, update, text, \
+    bindparam, case, column, inspect, table, literal
+from sqlalchemy.schema import CreateTable
+from sqlalchemy.sql import visitors
+from sqlalchemy.sql.elements import BindParameter
+from datetime import datetime, timedelta, timezone
+import json
+import sys
+import uuid
+
+from core.database import Base, engine
+from models.accesses import AccessModel, AccessState, AccessStateType
+from models.access_history import AccessHistoryModel
+from models.access_changes import AccessChangeModel
+from models.groups import GroupModel, GroupMemberModel, GroupGrantModel
+from models.jobs import JobModel
+from models.resources import ResourcesModel
+from models.users import UserModel
+from schemas.accesses import STATUS_LABELS, STATUS_STATES
+
+
+
+
+MIGRATIONS_LOCK_ID = 740_061
+
+migrations_metadata = MetaData()
+schema_migrations = Table(
+    "schema_migrations",
+    migrations_metadata,
+    Column("version", Integer, primary_key=True),
+    Column("name", String, nullable=False),
+    Column("applied_at", DateTime(timezone=True), server_default=func.now()),
+)
+
+
+def initial_schema(connection):
+    Base.metadata.create_all(bind=connection)
+
+
+def status_is_text(connection, name):
+    status = next(item for item in inspect(connection).get_columns(name) if item["name"] == "status")
+    return isinstance(status["type"], String)
+
+
+def labelled_status(clause):
+    def replace(element):
+        if isinstance(element, BindParameter) and isinstance(element.type, AccessStateType):
+            return literal(STATUS_LABELS[AccessState(element.value)].value)
+        if isinstance(element, Column) and element.table is AccessModel.__table__:
+            return column(element.name)
+        return None
+
+    return visitors.replacement_traverse(clause, {}, replace)
+
+
+def create_access_index(connection, index, text_status):
+    where = index.dialect_kwargs.get(f"{connection.dialect.name}_where")
+    if not text_status or where is None:
+        index.create(connection, checkfirst=True)
+        return
+
+    preparer = connection.dialect.identifier_preparer
+    predicate = labelled_status(where).compile(dialect=connection.dialect, compile_kwargs={"literal_binds": True})
+    columns = ", ".join(preparer.quote(item.name) for item in index.expressions)
+    connection.execute(text(f'CREATE {"UNIQUE " if index.unique else ""}INDEX IF NOT EXISTS '
+                            f'{preparer.quote(index.name)} ON {preparer.format_table(index.table)} ({columns}) '
+                            f'WHERE {predicate}'))
+
+
+def encoded_status(name):
+    return case({label.value: int(state) for label, state in STATUS_STATES.items()}, value=column(name))
+
+
+def rebuild_table(connection, source, columns, values=None):
+    legacy = table(f"{source.name}_legacy", *(column(name) for name in columns))
+    connection.execute(text(f'ALTER TABLE "{source.name}" RENAME TO "{legacy.name}"'))
+    connection.execute(CreateTable(source))
+    connection.execute(insert(source).from_select(
+        columns,
+        select(*((values or {}).get(name, legacy.c[name]) for name in columns))
+    ))
+    connection.execute(text(f'DROP TABLE "{legacy.name}"'))
+
+
+def encode_status_column(connection, model):
+    source = model.__table__
+    existing = {index["name"] for index in inspect(connection).get_indexes(source.name)}
+    indexes = [index for index in source.indexes if index.name in existing]
+
+    for index in indexes:
+        connection.execute(text(f'DROP INDEX IF EXISTS "{index.name}"'))
+
+    if connection.dialect.name == "postgresql":
+        using = encoded_status("status").compile(dialect=connection.dialect, compile_kwargs={"literal_binds": True})
+        connection.execute(text(f'ALTER TABLE "{source.name}" ALTER COLUMN status TYPE smallint USING {using}'))
+    else:
+        rebuild_table(connection, source, [item["name"] for item in inspect(connection).get_columns(source.name)],
+                      {"status": encoded_status("status")})
+
+    for index in indexes:
+        index.create(connection)
+
+
+def encode_access_status(connection):
+    for model in (AccessModel, AccessChangeModel, AccessHistoryModel):
+        if inspect(connection).has_table(model.__tablename__) and status_is_text(connection, model.__tablename__):
+            encode_status_column(connection, model)
+
+
+def accesses_hot_path_indexes(connection):
+    text_status = status_is_text(connection, AccessModel.__tablename__)
+    if text_status:
+        active = column("status") == STATUS_LABELS[AccessState.ACTIVE].value
+        revoked = literal(STATUS_LABELS[AccessState.REVOKED].value)
+    else:
+        active = AccessModel.status == AccessState.ACTIVE
+        revoked = AccessState.REVOKED
+    duplicates = (
+        select(AccessModel.user_id, AccessModel.resource_id, func.max(AccessModel.granted_at).label("granted_at"))
+        .where(active)
+        .group_by(AccessModel.user_id, AccessModel.resource_id)
+        .having(func.count() > 1)
+    )
+
+    for user_id, resource_id, granted_at in connection.execute(duplicates).all():
+        newest = connection.execute(
+            select(AccessModel.id)
+            .where(active, AccessModel.user_id == user_id, AccessModel.resource_id == resource_id)
+            .order_by(AccessModel.granted_at.desc())
+            .limit(1)
+        ).scalar()
+        connection.execute(
+            update(AccessModel)
+            .where(active, AccessModel.user_id == user_id, AccessModel.resource_id == resource_id,
+                   AccessModel.id != newest)
+            .values(status=revoked, expires_at=datetime.now(timezone.utc))
+        )
+
+    for index in AccessModel.__table__.indexes:
+        if index.name in ("ix_accesses_user_resource", "ix_accesses_resource_status",
+                          "ix_accesses_active_expires_at", "uq_accesses_active_user_resource"):
+            create_access_index(connection, index, text_status)
+
+
+def trigram_search_indexes(connection):
+    if connection.dialect.name != "postgresql":
+        return
+
+    connection.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+    connection.execute(text('CREATE INDEX IF NOT EXISTS ix_users_full_name_trgm '
+                            'ON "Users" USING gin (full_name gin_trgm_ops)'))
+    connection.execute(text('CREATE INDEX IF NOT EXISTS ix_users_email_trgm '
+                            'ON "Users" USING gin (email gin_trgm_ops)'))
+    connection.execute(text('CREATE INDEX IF NOT EXISTS ix_resources_name_trgm '
+                            'ON "Resources" USING gin (name gin_trgm_ops)'))
+
+
+def access_change_log(connection):
+    AccessChangeModel.__table__.create(connection, checkfirst=True)
+
+
+def groups(connection):
+    for model in (GroupModel, GroupMemberModel, GroupGrantModel):
+        model.__table__.create(connection, checkfirst=True)
+
+
+def month_bounds(moment):
+    start = moment.astimezone(timezone.utc).replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    return start, (start + timedelta(days=32)).replace(day=1)
+
+
+def history_partitions(connection, moment):
+    if connection.dialect.name != "postgresql":
+        return []
+
+    table = AccessHistoryModel.__tablename__
+    connection.execute(text(f'CREATE TABLE IF NOT EXISTS "{table}_default" PARTITION OF "{table}" DEFAULT'))
+
+    names = []
+    start, end = month_bounds(moment)
+    for _ in range(2):
+        name = f"{table}_{start:%Y_%m}"
+        connection.execute(text(f'CREATE TABLE IF NOT EXISTS "{name}" PARTITION OF "{table}" '
+                                f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"))
+        names.append(name)
+        start, end = end, month_bounds(end + timedelta(days=1))[1]
+    return names
+
+
+def ensure_history_partitions(moment=None, bind=engine):
+    with bind.begin() as connection:
+        return history_partitions(connection, moment or datetime.now(timezone.utc))
+
+
+def access_history(connection):
+    AccessHistoryModel.__table__.create(connection, checkfirst=True)
+    history_partitions(connection, datetime.now(timezone.utc))
+
+    text_status = status_is_text(connection, AccessModel.__tablename__)
+    for index in AccessModel.__table__.indexes:
+        if index.name == "ix_accesses_inactive_expires_at":
+            create_access_index(connection, index, text_status)
+
+
+def jobs(connection):
+    JobModel.__table__.create(connection, checkfirst=True)
+
+
+def group_access_changes(connection):
+    source = AccessChangeModel.__table__
+    inspector = inspect(connection)
+    columns = [item["name"] for item in inspector.get_columns(source.name)]
+    if "group_id" in columns:
+        return
+
+    if connection.dialect.name == "postgresql":
+        connection.execute(text(f'ALTER TABLE "{source.name}" ADD COLUMN group_id uuid'))
+        connection.execute(text(f'ALTER TABLE "{source.name}" ALTER COLUMN access_id DROP NOT NULL'))
+        return
+
+    existing = {index["name"] for index in inspector.get_indexes(source.name)}
+    indexes = [index for index in source.indexes if index.name in existing]
+    for index in indexes:
+        connection.execute(text(f'DROP INDEX IF EXISTS "{index.name}"'))
+    rebuild_table(connection, source, columns)
+    for index in indexes:
+        index.create(connection)
+
+
+MIGRATIONS = [
+    (1, "initial schema", initial_schema),
+    (2, "accesses hot path indexes", accesses_hot_path_indexes),
+    (3, "trigram search indexes", trigram_search_indexes),
+    (4, "access change log", access_change_log),
+    (5, "groups", groups),
+    (6, "access history", access_history),
+    (7, "compact access status", encode_access_status),
+    (8, "jobs", jobs),
+    (9, "group access changes", group_access_changes),
+]
+
+
+def migrate(bind=engine):
+    with bind.begin() as connection:
+        if connection.dialect.name == "postgresql":
+            connection.execute(text("SELECT pg_advisory_xact_lock(:lock_id)"), {"lock_id": MIGRATIONS_LOCK_ID})
+
+        schema_migrations.create(connection, checkfirst=True)
+        applied = set(connection.execute(select(schema_migrations.c.version)).scalars())
+
+        for version, name, upgrade in MIGRATIONS:
+            if version in applied:
+                continue
+            upgrade(connection)
+            connection.execute(insert(schema_migrations).values(version=version, name=name))
+
+
+def hot_queries():
+    user_id = uuid.uuid4()
+    resource_id = uuid.uuid4()
+    now = datetime.now(timezone.utc)
+    active = AccessModel.status == AccessState.ACTIVE
+
+    return {
+        "search by user": select(AccessModel).where(AccessModel.user_id == user_id),
+        "search by user and resource": select(AccessModel).where(
+            AccessModel.user_id == user_id, AccessModel.resource_id == resource_id
+        ),
+        "search by resource and status": select(AccessModel).where(AccessModel.resource_id == resource_id, active),
+        "duplicate active grant": select(AccessModel.id).where(
+            AccessModel.user_id == user_id, AccessModel.resource_id == resource_id, active
+        ),
+        "due for expiry": select(AccessModel.id).where(active, AccessModel.expires_at <= now)
+        .order_by(AccessModel.expires_at).limit(1000),
+    }
+
+
+def explain(connection, query):
+    compiled = query.compile()
+    binds = [bindparam(name, value=bind.effective_value, type_=bind.type) for bind, name in compiled.bind_names.items()]
+
+    if connection.dialect.name == "postgresql":
+        statement = text("EXPLAIN (FORMAT JSON) " + compiled.string).bindparams(*binds)
+        return connection.execute(statement).scalar()
+    statement = text("EXPLAIN QUERY PLAN " + compiled.string).bindparams(*binds)
+    return [row[-1] for row in connection.execute(statement)]
+
+
+def sequential_scans(plan, table):
+    if isinstance(plan, list):
+        return [scan for item in plan for scan in sequential_scans(item, table)]
+    if isinstance(plan, str):
+        return [plan] if plan.startswith(f"SCAN {table}") and "INDEX" not in plan else []
+
+    scans = []
+    node = plan.get("Plan", plan)
+    if node.get("Node Type") == "Seq Scan" and node.get("Relation Name") == table:
+        scans.append(node["Node Type"])
+    for child in node.get("Plans", []):
+        scans.extend(sequential_scans(child, table))
+    return scans
+
+
+def explain_hot_queries(bind=engine):
+    failures = {}
+
+    with bind.connect() as connection:
+        if connection.dialect.name == "postgresql":
+            connection.execute(text("SET LOCAL enable_seqscan = off"))
+
+        for name, query in hot_queries().items():
+            plan = explain(connection, query)
+            if sequential_scans(plan, AccessModel.__tablename__):
+                failures[name] = plan
+
+        connection.rollback()
+
+    return failures
+
+
+if __name__ == "__main__":
+    if "--explain" in sys.argv[1:]:
+        failures = explain_hot_queries()
+        for name, plan in failures.items():
+            print(f"Sequential scan on {AccessModel.__tablename__} for '{name}':")
+            print(json.dumps(plan, indent=2, ensure_ascii=False))
+        sys.exit(1 if failures else 0)
+
+    migrate()
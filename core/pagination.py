@@ -0,0 +1,66 @@
+from fastapi.responses import StreamingResponse
+
+import os
+
+from core.database import session_local
+
+
+
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+MAX_PAGE_LIMIT = int(os.getenv("MAX_PAGE_LIMIT", "1000"))
+STREAM_BATCH_SIZE = int(os.getenv("STREAM_BATCH_SIZE", "1000"))
+
+
+def keyset(query, column, cursor=None, limit=None):
+    if cursor is not None:
+        query = query.filter(column > cursor)
+
+    query = query.order_by(column)
+
+    if limit is not None:
+        query = query.limit(limit + 1)
+
+    return query
+
+
+def split_page(items, limit, key="id"):
+    if limit is not None and len(items) > limit:
+        items = items[:limit]
+        return items, str(getattr(items[-1], key))
+
+    return items, None
+
+
+def paginate(items, limit, response, key="id"):
+    items, next_cursor = split_page(items, limit, key)
+    if next_cursor is not None:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+
+    return items
+
+
+def wants_ndjson(request):
+    return NDJSON_MEDIA_TYPE in request.headers.get("accept", "")
+
+
+def ndjson_lines(rows_factory, render, sessions=session_local):
+    db = sessions()
+    try:
+        chunk = []
+        for row in rows_factory(db):
+            chunk.append(render(row))
+            if len(chunk) >= STREAM_BATCH_SIZE:
+                yield "\n".join(chunk) + "\n"
+                chunk = []
+        if chunk:
+            yield "\n".join(chunk) + "\n"
+    finally:
+        db.close()
+
+
+def ndjson_response(rows_factory, schema=None, render=None, sessions=session_local):
+    if render is None:
+        render = lambda row: schema.model_validate(row).model_dump_json()
+    return StreamingResponse(ndjson_lines(rows_factory, render, sessions), media_type=NDJSON_MEDIA_TYPE)
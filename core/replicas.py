@@ -0,0 +1,136 @@
+from itertools import count
+from threading import Lock, Thread
+import logging
+import os
+import time
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+
+from core.instrumentation import registry, Gauge
+
+
+
+
+REPLICA_URLS = [url.strip() for url in os.getenv("DATABASE_REPLICA_URLS", "").split(",") if url.strip()]
+REPLICA_MAX_LAG = float(os.getenv("REPLICA_MAX_LAG", "5"))
+REPLICA_HEALTH_INTERVAL = float(os.getenv("REPLICA_HEALTH_INTERVAL", "5"))
+READ_AFTER_WRITE_SECONDS = float(os.getenv("READ_AFTER_WRITE_SECONDS", str(REPLICA_MAX_LAG * 2)))
+
+PRIMARY_COOKIE = "acm_primary_until"
+SAFE_METHODS = frozenset(("GET", "HEAD", "OPTIONS"))
+
+LAG_QUERY = text(
+    "SELECT CASE WHEN NOT pg_is_in_recovery() OR pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+    "ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()) END"
+)
+
+logger = logging.getLogger(__name__)
+
+
+class Replica:
+
+    def __init__(self, name, url, options):
+        self.name = name
+        self.engine = create_engine(url, **options)
+        self.sessions = sessionmaker(autoflush=False, autocommit=False, bind=self.engine,
+                                     info={"replica": name})
+        self.healthy = False
+        self.lag = None
+
+    def check(self):
+        try:
+            with self.engine.connect() as connection:
+                if connection.dialect.name == "postgresql":
+                    lag = float(connection.execute(LAG_QUERY).scalar() or 0)
+                else:
+                    connection.exec_driver_sql("SELECT 1")
+                    lag = 0.0
+        except Exception:
+            if self.healthy:
+                logger.warning("Replica %s failed its health check", self.name, exc_info=True)
+            self.healthy = False
+            return
+
+        if not self.healthy:
+            logger.info("Replica %s is healthy, lag %.2fs", self.name, lag)
+        self.lag = lag
+        self.healthy = True
+
+    def usable(self, max_lag):
+        return self.healthy and self.lag is not None and self.lag <= max_lag
+
+
+class ReplicaPool:
+
+    def __init__(self, urls, options, max_lag=REPLICA_MAX_LAG, interval=REPLICA_HEALTH_INTERVAL):
+        self.replicas = [Replica(f"replica-{i}", url, options) for i, url in enumerate(urls)]
+        self.max_lag = max_lag
+        self.interval = interval
+        self.counter = count()
+        self.checker = None
+        self.lock = Lock()
+
+    def start(self):
+        with self.lock:
+            if self.checker is None and self.replicas:
+                self.checker = Thread(target=self.run, name="replica-health", daemon=True)
+                self.checker.start()
+
+    def run(self):
+        while True:
+            for replica in self.replicas:
+                replica.check()
+            time.sleep(self.interval)
+
+    def choose(self):
+        if not self.replicas:
+            return None
+
+        self.start()
+        usable = [replica for replica in self.replicas if replica.usable(self.max_lag)]
+        if not usable:
+            return None
+        return usable[next(self.counter) % len(usable)]
+
+    def collect(self):
+        for replica in self.replicas:
+            replica_healthy.set(replica.name, value=int(replica.healthy))
+            if replica.lag is not None:
+                replica_lag.set(replica.name, value=replica.lag)
+
+
+def wants_primary(request):
+    if request.method not in SAFE_METHODS:
+        return True
+
+    until = request.cookies.get(PRIMARY_COOKIE)
+    try:
+        return until is not None and float(until) > time.time()
+    except ValueError:
+        return False
+
+
+class ReadAfterWriteMiddleware:
+
+    def __init__(self, app, seconds=READ_AFTER_WRITE_SECONDS):
+        self.app = app
+        self.seconds = seconds
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] in SAFE_METHODS:
+            await self.app(scope, receive, send)
+            return
+
+        async def send_with_cookie(message):
+            if message["type"] == "http.response.start" and message["status"] < 400:
+                until = time.time() + self.seconds
+                cookie = f"{PRIMARY_COOKIE}={until:.3f}; Max-Age={int(self.seconds) + 1}; Path=/; HttpOnly; SameSite=Lax"
+                message = {**message, "headers": list(message.get("headers", [])) + [(b"set-cookie", cookie.encode())]}
+            await send(message)
+
+        await self.app(scope, receive, send_with_cookie)
+
+
+replica_healthy = registry.register(Gauge("db_replica_healthy", "Replica passed its last health check", ("replica",)))
+replica_lag = registry.register(Gauge("db_replica_lag_seconds", "Replication lag at the last health check", ("replica",)))
@@ -0,0 +1,78 @@
+from sqlalchemy import update, delete, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
+
+
+
+
+DIALECT_INSERTS = {
+    "postgresql": postgresql.insert,
+    "sqlite": sqlite.insert,
+}
+
+
+def detached(database, row):
+    if row is not None:
+        database.expunge(row)
+    return row
+
+
+def insert_returning(database, model, values, conflict=None, conflict_where=None):
+    dialect = database.get_bind().dialect
+    make_insert = DIALECT_INSERTS.get(dialect.name)
+
+    if make_insert is None or not dialect.insert_returning:
+        row = model(**values)
+        try:
+            with database.begin_nested():
+                database.add(row)
+        except IntegrityError:
+            return None
+        database.refresh(row)
+        return detached(database, row)
+
+    statement = make_insert(model).values(**values)
+    if conflict is not None:
+        statement = statement.on_conflict_do_nothing(index_elements=conflict, index_where=conflict_where)
+    return detached(database, database.scalars(statement.returning(model)).first())
+
+
+def update_returning(database, model, criteria, values):
+    if not database.get_bind().dialect.update_returning:
+        row = database.query(model).filter(*criteria).with_for_update().first()
+        if row is None:
+            return None
+        for name, value in values.items():
+            setattr(row, name, value)
+        database.flush()
+        return detached(database, row)
+
+    statement = update(model).where(*criteria).values(**values).returning(model)
+    return detached(database, database.scalars(statement, execution_options={"synchronize_session": False}).first())
+
+
+def update_many_returning(database, model, criteria, values, columns, limit):
+    chunk = select(model.id).where(*criteria).limit(limit)
+
+    if not database.get_bind().dialect.update_returning:
+        rows = database.execute(select(*columns).where(*criteria).limit(limit).with_for_update()).all()
+        if rows:
+            database.execute(update(model).where(model.id.in_([row[0] for row in rows]), *criteria).values(**values),
+                             execution_options={"synchronize_session": False})
+        return rows
+
+    statement = update(model).where(model.id.in_(chunk), *criteria).values(**values).returning(*columns)
+    return database.execute(statement, execution_options={"synchronize_session": False}).all()
+
+
+def delete_returning(database, model, criteria):
+    if not database.get_bind().dialect.delete_returning:
+        row = database.query(model).filter(*criteria).with_for_update().first()
+        if row is None:
+            return None
+        database.delete(row)
+        database.flush()
+        return detached(database, row)
+
+    statement = delete(model).where(*criteria).returning(model)
+    return detached(database, database.scalars(statement, execution_options={"synchronize_session": False}).first())
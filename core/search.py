@@ -0,0 +1,184 @@
+from sqlalchemy import func, or_, case
+from threading import Lock
+import os
+import re
+import time
+
+from models.resources import ResourcesModel
+from models.users import UserModel
+
+
+
+
+SEARCH_LIMIT = int(os.getenv("SEARCH_LIMIT", "50"))
+SEARCH_INDEX_TTL = float(os.getenv("SEARCH_INDEX_TTL", "60"))
+SEARCH_MAX_CANDIDATES = int(os.getenv("SEARCH_MAX_CANDIDATES", "5000"))
+
+WORD_SEPARATOR = r"[\s@._-]"
+WORD_SEPARATORS = re.compile(WORD_SEPARATOR + "+")
+
+
+def escape_like(term):
+    return term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def word_prefix(term):
+    return f"(^|{WORD_SEPARATOR}){re.escape(term)}"
+
+
+def trigrams(text):
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class TrigramSearch:
+
+    def __init__(self, model, columns):
+        self.model = model
+        self.columns = columns
+
+    def search(self, query, term, prefix, limit):
+        escaped = escape_like(term)
+
+        if prefix:
+            matches = [column.regexp_match(word_prefix(term), flags="i") for column in self.columns]
+        else:
+            matches = [column.ilike(f"%{escaped}%", escape="\\") for column in self.columns]
+
+        starts = func.greatest(*[
+            case((column.ilike(f"{escaped}%", escape="\\"), 2), (column.regexp_match(word_prefix(term), flags="i"), 1),
+                 else_=0)
+            for column in self.columns
+        ])
+        similarity = func.greatest(*[func.similarity(column, term) for column in self.columns])
+
+        return (
+            query.filter(or_(*matches))
+            .order_by(starts.desc(), similarity.desc(), self.model.id)
+            .limit(limit)
+            .all()
+        )
+
+
+class NgramSearch:
+
+    def __init__(self, model, columns, ttl=SEARCH_INDEX_TTL):
+        self.model = model
+        self.columns = columns
+        self.ttl = ttl
+        self.documents = {}
+        self.postings = {}
+        self.loaded_at = None
+        self.lock = Lock()
+
+    def load(self, db):
+        documents = {}
+        postings = {}
+        for row_id, *values in db.query(self.model.id, *self.columns):
+            texts = tuple((value or "").lower() for value in values)
+            documents[row_id] = texts
+            for gram in set().union(*(trigrams(text) for text in texts)):
+                postings.setdefault(gram, set()).add(row_id)
+
+        with self.lock:
+            self.documents = documents
+            self.postings = postings
+            self.loaded_at = time.monotonic()
+
+    def ensure_loaded(self, db):
+        if self.loaded_at is None or time.monotonic() - self.loaded_at > self.ttl:
+            self.load(db)
+
+    def add(self, row_id, values):
+        if self.loaded_at is None:
+            return
+
+        texts = tuple((value or "").lower() for value in values)
+        with self.lock:
+            self.documents[row_id] = texts
+            for gram in set().union(*(trigrams(text) for text in texts)):
+                self.postings.setdefault(gram, set()).add(row_id)
+
+    def discard(self, row_id):
+        with self.lock:
+            texts = self.documents.pop(row_id, ())
+            for gram in set().union(*(trigrams(text) for text in texts)):
+                self.postings.get(gram, set()).discard(row_id)
+
+    @staticmethod
+    def score(texts, term, prefix):
+        best = 0.0
+        for text in texts:
+            if term not in text:
+                continue
+            if text == term:
+                rank = 4.0
+            elif text.startswith(term):
+                rank = 3.0
+            elif any(word.startswith(term) for word in WORD_SEPARATORS.split(text)):
+                rank = 2.0
+            elif prefix:
+                continue
+            else:
+                rank = 1.0
+            best = max(best, rank + len(term) / len(text))
+        return best
+
+    def rank(self, term, prefix):
+        term = term.lower()
+        grams = trigrams(term)
+
+        with self.lock:
+            if grams:
+                postings = sorted((self.postings.get(gram, set()) for gram in grams), key=len)
+                candidates = set.intersection(*postings)
+            else:
+                candidates = self.documents.keys()
+
+            scored = []
+            for row_id in candidates:
+                score = self.score(self.documents[row_id], term, prefix)
+                if score:
+                    scored.append((-score, str(row_id), row_id))
+
+        scored.sort()
+        return [row_id for _, _, row_id in scored[:SEARCH_MAX_CANDIDATES]]
+
+    def search(self, db, query, term, prefix, limit):
+        self.ensure_loaded(db)
+
+        ranked = self.rank(term, prefix)
+        if not ranked:
+            return []
+
+        position = {row_id: i for i, row_id in enumerate(ranked)}
+        rows = query.filter(self.model.id.in_(ranked)).all()
+        return sorted(rows, key=lambda row: position[row.id])[:limit]
+
+
+class SearchEngine:
+
+    def __init__(self, model, *columns):
+        self.trigram = TrigramSearch(model, columns)
+        self.ngram = NgramSearch(model, columns)
+
+    def search(self, db, query, term, prefix=False, limit=SEARCH_LIMIT):
+        if db.get_bind().dialect.name == "postgresql":
+            return self.trigram.search(query, term, prefix, limit)
+        return self.ngram.search(db, query, term, prefix, limit)
+
+    def add(self, row_id, *values):
+        self.ngram.add(row_id, values)
+
+    def discard(self, row_id):
+        self.ngram.discard(row_id)
+
+    def invalidate(self):
+        self.ngram.loaded_at = None
+
+    def warm(self, db):
+        if db.get_bind().dialect.name != "postgresql":
+            self.ngram.ensure_loaded(db)
+
+
+users_search = SearchEngine(UserModel, UserModel.full_name, UserModel.email)
+resources_search = SearchEngine(ResourcesModel, ResourcesModel.name)
@@ -0,0 +1,50 @@
+from datetime import datetime, timezone
+from fastapi import Response
+
+import orjson
+
+from core.pagination import NEXT_CURSOR_HEADER
+from schemas.accesses import effective_status, status_label
+
+
+
+
+JSON_OPTIONS = orjson.OPT_UTC_Z | orjson.OPT_NAIVE_UTC | orjson.OPT_OMIT_MICROSECONDS
+ACCESS_FIELDS = ("id", "user_id", "resource_id", "granted_at", "expires_at", "status", "comment")
+
+
+def to_utc(value):
+    if value is not None and value.utcoffset():
+        return value.astimezone(timezone.utc)
+    return value
+
+
+def access_rows(rows, now=None):
+    now = now or datetime.now(timezone.utc)
+    return [
+        {
+            "id": access_id,
+            "user_id": user_id,
+            "resource_id": resource_id,
+            "granted_at": to_utc(granted_at),
+            "expires_at": to_utc(expires_at),
+            "status": status_label(effective_status(status, expires_at, now)),
+            "comment": comment,
+        }
+        for access_id, user_id, resource_id, granted_at, expires_at, status, comment in rows
+    ]
+
+
+def dump_accesses(rows, now=None):
+    return orjson.dumps(access_rows(rows, now), option=JSON_OPTIONS)
+
+
+def dump_access_line(row):
+    return orjson.dumps(access_rows((row,))[0], option=JSON_OPTIONS).decode()
+
+
+def json_page(rows, next_cursor=None, dump=dump_accesses):
+    response = Response(dump(rows), media_type="application/json")
+    if next_cursor is not None:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+    return response
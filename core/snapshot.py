@@ -0,0 +1,231 @@
+from contextlib import contextmanager
+from sqlalchemy import select, insert, Boolean, DateTime, UUID, SmallInteger, TypeDecorator
+import argparse
+import io
+import os
+import time
+import uuid
+
+import pyarrow as pa
+
+from core.access_index import access_index
+from core.cache import cache_backend
+from core.database import engine
+from core.search import users_search, resources_search
+from models.accesses import AccessModel
+from models.access_history import AccessHistoryModel
+from models.groups import GroupModel, GroupMemberModel, GroupGrantModel
+from models.resources import ResourcesModel
+from models.users import UserModel
+from schemas.accesses import STATUS_STATES
+
+
+
+
+ARROW_MEDIA_TYPE = "application/vnd.apache.arrow.stream"
+SNAPSHOT_CHUNK_SIZE = int(os.getenv("SNAPSHOT_CHUNK_SIZE", "50000"))
+
+SNAPSHOT_TABLES = {
+    "users": UserModel.__table__,
+    "resources": ResourcesModel.__table__,
+    "groups": GroupModel.__table__,
+    "group_members": GroupMemberModel.__table__,
+    "group_grants": GroupGrantModel.__table__,
+    "accesses": AccessModel.__table__,
+    "access_history": AccessHistoryModel.__table__,
+}
+
+
+def is_state_column(column):
+    return isinstance(column.type, TypeDecorator) and isinstance(column.type.impl_instance, SmallInteger)
+
+
+def arrow_type(column):
+    if is_state_column(column):
+        return pa.int16()
+    if isinstance(column.type, UUID):
+        return pa.binary(16)
+    if isinstance(column.type, DateTime):
+        return pa.timestamp("us", tz="UTC")
+    if isinstance(column.type, Boolean):
+        return pa.bool_()
+    return pa.string()
+
+
+def arrow_schema(table):
+    return pa.schema([pa.field(column.name, arrow_type(column)) for column in table.columns])
+
+
+def labelled_schema(table):
+    return pa.schema([pa.field(column.name, pa.string() if is_state_column(column) else arrow_type(column))
+                      for column in table.columns])
+
+
+def record_batch(table, schema, rows):
+    columns = list(zip(*rows)) if rows else [()] * len(table.columns)
+    arrays = []
+    for column, field, values in zip(table.columns, schema, columns):
+        if isinstance(column.type, UUID):
+            values = [value.bytes if isinstance(value, uuid.UUID) else value for value in values]
+        arrays.append(pa.array(values, field.type))
+    return pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+
+@contextmanager
+def snapshot_connection():
+    with engine.connect() as connection:
+        if connection.dialect.name == "postgresql":
+            connection.execution_options(isolation_level="REPEATABLE READ", postgresql_readonly=True)
+        with connection.begin():
+            if connection.dialect.name == "sqlite":
+                connection.exec_driver_sql("BEGIN")
+            yield connection
+
+
+def export_batches(name, chunk_size=SNAPSHOT_CHUNK_SIZE, connection=None):
+    if connection is None:
+        with snapshot_connection() as connection:
+            yield from export_batches(name, chunk_size, connection)
+        return
+
+    table = SNAPSHOT_TABLES[name]
+    schema = arrow_schema(table)
+
+    result = connection.execution_options(stream_results=True, yield_per=chunk_size).execute(
+        select(*table.columns).order_by(table.primary_key.columns.values()[0])
+    )
+    for rows in result.partitions():
+        yield record_batch(table, schema, rows)
+
+
+def export_stream(name, chunk_size=SNAPSHOT_CHUNK_SIZE, connection=None):
+    sink = io.BytesIO()
+    with pa.ipc.new_stream(sink, arrow_schema(SNAPSHOT_TABLES[name])) as writer:
+        for batch in export_batches(name, chunk_size, connection):
+            writer.write_batch(batch)
+            yield sink.getvalue()
+            sink.seek(0)
+            sink.truncate()
+    yield sink.getvalue()
+
+
+def decode_rows(table, batch):
+    rows = batch.to_pylist()
+    uuid_columns = [column.name for column in table.columns if isinstance(column.type, UUID)]
+    for row in rows:
+        for name in uuid_columns:
+            if row[name] is not None:
+                row[name] = uuid.UUID(bytes=row[name])
+    return rows
+
+
+def decode_labels(name, table, rows):
+    state_columns = [column.name for column in table.columns if is_state_column(column)]
+    for row in rows:
+        for column in state_columns:
+            if row[column] is None:
+                continue
+            state = STATUS_STATES.get(row[column])
+            if state is None:
+                raise ValueError(f"{name}: unknown access status label {row[column]!r}")
+            row[column] = int(state)
+    return rows
+
+
+def copy_value(value):
+    if value is None:
+        return "\\N"
+    if isinstance(value, bool):
+        return "t" if value else "f"
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    return (str(value).replace("\\", "\\\\").replace("\t", "\\t")
+            .replace("\n", "\\n").replace("\r", "\\r"))
+
+
+def copy_rows(connection, table, rows):
+    names = [column.name for column in table.columns]
+    buffer = io.StringIO()
+    for row in rows:
+        buffer.write("\t".join(copy_value(row[name]) for name in names) + "\n")
+    buffer.seek(0)
+
+    preparer = connection.dialect.identifier_preparer
+    statement = (f"COPY {preparer.format_table(table)} "
+                 f"({', '.join(preparer.quote(name) for name in names)}) FROM STDIN")
+    cursor = connection.connection.dbapi_connection.cursor()
+    try:
+        cursor.copy_expert(statement, buffer)
+    finally:
+        cursor.close()
+
+
+def import_batches(connection, name, reader):
+    table = SNAPSHOT_TABLES[name]
+    labelled = not reader.schema.equals(arrow_schema(table))
+    if labelled and not reader.schema.equals(labelled_schema(table)):
+        raise ValueError(f"{name}: unexpected schema {reader.schema}")
+
+    total = 0
+    for batch in reader:
+        rows = decode_rows(table, batch)
+        if not rows:
+            continue
+        if labelled:
+            rows = decode_labels(name, table, rows)
+        if connection.dialect.name == "postgresql":
+            copy_rows(connection, table, rows)
+        else:
+            connection.execute(insert(table), rows)
+        total += len(rows)
+    return total
+
+
+def import_stream(name, source):
+    with engine.begin() as connection:
+        total = import_batches(connection, name, pa.ipc.open_stream(source))
+    after_import()
+    return total
+
+
+def after_import():
+    access_index.invalidate()
+    cache_backend.publish(None, None)
+    users_search.invalidate()
+    resources_search.invalidate()
+
+
+def export_snapshot(directory, names=tuple(SNAPSHOT_TABLES), chunk_size=SNAPSHOT_CHUNK_SIZE):
+    os.makedirs(directory, exist_ok=True)
+    with snapshot_connection() as connection:
+        for name in names:
+            started = time.perf_counter()
+            path = os.path.join(directory, f"{name}.arrow")
+            with open(path, "wb") as file:
+                for chunk in export_stream(name, chunk_size, connection):
+                    file.write(chunk)
+            print(f"{name}: {path} in {time.perf_counter() - started:.1f}s")
+
+
+def import_snapshot(directory, names=tuple(SNAPSHOT_TABLES)):
+    with engine.begin() as connection:
+        for name in names:
+            started = time.perf_counter()
+            with pa.OSFile(os.path.join(directory, f"{name}.arrow")) as source:
+                total = import_batches(connection, name, pa.ipc.open_stream(source))
+            print(f"{name}: {total} rows in {time.perf_counter() - started:.1f}s")
+    after_import()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export or import Arrow IPC snapshots of the access graph")
+    parser.add_argument("command", choices=("export", "import"))
+    parser.add_argument("directory")
+    parser.add_argument("--tables", nargs="+", choices=tuple(SNAPSHOT_TABLES), default=tuple(SNAPSHOT_TABLES))
+    parser.add_argument("--chunk-size", type=int, default=SNAPSHOT_CHUNK_SIZE)
+    args = parser.parse_args()
+
+    if args.command == "export":
+        export_snapshot(args.directory, args.tables, args.chunk_size)
+    else:
+        import_snapshot(args.directory, args.tables)
@@ -0,0 +1,113 @@
+from threading import Lock, current_thread, main_thread
+import asyncio
+import logging
+import os
+import signal
+import time
+
+from core.access_index import access_index
+from core.database import engine, session_local, replica_pool
+from core.search import users_search, resources_search
+
+
+
+
+MIGRATE_ON_STARTUP = os.getenv("MIGRATE_ON_STARTUP", "true").lower() in ("1", "true", "yes")
+WARMUP_POOL_CONNECTIONS = int(os.getenv("WARMUP_POOL_CONNECTIONS", os.getenv("DB_POOL_SIZE", "10")))
+DRAIN_DELAY = float(os.getenv("DRAIN_DELAY", "5"))
+WARMUP_TIMEOUT = float(os.getenv("WARMUP_TIMEOUT", "30"))
+
+logger = logging.getLogger(__name__)
+
+
+class Readiness:
+
+    def __init__(self):
+        self.ready = False
+        self.draining = False
+        self.warmup_seconds = None
+        self.lock = Lock()
+
+    def mark_ready(self, warmup_seconds):
+        with self.lock:
+            self.warmup_seconds = warmup_seconds
+            self.ready = True
+
+    def mark_draining(self):
+        with self.lock:
+            self.draining = True
+
+    def status(self):
+        if self.draining:
+            state = "draining"
+        elif self.ready:
+            state = "ready"
+        else:
+            state = "starting"
+        return {"status": state, "pid": os.getpid(), "warmup_seconds": self.warmup_seconds}
+
+
+readiness = Readiness()
+
+
+def prime_pool(bind, size):
+    connections = []
+    try:
+        for _ in range(size):
+            connection = bind.connect()
+            connections.append(connection)
+            connection.exec_driver_sql("SELECT 1")
+    finally:
+        for connection in connections:
+            connection.close()
+
+
+def warm_up():
+    started = time.perf_counter()
+
+    prime_pool(engine, WARMUP_POOL_CONNECTIONS)
+    for replica in replica_pool.replicas:
+        replica.check()
+        if replica.healthy:
+            prime_pool(replica.engine, WARMUP_POOL_CONNECTIONS)
+    access_index.ensure_loaded(timeout=None)
+
+    db = session_local()
+    try:
+        users_search.warm(db)
+        resources_search.warm(db)
+    finally:
+        db.close()
+
+    elapsed = time.perf_counter() - started
+    logger.info("Worker %s warmed up in %.2fs", os.getpid(), elapsed)
+    return elapsed
+
+
+async def warm_up_before_serving(timeout=WARMUP_TIMEOUT):
+    try:
+        elapsed = await asyncio.wait_for(asyncio.get_running_loop().run_in_executor(None, warm_up),
+                                         timeout if timeout > 0 else None)
+    except asyncio.TimeoutError:
+        logger.warning("Worker %s warm-up did not finish in %.1fs, serving with cold caches", os.getpid(), timeout)
+        elapsed = None
+    except Exception:
+        logger.exception("Worker %s warm-up failed, serving with cold caches", os.getpid())
+        elapsed = None
+    readiness.mark_ready(elapsed)
+
+
+def drain_on_sigterm(loop, delay=DRAIN_DELAY):
+    shutdown = signal.getsignal(signal.SIGTERM)
+    if current_thread() is not main_thread() or not callable(shutdown):
+        return
+
+    def handle_sigterm(signum, frame):
+        if readiness.draining or delay <= 0:
+            shutdown(signum, frame)
+            return
+        readiness.mark_draining()
+        logger.info("Worker %s draining for %.1fs before shutdown", os.getpid(), delay)
+        loop.call_soon_threadsafe(loop.call_later, delay, shutdown, signum, frame)
+
+    signal.signal(signal.SIGTERM, handle_sigterm)
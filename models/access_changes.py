@@ -0,0 +1,20 @@
+from sqlalchemy import Column, String, UUID, DateTime, BigInteger, Integer, func
+from core.database import Base
+from models.accesses import AccessStateType
+
+
+
+
+
+class AccessChangeModel(Base):
+    __tablename__ = "AccessChanges"
+
+    seq = Column(BigInteger().with_variant(Integer, "sqlite"), primary_key=True, autoincrement=True)
+    access_id = Column(UUID, nullable=True, index=True)
+    group_id = Column(UUID, nullable=True)
+    user_id = Column(UUID)
+    resource_id = Column(UUID)
+    operation = Column(String, nullable=False)
+    status = Column(AccessStateType)
+    expires_at = Column(DateTime(timezone=True), nullable=True)
+    changed_at = Column(DateTime(timezone=True), server_default=func.now())
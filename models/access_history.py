@@ -0,0 +1,26 @@
+from sqlalchemy import Column, String, UUID, DateTime, Index
+from core.database import Base
+from models.accesses import AccessStateType
+
+
+
+
+
+class AccessHistoryModel(Base):
+    __tablename__ = "AccessHistory"
+
+    id = Column(UUID(as_uuid=True), primary_key=True, nullable=False)
+    user_id = Column(UUID)
+    resource_id = Column(UUID)
+    granted_at = Column(DateTime(timezone=True), nullable=True)
+    expires_at = Column(DateTime(timezone=True), nullable=True)
+    status = Column(AccessStateType)
+    comment = Column(String)
+    archived_at = Column(DateTime(timezone=True), primary_key=True, nullable=False)
+
+    __table_args__ = (
+        Index("ix_access_history_id", id),
+        Index("ix_access_history_user_resource", user_id, resource_id),
+        Index("ix_access_history_resource_status", resource_id, status),
+        {"postgresql_partition_by": "RANGE (archived_at)"},
+    )
@@ -1,13 +1,30 @@
 
-from sqlalchemy import Column, String, ForeignKey, func, UUID, DateTime
+from sqlalchemy import Column, String, ForeignKey, func, UUID, DateTime, Index, SmallInteger, TypeDecorator
 from core.database import Base
-from schemas.accesses import AccessStatus
+from enum import IntEnum
 import uuid
 
 
 
 
 
+class AccessState(IntEnum):
+    ACTIVE = 1
+    EXPIRED = 2
+    REVOKED = 3
+
+
+class AccessStateType(TypeDecorator):
+    impl = SmallInteger
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        return None if value is None else int(AccessState(value))
+
+    def process_result_value(self, value, dialect):
+        return None if value is None else AccessState(value)
+
+
 class AccessModel(Base):
     __tablename__ = "Accesses"
 
@@ -16,5 +33,19 @@ class AccessModel(Base):
     resource_id = Column(UUID, ForeignKey("Resources.id"))
     granted_at = Column(DateTime(timezone=True), index=True, nullable=True, server_default=func.now())
     expires_at = Column(DateTime(timezone=True), index=True, nullable=True)
-    status = Column(String, default=AccessStatus.ACTIVE)
-    comment = Column(String)
\ No newline at end of file
+    status = Column(AccessStateType, nullable=False, default=AccessState.ACTIVE)
+    comment = Column(String)
+
+    __table_args__ = (
+        Index("ix_accesses_user_resource", user_id, resource_id),
+        Index("ix_accesses_resource_status", resource_id, status),
+        Index("ix_accesses_active_expires_at", expires_at,
+              postgresql_where=status == AccessState.ACTIVE,
+              sqlite_where=status == AccessState.ACTIVE),
+        Index("ix_accesses_inactive_expires_at", expires_at,
+              postgresql_where=status != AccessState.ACTIVE,
+              sqlite_where=status != AccessState.ACTIVE),
+        Index("uq_accesses_active_user_resource", user_id, resource_id, unique=True,
+              postgresql_where=status == AccessState.ACTIVE,
+              sqlite_where=status == AccessState.ACTIVE),
+    )
@@ -0,0 +1,38 @@
+from sqlalchemy import Column, String, ForeignKey, func, UUID, DateTime, Index
+from core.database import Base
+import uuid
+
+
+
+
+
+class GroupModel(Base):
+    __tablename__ = "Groups"
+
+    id = Column(UUID(as_uuid=True), primary_key=True, index=True, nullable=False, default=uuid.uuid4)
+    name = Column(String, index=True, nullable=False, unique=True)
+    description = Column(String)
+
+
+class GroupMemberModel(Base):
+    __tablename__ = "GroupMembers"
+
+    group_id = Column(UUID, ForeignKey("Groups.id", ondelete="CASCADE"), primary_key=True)
+    user_id = Column(UUID, ForeignKey("Users.id", ondelete="CASCADE"), primary_key=True)
+
+    __table_args__ = (
+        Index("ix_group_members_user", user_id),
+    )
+
+
+class GroupGrantModel(Base):
+    __tablename__ = "GroupGrants"
+
+    group_id = Column(UUID, ForeignKey("Groups.id", ondelete="CASCADE"), primary_key=True)
+    resource_id = Column(UUID, ForeignKey("Resources.id", ondelete="CASCADE"), primary_key=True)
+    granted_at = Column(DateTime(timezone=True), nullable=True, server_default=func.now())
+    expires_at = Column(DateTime(timezone=True), nullable=True)
+
+    __table_args__ = (
+        Index("ix_group_grants_resource", resource_id),
+    )
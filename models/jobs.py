@@ -0,0 +1,49 @@
+from sqlalchemy import Column, String, func, UUID, DateTime, Integer, BigInteger, JSON, Index
+from core.database import Base
+from enum import Enum
+import uuid
+
+
+
+
+
+class JobKind(str, Enum):
+    EXPIRE_DUE = "expire-due"
+    ARCHIVE_ENDED = "archive-ended"
+    REVOKE = "revoke"
+    REVALIDATE = "revalidate"
+
+
+class JobState(str, Enum):
+    QUEUED = "queued"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+    CANCELLED = "cancelled"
+
+
+UNFINISHED_JOB_STATES = (JobState.QUEUED, JobState.RUNNING)
+
+
+class JobModel(Base):
+    __tablename__ = "Jobs"
+
+    id = Column(UUID(as_uuid=True), primary_key=True, index=True, nullable=False, default=uuid.uuid4)
+    kind = Column(String, nullable=False)
+    params = Column(JSON, nullable=False, default=dict)
+    status = Column(String, nullable=False, default=JobState.QUEUED.value)
+    owner = Column(String)
+    total = Column(BigInteger().with_variant(Integer, "sqlite"))
+    processed = Column(BigInteger().with_variant(Integer, "sqlite"), nullable=False, default=0)
+    chunks = Column(Integer, nullable=False, default=0)
+    error = Column(String)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    started_at = Column(DateTime(timezone=True))
+    heartbeat_at = Column(DateTime(timezone=True))
+    finished_at = Column(DateTime(timezone=True))
+
+    __table_args__ = (
+        Index("ix_jobs_unfinished", status, created_at,
+              postgresql_where=status.in_([state.value for state in UNFINISHED_JOB_STATES]),
+              sqlite_where=status.in_([state.value for state in UNFINISHED_JOB_STATES])),
+    )
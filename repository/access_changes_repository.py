@@ -0,0 +1,34 @@
+from models.access_changes import AccessChangeModel
+from sqlalchemy import func, insert, text
+
+
+
+
+CHANGE_LOG_LOCK_ID = 740_062
+
+
+class AccessChangesRepository:
+
+    def __init__(self, database):
+        self.database = database
+
+    def record(self, changes):
+        if not changes:
+            return
+
+        if self.database.get_bind().dialect.name == "postgresql":
+            self.database.execute(text("SELECT pg_advisory_xact_lock(:lock_id)"), {"lock_id": CHANGE_LOG_LOCK_ID})
+        self.database.execute(insert(AccessChangeModel), changes)
+        self.database.flush()
+
+    def since(self, seq, limit):
+        return (
+            self.database.query(AccessChangeModel)
+            .filter(AccessChangeModel.seq > seq)
+            .order_by(AccessChangeModel.seq)
+            .limit(limit)
+            .all()
+        )
+
+    def last_seq(self):
+        return self.database.query(func.coalesce(func.max(AccessChangeModel.seq), 0)).scalar()
@@ -0,0 +1,110 @@
+from models.accesses import AccessModel, AccessState, AccessStateType
+from models.access_history import AccessHistoryModel
+from models.groups import GroupMemberModel, GroupGrantModel
+from models.resources import ResourcesModel
+from models.users import UserModel
+from repository.accesses_repository import AccessesRepository
+from sqlalchemy import and_, or_, case, func, literal, select, type_coerce, union_all, DateTime
+from datetime import timedelta
+
+
+
+
+class AccessStatsRepository:
+
+    def __init__(self, database):
+        self.database = database
+
+    @staticmethod
+    def effective_status(model, now):
+        expired = and_(model.status == AccessState.ACTIVE, model.expires_at <= now)
+        return type_coerce(case((expired, int(AccessState.EXPIRED)), else_=model.status), AccessStateType)
+
+    def status_counts(self, now, resource_id=None, history=False):
+        models = (AccessModel, AccessHistoryModel) if history else (AccessModel,)
+        sources = []
+        for model in models:
+            query = select(self.effective_status(model, now).label("status"))
+            if resource_id is not None:
+                query = query.where(model.resource_id == resource_id)
+            sources.append(query)
+
+        rows = union_all(*sources).subquery() if len(sources) > 1 else sources[0].subquery()
+        status = type_coerce(rows.c.status, AccessStateType)
+        return self.database.execute(
+            select(status, func.count()).group_by(rows.c.status).order_by(rows.c.status)
+        ).all()
+
+    def resource_counts(self, now, status, limit):
+        count = func.count().label("count")
+        return self.database.execute(
+            select(AccessModel.resource_id, count)
+            .where(AccessesRepository.effective_status_filter(status, now))
+            .group_by(AccessModel.resource_id)
+            .order_by(count.desc(), AccessModel.resource_id)
+            .limit(limit)
+        ).all()
+
+    def expiry_buckets(self, now, days, resource_id=None):
+        bucket = case(
+            *((AccessModel.expires_at <= now + timedelta(days=bound), index) for index, bound in enumerate(days)),
+            else_=len(days)
+        ).label("bucket")
+
+        query = select(bucket).where(AccessesRepository.effective_status_filter(AccessState.ACTIVE, now))
+        if resource_id is not None:
+            query = query.where(AccessModel.resource_id == resource_id)
+
+        rows = query.subquery()
+        return dict(self.database.execute(select(rows.c.bucket, func.count()).group_by(rows.c.bucket)).all())
+
+    def resource_holders(self, resource_id, now):
+        direct = select(
+            AccessModel.user_id.label("user_id"),
+            AccessModel.expires_at.label("expires_at"),
+            literal(1).label("direct"),
+        ).where(
+            AccessModel.resource_id == resource_id,
+            AccessesRepository.effective_status_filter(AccessState.ACTIVE, now)
+        )
+        via_groups = select(
+            GroupMemberModel.user_id.label("user_id"),
+            GroupGrantModel.expires_at.label("expires_at"),
+            literal(0).label("direct"),
+        ).join(
+            GroupGrantModel, GroupGrantModel.group_id == GroupMemberModel.group_id
+        ).where(
+            GroupGrantModel.resource_id == resource_id,
+            or_(GroupGrantModel.expires_at.is_(None), GroupGrantModel.expires_at > now)
+        )
+
+        paths = union_all(direct, via_groups).subquery()
+        return select(
+            paths.c.user_id,
+            type_coerce(func.max(paths.c.expires_at), DateTime(timezone=True)).label("expires_at"),
+            func.min(case((paths.c.expires_at.is_(None), 0), else_=1)).label("bounded"),
+            func.max(paths.c.direct).label("direct"),
+            func.min(paths.c.direct).label("only_direct"),
+        ).join(
+            UserModel, UserModel.id == paths.c.user_id
+        ).where(
+            UserModel.is_active.is_(True),
+            select(ResourcesModel.id).where(ResourcesModel.id == resource_id, ResourcesModel.is_enabled.is_(True)).exists()
+        ).group_by(paths.c.user_id).subquery()
+
+    def holder_counts(self, resource_id, now):
+        holders = self.resource_holders(resource_id, now)
+        return self.database.execute(select(
+            func.count(),
+            func.coalesce(func.sum(holders.c.direct), 0),
+            func.coalesce(func.sum(1 - holders.c.only_direct), 0),
+        )).one()
+
+    def holders(self, resource_id, now, cursor=None, limit=None):
+        holders = self.resource_holders(resource_id, now)
+        query = select(holders).order_by(holders.c.user_id)
+        if cursor is not None:
+            query = query.where(holders.c.user_id > cursor)
+        if limit is not None:
+            query = query.limit(limit + 1)
+        return self.database.execute(query).all()
@@ -1,63 +1,327 @@
 
-from models.accesses import AccessModel
-from datetime import datetime
+from models.accesses import AccessModel, AccessState, AccessStateType
+from models.access_history import AccessHistoryModel
+from models.groups import GroupMemberModel, GroupGrantModel
+from models.resources import ResourcesModel
+from models.users import UserModel
+from core.pagination import keyset, STREAM_BATCH_SIZE
+from core.returning import insert_returning, update_returning, delete_returning, update_many_returning
+from sqlalchemy import or_, and_, not_, case, func, select, update, insert, delete, literal, type_coerce, union_all, \
+    DateTime
+from datetime import datetime, timezone
 
 
+def row_columns(model):
+    return (
+        model.id,
+        model.user_id,
+        model.resource_id,
+        model.granted_at,
+        model.expires_at,
+        model.status,
+        model.comment,
+    )
+
+
+ROW_COLUMNS = row_columns(AccessModel)
+
 
 class AccessesRepository:
 
     def __init__(self, database):
         self.database = database
 
-    def get_all(self):
-        return self.database.query(AccessModel).all()
+    def get_all(self, cursor=None, limit=None):
+        return keyset(self.database.query(AccessModel), AccessModel.id, cursor, limit).all()
+
+    def search(self, user_id = None, resource_id = None, status = None, expires_at = None, cursor = None, limit = None,
+               history = False):
+        model = AccessHistoryModel if history else AccessModel
+        query = self.filtered(user_id, resource_id, status, expires_at, model=model)
+        return keyset(query, model.id, cursor, limit).all()
 
-    def search(self, user_id = None, resource_id = None, status = None, expires_at = None):
+    def search_rows(self, user_id = None, resource_id = None, status = None, expires_at = None, cursor = None,
+                    limit = None, history = False):
+        model = AccessHistoryModel if history else AccessModel
+        query = self.filtered(user_id, resource_id, status, expires_at, columns=row_columns(model), model=model)
+        return keyset(query, model.id, cursor, limit).all()
 
-        query = self.database.query(AccessModel)
+    def stream(self, user_id = None, resource_id = None, status = None, expires_at = None, cursor = None,
+               history = False):
+        model = AccessHistoryModel if history else AccessModel
+        query = self.filtered(user_id, resource_id, status, expires_at, columns=row_columns(model), model=model)
+        return keyset(query, model.id, cursor).yield_per(STREAM_BATCH_SIZE)
+
+    def filtered(self, user_id = None, resource_id = None, status = None, expires_at = None, columns = None,
+                 model = AccessModel):
+
+        query = self.database.query(*(columns or (model,)))
 
         if user_id is not None:
-            query = query.filter(AccessModel.user_id == user_id)
+            query = query.filter(model.user_id == user_id)
         if resource_id is not None:
-            query = query.filter(AccessModel.resource_id == resource_id)
+            query = query.filter(model.resource_id == resource_id)
         if status is not None:
-            query = query.filter(AccessModel.status == status)
+            query = query.filter(self.effective_status_filter(status, datetime.now(timezone.utc), model))
         if expires_at is not None:
-            query = query.filter(AccessModel.expires_at <= expires_at)
+            query = query.filter(model.expires_at <= expires_at)
 
-        return query.all()
+        return query
 
     def get_by_id(self, access_id):
-        return self.database.query(AccessModel).filter(AccessModel.id == access_id).first()
+        access = self.database.query(AccessModel).filter(AccessModel.id == access_id).first()
+        if access is None:
+            access = self.get_archived(access_id)
+        return access
+
+    def get_archived(self, access_id):
+        return self.database.query(AccessHistoryModel).filter(AccessHistoryModel.id == access_id).first()
+
+    def create_access(self, create_data, status):
+        return insert_returning(
+            self.database,
+            AccessModel,
+            {
+                "user_id": create_data.user_id,
+                "resource_id": create_data.resource_id,
+                "expires_at": create_data.expires_at,
+                "status": status,
+                "comment": create_data.comment,
+            },
+            conflict=[AccessModel.user_id, AccessModel.resource_id],
+            conflict_where=AccessModel.status == AccessState.ACTIVE
+        )
+
+    def grant_state(self, user_id, resource_id):
+        active = and_(
+            AccessModel.user_id == user_id,
+            AccessModel.resource_id == resource_id,
+            AccessModel.status == AccessState.ACTIVE
+        )
+
+        return self.database.execute(select(
+            select(UserModel.is_active).where(UserModel.id == user_id).scalar_subquery(),
+            select(ResourcesModel.is_enabled).where(ResourcesModel.id == resource_id).scalar_subquery(),
+            select(AccessModel.id).where(active).limit(1).scalar_subquery(),
+            select(AccessModel.expires_at).where(active).limit(1).scalar_subquery(),
+        )).one()
 
-    def create_access(self, create_data):
+    def update_active(self, access_id, values, now):
+        return update_returning(
+            self.database,
+            AccessModel,
+            [AccessModel.id == access_id, self.effective_status_filter(AccessState.ACTIVE, now)],
+            values
+        )
 
-        access = AccessModel(
-            user_id=create_data.user_id,
-            resource_id=create_data.resource_id,
-            expires_at=create_data.expires_at,
-            status=create_data.status,
-            comment=create_data.comment
+    def delete_inactive(self, access_id, now):
+        return delete_returning(
+            self.database,
+            AccessModel,
+            [AccessModel.id == access_id, not_(self.effective_status_filter(AccessState.ACTIVE, now))]
         )
 
-        self.database.add(access)
+    def delete_archived(self, access_id):
+        return delete_returning(self.database, AccessHistoryModel, [AccessHistoryModel.id == access_id])
+
+    def archive(self, before, now, batch_size):
+        ids = self.database.scalars(
+            select(AccessModel.id)
+            .where(*self.ended(before))
+            .order_by(AccessModel.expires_at)
+            .limit(batch_size)
+            .with_for_update(skip_locked=True)
+        ).all()
+
+        self.move_to_history(ids, now)
+        return len(ids)
+
+    def move_to_history(self, ids, now):
+        if not ids:
+            return
+
+        active = AccessModel.status == AccessState.ACTIVE
+        self.database.execute(
+            insert(AccessHistoryModel).from_select(
+                [column.key for column in row_columns(AccessHistoryModel)] + ["archived_at"],
+                select(
+                    AccessModel.id,
+                    AccessModel.user_id,
+                    AccessModel.resource_id,
+                    AccessModel.granted_at,
+                    case((active, literal(now, AccessModel.expires_at.type)), else_=AccessModel.expires_at),
+                    case((active, literal(AccessState.REVOKED, AccessStateType())), else_=AccessModel.status),
+                    AccessModel.comment,
+                    literal(now, AccessHistoryModel.archived_at.type),
+                ).where(AccessModel.id.in_(ids))
+            )
+        )
+        self.database.execute(
+            delete(AccessModel).where(AccessModel.id.in_(ids)).execution_options(synchronize_session=False)
+        )
         self.database.flush()
-        return access
 
-    def update_access_status(self):
-        from models.accesses import AccessModel
-        from schemas.accesses import AccessStatus
-
-        query = self.database.query(AccessModel)
-        now = datetime.now()
-        query.filter(
-            (AccessModel.expires_at <= now) &
-            (AccessModel.status != AccessStatus.REVOKED) &
-            (AccessModel.status != AccessStatus.EXPIRED)).update(
-            {AccessModel.status: AccessStatus.EXPIRED},
+    @staticmethod
+    def held_by(user_id=None, resource_id=None):
+        criteria = []
+        if user_id is not None:
+            criteria.append(AccessModel.user_id == user_id)
+        if resource_id is not None:
+            criteria.append(AccessModel.resource_id == resource_id)
+        return criteria
+
+    @staticmethod
+    def held_active(user_id=None, resource_id=None):
+        return [*AccessesRepository.held_by(user_id, resource_id), AccessModel.status == AccessState.ACTIVE]
+
+    @staticmethod
+    def ended(before):
+        return [AccessModel.status != AccessState.ACTIVE, AccessModel.expires_at <= before]
+
+    @staticmethod
+    def due(now):
+        return [AccessModel.status == AccessState.ACTIVE, AccessModel.expires_at <= now]
+
+    @staticmethod
+    def invalid():
+        return [
+            AccessModel.status == AccessState.ACTIVE,
+            or_(
+                select(UserModel.id)
+                .where(UserModel.id == AccessModel.user_id, UserModel.is_active.is_(False))
+                .exists(),
+                select(ResourcesModel.id)
+                .where(ResourcesModel.id == AccessModel.resource_id, ResourcesModel.is_enabled.is_(False))
+                .exists(),
+            ),
+        ]
+
+    def count(self, criteria):
+        return self.database.scalar(select(func.count()).select_from(AccessModel).where(*criteria))
+
+    def revoke_held(self, now, limit, user_id=None, resource_id=None):
+        return self.revoke_where(self.held_active(user_id, resource_id), now, limit)
+
+    def revoke_invalid(self, now, limit):
+        return self.revoke_where(self.invalid(), now, limit)
+
+    def revoke_where(self, criteria, now, limit):
+        return update_many_returning(
+            self.database,
+            AccessModel,
+            criteria,
+            {"status": AccessState.REVOKED, "expires_at": now},
+            (AccessModel.id, AccessModel.user_id, AccessModel.resource_id),
+            limit
+        )
+
+    def archive_held(self, now, limit, user_id=None, resource_id=None):
+        rows = self.database.execute(
+            select(AccessModel.id, AccessModel.user_id, AccessModel.resource_id, AccessModel.status)
+            .where(*self.held_by(user_id, resource_id))
+            .limit(limit)
+            .with_for_update()
+        ).all()
+
+        self.move_to_history([access_id for access_id, *_ in rows], now)
+        return rows
+
+    def active_by_pairs(self, user_ids, resource_ids):
+        query = self.database.query(
+            AccessModel.id, AccessModel.user_id, AccessModel.resource_id, AccessModel.expires_at
+        ).filter(
+            AccessModel.user_id.in_(user_ids),
+            AccessModel.resource_id.in_(resource_ids),
+            AccessModel.status == AccessState.ACTIVE
+        )
+        return {(user_id, resource_id): (access_id, expires_at) for access_id, user_id, resource_id, expires_at in query}
+
+    def bulk_insert(self, rows):
+        self.database.execute(insert(AccessModel), rows)
+        self.database.flush()
+
+    def bulk_expire(self, access_ids, now):
+        rows = update_many_returning(
+            self.database,
+            AccessModel,
+            (AccessModel.id.in_(access_ids), *self.due(now)),
+            {"status": AccessState.EXPIRED},
+            (AccessModel.id,),
+            len(access_ids)
+        )
+        return {access_id for access_id, in rows}
+
+    def bulk_revoke(self, access_ids, now):
+        self.database.query(AccessModel).filter(AccessModel.id.in_(access_ids)).update(
+            {AccessModel.status: AccessState.REVOKED, AccessModel.expires_at: now},
             synchronize_session=False
         )
         self.database.flush()
 
+    def bulk_update(self, rows):
+        self.database.execute(update(AccessModel), rows)
+        self.database.flush()
+
+    @staticmethod
+    def effective_status_filter(status, now, model=AccessModel):
+        if status == AccessState.ACTIVE:
+            return and_(model.status == AccessState.ACTIVE,
+                        or_(model.expires_at.is_(None), model.expires_at > now))
+        if status == AccessState.EXPIRED:
+            return or_(model.status == AccessState.EXPIRED,
+                       and_(model.status == AccessState.ACTIVE, model.expires_at <= now))
+        return model.status == status
+
+    def expire_due(self, now, batch_size):
+        return update_many_returning(
+            self.database,
+            AccessModel,
+            self.due(now),
+            {"status": AccessState.EXPIRED},
+            (AccessModel.id, AccessModel.user_id, AccessModel.resource_id, AccessModel.expires_at),
+            batch_size
+        )
+
+    def effective_grants(self, user_id, now, resource_id=None):
+        direct = select(
+            AccessModel.resource_id.label("resource_id"),
+            AccessModel.expires_at.label("expires_at"),
+        ).where(
+            AccessModel.user_id == user_id,
+            self.effective_status_filter(AccessState.ACTIVE, now)
+        )
+        via_groups = select(
+            GroupGrantModel.resource_id.label("resource_id"),
+            GroupGrantModel.expires_at.label("expires_at"),
+        ).join(
+            GroupMemberModel, GroupMemberModel.group_id == GroupGrantModel.group_id
+        ).where(
+            GroupMemberModel.user_id == user_id,
+            or_(GroupGrantModel.expires_at.is_(None), GroupGrantModel.expires_at > now)
+        )
+        if resource_id is not None:
+            direct = direct.where(AccessModel.resource_id == resource_id)
+            via_groups = via_groups.where(GroupGrantModel.resource_id == resource_id)
+
+        paths = union_all(direct, via_groups).subquery()
+        return self.database.execute(
+            select(
+                paths.c.resource_id,
+                type_coerce(func.max(paths.c.expires_at), DateTime(timezone=True)).label("expires_at"),
+                func.min(case((paths.c.expires_at.is_(None), 0), else_=1)).label("bounded"),
+            )
+            .join(ResourcesModel, ResourcesModel.id == paths.c.resource_id)
+            .where(
+                ResourcesModel.is_enabled.is_(True),
+                select(UserModel.id).where(UserModel.id == user_id, UserModel.is_active.is_(True)).exists()
+            )
+            .group_by(paths.c.resource_id)
+        ).all()
+
+    def next_expiry(self):
+        return self.database.query(func.min(AccessModel.expires_at)).filter(
+            AccessModel.status == AccessState.ACTIVE
+        ).scalar()
+
     def delete(self, access_id):
         self.database.delete(access_id)
@@ -0,0 +1,74 @@
+from models.groups import GroupModel, GroupMemberModel, GroupGrantModel
+from core.pagination import keyset
+from sqlalchemy import func
+
+
+
+class GroupsRepository:
+
+    def __init__(self, database):
+        self.database = database
+
+    def get_all(self, cursor=None, limit=None):
+        return keyset(self.database.query(GroupModel), GroupModel.id, cursor, limit).all()
+
+    def get_by_id(self, group_id):
+        return self.database.query(GroupModel).filter(GroupModel.id == group_id).first()
+
+    def is_duplicate_name(self, name):
+        return self.database.query(
+            self.database.query(GroupModel).filter(func.lower(GroupModel.name) == name.lower()).exists()
+        ).scalar()
+
+    def create_group(self, create_data):
+
+        group = GroupModel(
+            name=create_data.name,
+            description=create_data.description
+        )
+
+        self.database.add(group)
+        self.database.flush()
+        return group
+
+    def delete(self, group):
+        self.database.query(GroupMemberModel).filter(GroupMemberModel.group_id == group.id).delete(
+            synchronize_session=False
+        )
+        self.database.query(GroupGrantModel).filter(GroupGrantModel.group_id == group.id).delete(
+            synchronize_session=False
+        )
+        self.database.delete(group)
+
+    def get_members(self, group_id, cursor=None, limit=None):
+        query = self.database.query(GroupMemberModel).filter(GroupMemberModel.group_id == group_id)
+        return keyset(query, GroupMemberModel.user_id, cursor, limit).all()
+
+    def get_member(self, group_id, user_id):
+        return self.database.get(GroupMemberModel, (group_id, user_id))
+
+    def add_member(self, group_id, user_id):
+        member = GroupMemberModel(group_id=group_id, user_id=user_id)
+        self.database.add(member)
+        self.database.flush()
+        return member
+
+    def get_grants(self, group_id):
+        return (
+            self.database.query(GroupGrantModel)
+            .filter(GroupGrantModel.group_id == group_id)
+            .order_by(GroupGrantModel.resource_id)
+            .all()
+        )
+
+    def get_grant(self, group_id, resource_id):
+        return self.database.get(GroupGrantModel, (group_id, resource_id))
+
+    def add_grant(self, group_id, resource_id, expires_at):
+        grant = GroupGrantModel(group_id=group_id, resource_id=resource_id, expires_at=expires_at)
+        self.database.add(grant)
+        self.database.flush()
+        return grant
+
+    def remove(self, row):
+        self.database.delete(row)
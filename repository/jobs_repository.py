@@ -0,0 +1,63 @@
+from models.jobs import JobModel, JobState, UNFINISHED_JOB_STATES
+from core.pagination import keyset
+from core.returning import insert_returning, update_returning
+from sqlalchemy import or_, and_, select
+
+
+
+class JobsRepository:
+
+    def __init__(self, database):
+        self.database = database
+
+    def get_all(self, status=None, kind=None, cursor=None, limit=None):
+        query = self.database.query(JobModel)
+
+        if status is not None:
+            query = query.filter(JobModel.status == status)
+        if kind is not None:
+            query = query.filter(JobModel.kind == kind)
+
+        return keyset(query, JobModel.id, cursor, limit).all()
+
+    def get_by_id(self, job_id):
+        return self.database.query(JobModel).filter(JobModel.id == job_id).first()
+
+    def create_job(self, kind, params):
+        return insert_returning(self.database, JobModel, {"kind": kind, "params": params, "status": JobState.QUEUED})
+
+    def cancel(self, job_id, now):
+        return update_returning(
+            self.database,
+            JobModel,
+            [JobModel.id == job_id, JobModel.status.in_(UNFINISHED_JOB_STATES)],
+            {"status": JobState.CANCELLED, "owner": None, "finished_at": now}
+        )
+
+    @staticmethod
+    def claimable(stale_before):
+        return or_(
+            JobModel.status == JobState.QUEUED,
+            and_(JobModel.status == JobState.RUNNING, JobModel.heartbeat_at < stale_before),
+        )
+
+    def pending(self, stale_before):
+        return self.database.scalars(
+            select(JobModel.id).where(self.claimable(stale_before)).order_by(JobModel.created_at)
+        ).all()
+
+    def claim(self, job_id, owner, now, stale_before):
+        return update_returning(
+            self.database,
+            JobModel,
+            [JobModel.id == job_id, self.claimable(stale_before)],
+            {"status": JobState.RUNNING, "owner": owner, "heartbeat_at": now}
+        )
+
+    def update_owned(self, job_id, owner, values):
+        return update_returning(
+            self.database,
+            JobModel,
+            [JobModel.id == job_id, JobModel.status == JobState.RUNNING, JobModel.owner == owner],
+            values
+        )
@@ -1,5 +1,8 @@
 
 from models.resources import ResourcesModel
+from core.pagination import keyset, STREAM_BATCH_SIZE
+from core.search import resources_search
+from core.returning import insert_returning, update_returning, delete_returning
 from sqlalchemy import func
 
 
@@ -9,31 +12,49 @@ class ResourcesRepository:
     def __init__(self, database):
         self.database = database
 
-    def get_all(self, name, is_enabled):
+    def get_all(self, name, is_enabled, cursor=None, limit=None):
+        return keyset(self.filtered(name, is_enabled), ResourcesModel.id, cursor, limit).all()
+
+    def stream(self, name, is_enabled, cursor=None):
+        return keyset(self.filtered(name, is_enabled), ResourcesModel.id, cursor).yield_per(STREAM_BATCH_SIZE)
+
+    def search(self, term, is_enabled, prefix, limit):
+        return resources_search.search(self.database, self.filtered(None, is_enabled), term, prefix, limit)
+
+    def filtered(self, name, is_enabled):
 
         query = self.database.query(ResourcesModel)
 
         if name:
-            query = self.database.query(ResourcesModel).filter(ResourcesModel.name.ilike(f"%{name}%"))
+            query = query.filter(ResourcesModel.name.ilike(f"%{name}%"))
         if is_enabled is not None:
-            query = self.database.query(ResourcesModel).filter(ResourcesModel.is_enabled == is_enabled)
+            query = query.filter(ResourcesModel.is_enabled == is_enabled)
 
-        return query.all()
+        return query
 
     def get_by_id(self, resource_id):
         return self.database.query(ResourcesModel).filter(ResourcesModel.id == resource_id).first()
 
-    def create_resource(self, create_data):
+    def get_enabled(self, resource_ids):
+        query = self.database.query(ResourcesModel.id, ResourcesModel.is_enabled).filter(
+            ResourcesModel.id.in_(resource_ids)
+        )
+        return {resource_id: is_enabled for resource_id, is_enabled in query}
 
-        resource = ResourcesModel(
-            name = create_data.name,
-            description = create_data.description,
-            is_enabled = create_data.is_enabled
+    def create_resource(self, create_data):
+        return insert_returning(
+            self.database,
+            ResourcesModel,
+            {
+                "name": create_data.name,
+                "description": create_data.description,
+                "is_enabled": create_data.is_enabled,
+            },
+            conflict=[ResourcesModel.name]
         )
 
-        self.database.add(resource)
-        self.database.flush()
-        return resource
+    def update_resource(self, resource_id, values):
+        return update_returning(self.database, ResourcesModel, [ResourcesModel.id == resource_id], values)
 
     def is_duplicate_name(self, name):
         if self.database.query(ResourcesModel).filter(func.lower(ResourcesModel.name) == name.lower()).first() is None:
@@ -41,4 +62,4 @@ class ResourcesRepository:
         return True
 
     def delete(self, resource_id):
-        self.database.delete(resource_id)
\ No newline at end of file
+        return delete_returning(self.database, ResourcesModel, [ResourcesModel.id == resource_id])
@@ -1,6 +1,9 @@
 
 from models.users import UserModel
-from sqlalchemy import or_
+from core.pagination import keyset, STREAM_BATCH_SIZE
+from core.search import users_search
+from core.returning import insert_returning, update_returning, delete_returning
+from sqlalchemy import or_, select
 
 
 
@@ -9,7 +12,16 @@ class UsersRepository:
     def __init__(self, database):
         self.database = database
 
-    def get_all(self, search, is_active):
+    def get_all(self, search, is_active, cursor=None, limit=None):
+        return keyset(self.filtered(search, is_active), UserModel.id, cursor, limit).all()
+
+    def stream(self, search, is_active, cursor=None):
+        return keyset(self.filtered(search, is_active), UserModel.id, cursor).yield_per(STREAM_BATCH_SIZE)
+
+    def search(self, term, is_active, prefix, limit):
+        return users_search.search(self.database, self.filtered(None, is_active), term, prefix, limit)
+
+    def filtered(self, search, is_active):
         query = self.database.query(UserModel)
 
         if search:
@@ -23,27 +35,41 @@ class UsersRepository:
         if is_active is not None:
             query = query.filter(UserModel.is_active == is_active)
 
-        return query.all()
+        return query
 
     def get_by_id(self, user_id):
         return self.database.query(UserModel).filter(UserModel.id == user_id).first()
 
+    def get_activity(self, user_ids):
+        query = self.database.query(UserModel.id, UserModel.is_active).filter(UserModel.id.in_(user_ids))
+        return {user_id: is_active for user_id, is_active in query}
+
     def get_by_email(self, email):
         return self.database.query(UserModel).filter(UserModel.email == email).first()
 
     def get_by_name(self, name):
         return self.database.query(UserModel).filter(UserModel.full_name == name).first()
 
+    def taken(self, email, name):
+        return self.database.execute(select(
+            select(UserModel.id).where(UserModel.email == email).exists(),
+            select(UserModel.id).where(UserModel.full_name == name).exists(),
+        )).one()
+
     def create_user(self, create_data):
-        user = UserModel(
-            email=create_data.email.strip(),
-            full_name=create_data.full_name.strip(),
-            is_active=create_data.is_active
+        return insert_returning(
+            self.database,
+            UserModel,
+            {
+                "email": create_data.email.strip(),
+                "full_name": create_data.full_name.strip(),
+                "is_active": create_data.is_active,
+            },
+            conflict=[UserModel.email]
         )
 
-        self.database.add(user)
-        self.database.flush()
-        return user
+    def update_user(self, user_id, values):
+        return update_returning(self.database, UserModel, [UserModel.id == user_id], values)
 
     def delete(self, user_id):
-        self.database.delete(user_id)
\ No newline at end of file
+        return delete_returning(self.database, UserModel, [UserModel.id == user_id])
@@ -1,10 +1,15 @@
 
-from typing import Optional, Annotated
+from typing import Optional, Annotated, List
 from datetime import datetime, timezone
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, model_validator, field_validator
 from uuid import UUID
 from enum import Enum
 
+from models.accesses import AccessState
+
+
+
+BULK_MAX_ITEMS = 10000
 
 
 class AccessStatus(str, Enum):
@@ -13,6 +18,44 @@ class AccessStatus(str, Enum):
     REVOKED = "Отозван"
 
 
+class AccessChangeOperation(str, Enum):
+    GRANT = "grant"
+    UPDATE = "update"
+    REVOKE = "revoke"
+    EXPIRE = "expire"
+    DELETE = "delete"
+
+
+STATUS_LABELS = {
+    AccessState.ACTIVE: AccessStatus.ACTIVE,
+    AccessState.EXPIRED: AccessStatus.EXPIRED,
+    AccessState.REVOKED: AccessStatus.REVOKED,
+}
+STATUS_STATES = {label: state for state, label in STATUS_LABELS.items()}
+
+
+def status_label(state):
+    return None if state is None else STATUS_LABELS[state]
+
+
+def status_state(label):
+    return None if label is None else STATUS_STATES[label]
+
+
+def effective_status(status, expires_at, now=None):
+    if status != AccessState.ACTIVE or expires_at is None:
+        return status
+    if expires_at.tzinfo is None:
+        expires_at = expires_at.replace(tzinfo=timezone.utc)
+    if expires_at <= (now or datetime.now(timezone.utc)):
+        return AccessState.EXPIRED
+    return status
+
+
+def label_status(value):
+    return STATUS_LABELS.get(value, value)
+
+
 class BaseAccess(BaseModel):
     model_config = {
         "from_attributes": True,
@@ -49,7 +92,72 @@ class ResponsesAccesses(BaseAccess):
     status: Annotated[AccessStatus, Field(title="Текущее состояние доступа")]
     comment: Annotated[Optional[str], Field("", title="Примечание администратора", max_length=2000)]
 
+    _label_status = field_validator("status", mode="before")(label_status)
+
+    @model_validator(mode="after")
+    def apply_expiry(self):
+        self.status = status_label(effective_status(status_state(self.status), self.expires_at))
+        return self
+
+
+class ResponseAccessChange(BaseAccess):
+    seq: Annotated[int, Field(title="Порядковый номер изменения")]
+    access_id: Annotated[Optional[UUID], Field(None, title="ID доступа")]
+    group_id: Annotated[Optional[UUID], Field(None, title="ID группы")]
+    user_id: Annotated[Optional[UUID], Field(None, title="ID владельца доступа")]
+    resource_id: Annotated[Optional[UUID], Field(None, title="ID ресурса")]
+    operation: Annotated[AccessChangeOperation, Field(title="Тип изменения")]
+    status: Annotated[Optional[AccessStatus], Field(None, title="Состояние доступа после изменения")]
+    expires_at: Annotated[Optional[datetime], Field(None, title="Дата/время истечения доступа")]
+    changed_at: Annotated[datetime, Field(title="Дата/время изменения")]
+
+    _label_status = field_validator("status", mode="before")(label_status)
+
 
 class ResponseDeleteAccesses(BaseAccess):
     id: Annotated[UUID, Field(title='ID доступа')]
     del_status: Annotated[str, Field('Удален', title='Статус удаления')]
+
+
+class ResponseAccessCheck(BaseAccess):
+    user_id: Annotated[UUID, Field(title="ID владельца доступа")]
+    resource_id: Annotated[UUID, Field(title="ID ресурса")]
+    allowed: Annotated[bool, Field(title="Признак наличия активного доступа")]
+    expires_at: Annotated[Optional[datetime], Field(None, title="Дата/время истечения доступа")]
+
+
+class ResponseEffectiveAccess(BaseAccess):
+    resource_id: Annotated[UUID, Field(title="ID ресурса")]
+    expires_at: Annotated[Optional[datetime], Field(None, title="Дата/время истечения доступа")]
+
+
+class BulkAccessKey(BaseAccess):
+    user_id: Annotated[UUID, Field(..., title="ID владельца доступа")]
+    resource_id: Annotated[UUID, Field(..., title="ID ресурса")]
+
+
+class BulkAccessExtend(BulkAccessKey):
+    expires_at: Annotated[datetime, Field(..., title="Новая дата/время истечения доступа")]
+
+
+class RequestsBulkGrant(BaseAccess):
+    items: Annotated[List[RequestsAccesses], Field(..., title="Выдаваемые доступы", min_length=1,
+                                                   max_length=BULK_MAX_ITEMS)]
+
+
+class RequestsBulkRevoke(BaseAccess):
+    items: Annotated[List[BulkAccessKey], Field(..., title="Отзываемые доступы", min_length=1,
+                                                max_length=BULK_MAX_ITEMS)]
+
+
+class RequestsBulkExtend(BaseAccess):
+    items: Annotated[List[BulkAccessExtend], Field(..., title="Продлеваемые доступы", min_length=1,
+                                                   max_length=BULK_MAX_ITEMS)]
+
+
+class ResponseBulkAccessItem(BaseAccess):
+    user_id: Annotated[UUID, Field(title="ID владельца доступа")]
+    resource_id: Annotated[UUID, Field(title="ID ресурса")]
+    access_id: Annotated[Optional[UUID], Field(None, title="ID доступа")]
+    status_code: Annotated[int, Field(title="Код результата операции")]
+    detail: Annotated[Optional[str], Field(None, title="Описание ошибки")]
@@ -0,0 +1,16 @@
+from typing import Annotated
+from pydantic import BaseModel, Field, ConfigDict
+
+
+
+class BaseCache(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+
+class ResponseCacheStats(BaseCache):
+    name: Annotated[str, Field(title='Название кэша')]
+    size: Annotated[int, Field(title='Количество записей')]
+    maxsize: Annotated[int, Field(title='Максимальное количество записей')]
+    hits: Annotated[int, Field(title='Количество попаданий')]
+    misses: Annotated[int, Field(title='Количество промахов')]
+    evictions: Annotated[int, Field(title='Количество вытеснений')]
@@ -0,0 +1,51 @@
+from typing import Annotated, Optional
+from datetime import datetime, timezone
+from pydantic import BaseModel, Field, ConfigDict
+from uuid import UUID
+
+
+
+class BaseGroups(BaseModel):
+    model_config = ConfigDict(
+        from_attributes=True,
+        json_encoders={
+            datetime: lambda v: (
+                v.astimezone(timezone.utc)
+                .isoformat(timespec="seconds")
+                .replace("+00:00", "Z")
+            )
+        }
+    )
+
+
+class RequestsGroups(BaseGroups):
+    name: Annotated[str, Field(..., title='Название группы', min_length=2, max_length=100)]
+    description: Annotated[str, Field("", title='Описание группы', max_length=2000)]
+
+
+class ResponsesGroups(BaseGroups):
+    id: Annotated[UUID, Field(title='ID группы')]
+    name: Annotated[str, Field(title='Название группы')]
+    description: Annotated[Optional[str], Field("", title='Описание группы')]
+
+
+class ResponseDeleteGroups(BaseGroups):
+    id: Annotated[UUID, Field(title='ID группы')]
+    del_status: Annotated[str, Field('Удален', title='Статус удаления')]
+
+
+class ResponsesGroupMember(BaseGroups):
+    group_id: Annotated[UUID, Field(title='ID группы')]
+    user_id: Annotated[UUID, Field(title='ID пользователя')]
+
+
+class RequestsGroupGrant(BaseGroups):
+    resource_id: Annotated[UUID, Field(..., title='ID ресурса')]
+    expires_at: Annotated[Optional[datetime], Field(None, title='Дата/время истечения доступа группы')]
+
+
+class ResponsesGroupGrant(BaseGroups):
+    group_id: Annotated[UUID, Field(title='ID группы')]
+    resource_id: Annotated[UUID, Field(title='ID ресурса')]
+    granted_at: Annotated[Optional[datetime], Field(None, title='Дата/время выдачи доступа группе')]
+    expires_at: Annotated[Optional[datetime], Field(None, title='Дата/время истечения доступа группы')]
@@ -0,0 +1,51 @@
+from typing import Optional, Annotated
+from datetime import datetime, timezone
+from pydantic import BaseModel, Field, model_validator
+from uuid import UUID
+
+from models.jobs import JobKind, JobState
+
+
+
+class BaseJob(BaseModel):
+    model_config = {
+        "from_attributes": True,
+        "json_encoders": {
+            datetime: lambda v: (
+                v.astimezone(timezone.utc)
+                .isoformat(timespec="seconds")
+                .replace("+00:00", "Z")
+            )
+        }
+    }
+
+
+class RequestsJobs(BaseJob):
+    kind: Annotated[JobKind, Field(..., title="Тип задачи")]
+    user_id: Annotated[Optional[UUID], Field(None, title="ID пользователя, доступы которого отзываются")]
+    resource_id: Annotated[Optional[UUID], Field(None, title="ID ресурса, доступы к которому отзываются")]
+    archive_after: Annotated[Optional[float], Field(None, title="Архивировать доступы, завершившиеся раньше, секунд назад",
+                                                    ge=0)]
+
+    @model_validator(mode="after")
+    def check_params(self):
+        if self.kind == JobKind.REVOKE and self.user_id is None and self.resource_id is None:
+            raise ValueError("Для отзыва доступов укажите user_id или resource_id")
+        return self
+
+    def params(self):
+        return self.model_dump(mode="json", exclude={"kind"}, exclude_none=True)
+
+
+class ResponsesJobs(BaseJob):
+    id: Annotated[UUID, Field(title="ID задачи")]
+    kind: Annotated[JobKind, Field(title="Тип задачи")]
+    params: Annotated[dict, Field(title="Параметры задачи")]
+    status: Annotated[JobState, Field(title="Состояние задачи")]
+    total: Annotated[Optional[int], Field(None, title="Количество записей к обработке на момент запуска")]
+    processed: Annotated[int, Field(title="Количество обработанных записей")]
+    chunks: Annotated[int, Field(title="Количество выполненных транзакций")]
+    error: Annotated[Optional[str], Field(None, title="Описание ошибки")]
+    created_at: Annotated[datetime, Field(title="Дата/время создания задачи")]
+    started_at: Annotated[Optional[datetime], Field(None, title="Дата/время запуска задачи")]
+    finished_at: Annotated[Optional[datetime], Field(None, title="Дата/время завершения задачи")]
@@ -0,0 +1,23 @@
+from typing import Annotated
+from pydantic import BaseModel, Field, ConfigDict
+from enum import Enum
+
+
+
+class SnapshotTable(str, Enum):
+    USERS = "users"
+    RESOURCES = "resources"
+    GROUPS = "groups"
+    GROUP_MEMBERS = "group_members"
+    GROUP_GRANTS = "group_grants"
+    ACCESSES = "accesses"
+    ACCESS_HISTORY = "access_history"
+
+
+class BaseSnapshot(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+
+class ResponseSnapshotImport(BaseSnapshot):
+    table: Annotated[SnapshotTable, Field(title='Таблица')]
+    rows: Annotated[int, Field(title='Количество загруженных строк')]
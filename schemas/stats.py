@@ -0,0 +1,42 @@
+from typing import Annotated, Optional, List
+from datetime import datetime
+from pydantic import BaseModel, Field, ConfigDict
+from uuid import UUID
+
+from schemas.accesses import AccessStatus
+
+
+
+class BaseStats(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+
+class ResponseStatusCount(BaseStats):
+    status: Annotated[AccessStatus, Field(title='Состояние доступа')]
+    count: Annotated[int, Field(title='Количество доступов')]
+
+
+class ResponseResourceCount(BaseStats):
+    resource_id: Annotated[UUID, Field(title='ID ресурса')]
+    count: Annotated[int, Field(title='Количество доступов')]
+
+
+class ResponseExpiryBucket(BaseStats):
+    from_days: Annotated[int, Field(title='Начало интервала, дней от текущего момента')]
+    to_days: Annotated[Optional[int], Field(None, title='Конец интервала, дней от текущего момента')]
+    count: Annotated[int, Field(title='Количество активных доступов, истекающих в интервале')]
+
+
+class ResponseResourceHolder(BaseStats):
+    user_id: Annotated[UUID, Field(title='ID пользователя')]
+    expires_at: Annotated[Optional[datetime], Field(None, title='Дата/время истечения последнего из доступов')]
+    direct: Annotated[bool, Field(title='Признак прямого доступа')]
+    via_groups: Annotated[bool, Field(title='Признак доступа через группы')]
+
+
+class ResponseResourceHolders(BaseStats):
+    resource_id: Annotated[UUID, Field(title='ID ресурса')]
+    total: Annotated[int, Field(title='Количество пользователей с доступом')]
+    direct: Annotated[int, Field(title='Количество пользователей с прямым доступом')]
+    via_groups: Annotated[int, Field(title='Количество пользователей с доступом через группы')]
+    holders: Annotated[List[ResponseResourceHolder], Field(title='Пользователи с доступом')]
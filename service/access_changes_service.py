@@ -0,0 +1,62 @@
+from fastapi.concurrency import run_in_threadpool
+
+import time
+
+from repository.access_changes_repository import AccessChangesRepository
+from core.change_feed import change_feed, CHANGE_FEED_HEARTBEAT
+from core.database import session_local
+from schemas.accesses import ResponseAccessChange
+
+
+
+
+class AccessChangesService:
+
+    def __init__(self, db):
+        self.db = db
+        self.repo = AccessChangesRepository(db)
+
+    def since(self, seq, limit):
+        return [ResponseAccessChange.model_validate(change) for change in self.repo.since(seq, limit)]
+
+    def last_seq(self):
+        return self.repo.last_seq()
+
+
+def read_changes(seq, limit):
+    db = session_local()
+    try:
+        return AccessChangesService(db).since(seq, limit)
+    finally:
+        db.close()
+
+
+async def poll_changes(seq, limit, wait):
+    deadline = time.monotonic() + wait
+
+    while True:
+        with change_feed.waiter() as waiter:
+            changes = await run_in_threadpool(read_changes, seq, limit)
+            remaining = deadline - time.monotonic()
+            if changes or remaining <= 0:
+                return changes
+            await waiter.wait(remaining)
+
+
+async def change_events(seq, limit, is_disconnected):
+    heartbeat_at = time.monotonic() + CHANGE_FEED_HEARTBEAT
+
+    while not await is_disconnected():
+        with change_feed.waiter() as waiter:
+            changes = await run_in_threadpool(read_changes, seq, limit)
+            for change in changes:
+                yield f"id: {change.seq}\nevent: access_change\ndata: {change.model_dump_json()}\n\n"
+                seq = change.seq
+
+            if changes:
+                heartbeat_at = time.monotonic() + CHANGE_FEED_HEARTBEAT
+                continue
+            if time.monotonic() >= heartbeat_at:
+                yield ": keep-alive\n\n"
+                heartbeat_at = time.monotonic() + CHANGE_FEED_HEARTBEAT
+            await waiter.wait(heartbeat_at - time.monotonic())
@@ -1,9 +1,45 @@
 
 from fastapi import HTTPException
+from sqlalchemy.exc import IntegrityError
 
 from repository.accesses_repository import AccessesRepository
-from schemas.accesses import AccessStatus
+from repository.access_changes_repository import AccessChangesRepository
+from repository.resources_repository import ResourcesRepository
+from repository.users_repository import UsersRepository
+from core.access_index import access_index, as_utc
+from core.change_feed import change_feed
+from core.database import session_local
+from models.accesses import AccessState
+from schemas.accesses import AccessChangeOperation, effective_status, status_state
 from datetime import timezone, datetime
+import os
+import uuid
+
+
+
+
+ACCESS_CASCADE_CHUNK_SIZE = int(os.getenv("ACCESS_CASCADE_CHUNK_SIZE", "1000"))
+
+
+def bulk_result(item, access_id=None, status_code=200, detail=None):
+    return {
+        "user_id": item.user_id,
+        "resource_id": item.resource_id,
+        "access_id": access_id,
+        "status_code": status_code,
+        "detail": detail,
+    }
+
+
+def access_change(operation, access_id, user_id, resource_id, status, expires_at):
+    return {
+        "access_id": access_id,
+        "user_id": user_id,
+        "resource_id": resource_id,
+        "operation": operation,
+        "status": status,
+        "expires_at": expires_at,
+    }
 
 
 class AccessesService:
@@ -11,6 +47,7 @@ class AccessesService:
     def __init__(self, db):
         self.db = db
         self.repo = AccessesRepository(db)
+        self.changes = AccessChangesRepository(db)
 
     def get_by_id(self, access_id):
         access = self.repo.get_by_id(access_id)
@@ -18,88 +55,350 @@ class AccessesService:
             raise HTTPException(status_code=404, detail=f"Доступ с указанным ID не найден")
         return access
 
-    def search(self, *, user_id = None, resource_id = None, status = None, expires_at = None):
-        return self.repo.search(user_id, resource_id, status, expires_at)
+    def search(self, *, user_id = None, resource_id = None, status = None, expires_at = None, cursor = None, limit = None,
+               history = False):
+        return self.repo.search(user_id, resource_id, status, expires_at, cursor, limit, history)
+
+    def search_rows(self, *, user_id = None, resource_id = None, status = None, expires_at = None, cursor = None,
+                    limit = None, history = False):
+        return self.repo.search_rows(user_id, resource_id, status, expires_at, cursor, limit, history)
+
+    def stream(self, *, user_id = None, resource_id = None, status = None, expires_at = None, cursor = None,
+               history = False):
+        return self.repo.stream(user_id, resource_id, status, expires_at, cursor, history)
+
+    def expire_due(self, batch_size):
+        expired = self.expire_chunk(batch_size)
+        self.db.commit()
+
+        if expired:
+            change_feed.notify()
+        return len(expired)
+
+    def expire_chunk(self, batch_size):
+        expired = self.repo.expire_due(datetime.now(timezone.utc), batch_size)
+        self.changes.record([
+            access_change(AccessChangeOperation.EXPIRE, access_id, user_id, resource_id, AccessState.EXPIRED, expires_at)
+            for access_id, user_id, resource_id, expires_at in expired
+        ])
+        return expired
+
+    def effective_grants(self, user_id, resource_id=None):
+        rows = self.repo.effective_grants(user_id, datetime.now(timezone.utc), resource_id)
+        return sorted(
+            ((row.resource_id, as_utc(row.expires_at) if row.bounded else None) for row in rows),
+            key=lambda grant: str(grant[0])
+        )
+
+    def next_expiry(self):
+        return self.repo.next_expiry()
 
-    def update_access_status(self):
-        self.repo.update_access_status()
+    def archive_ended(self, retention, batch_size):
+        archived = self.archive_ended_chunk(retention, batch_size)
+        self.db.commit()
+        return archived
+
+    def archive_ended_chunk(self, retention, batch_size):
+        now = datetime.now(timezone.utc)
+        return self.repo.archive(now - retention, now, batch_size)
+
+    def revoke_chunk(self, user_id=None, resource_id=None, limit=ACCESS_CASCADE_CHUNK_SIZE):
+        now = datetime.now(timezone.utc)
+        return self.revoked(self.repo.revoke_held(now, limit, user_id, resource_id), now)
+
+    def revoke_invalid_chunk(self, limit):
+        now = datetime.now(timezone.utc)
+        return self.revoked(self.repo.revoke_invalid(now, limit), now)
+
+    def revoked(self, rows, now):
+        self.changes.record([
+            access_change(AccessChangeOperation.REVOKE, access_id, holder_id, held_id, AccessState.REVOKED, now)
+            for access_id, holder_id, held_id in rows
+        ])
+        return rows
 
-    def is_duplicate_access(self, *, user_id, resource_id):
-        accesses = self.repo.search(user_id=user_id)
+    def archive_chunk(self, user_id=None, resource_id=None):
+        now = datetime.now(timezone.utc)
+        moved = self.repo.archive_held(now, ACCESS_CASCADE_CHUNK_SIZE, user_id, resource_id)
+        self.changes.record([
+            access_change(AccessChangeOperation.REVOKE, access_id, holder_id, held_id, AccessState.REVOKED, now)
+            for access_id, holder_id, held_id, status in moved if status == AccessState.ACTIVE
+        ])
+        return moved
+
+    def released(self, rows):
+        for _, holder_id, held_id, *_ in rows:
+            access_index.discard(holder_id, held_id)
+        if rows:
+            change_feed.notify()
 
-        for access in accesses:
-            if access.resource_id == resource_id:
-                raise HTTPException(status_code=400,
-                                    detail=f"Для указанного пользователя уже имеется доступ к данному ресурсу.")
+    def cascade_revoke(self, revoked, user_id=None, resource_id=None):
+        self.released(revoked)
+        while len(revoked) >= ACCESS_CASCADE_CHUNK_SIZE:
+            revoked = self.revoke_chunk(user_id, resource_id)
+            self.db.commit()
+            self.released(revoked)
+
+    def archive_held(self, user_id=None, resource_id=None):
+        moved = self.archive_chunk(user_id, resource_id)
+        while len(moved) >= ACCESS_CASCADE_CHUNK_SIZE:
+            self.db.commit()
+            self.released(moved)
+            moved = self.archive_chunk(user_id, resource_id)
+        return moved
 
     def create_access(self, create_data):
         granted_at = datetime.now(timezone.utc)
+        user_id, resource_id = create_data.user_id, create_data.resource_id
+
+        is_active, is_enabled, active_id, active_expires_at = self.repo.grant_state(user_id, resource_id)
+        if is_active is None:
+            raise HTTPException(status_code=404, detail=f"Пользователь с указанным ID не найден")
+        if not is_active:
+            raise HTTPException(status_code=422, detail=f"Пользователь с указанным ID неактивен")
+        if is_enabled is None:
+            raise HTTPException(status_code=404, detail="Ресурс с указанным ID не найден")
+        if not is_enabled:
+            raise HTTPException(status_code=422, detail="Ресурс с указанным ID неактивен")
+        if active_id is not None and \
+                effective_status(AccessState.ACTIVE, active_expires_at, granted_at) == AccessState.ACTIVE:
+            raise HTTPException(status_code=400,
+                                detail=f"Для указанного пользователя уже имеется доступ к данному ресурсу.")
 
-        if create_data.expires_at.tzinfo is None:
-            create_data.expires_at = create_data.expires_at.replace(tzinfo=timezone.utc)
+        create_data.expires_at = as_utc(create_data.expires_at)
         if create_data.expires_at <= granted_at:
             raise HTTPException(status_code=400,
                                 detail="Дата окончания не может быть раньше или равна дате выдачи доступа")
 
-        access = self.repo.create_access(create_data)
+        changes = []
+        if active_id is not None and self.repo.bulk_expire([active_id], granted_at):
+            changes.append(access_change(AccessChangeOperation.EXPIRE, active_id, user_id, resource_id,
+                                         AccessState.EXPIRED, active_expires_at))
+
+        try:
+            access = self.repo.create_access(create_data, status_state(create_data.status))
+        except IntegrityError:
+            access = None
+        if access is None:
+            self.db.rollback()
+            raise HTTPException(status_code=400,
+                                detail=f"Для указанного пользователя уже имеется доступ к данному ресурсу.")
 
+        changes.append(access_change(AccessChangeOperation.GRANT, access.id, user_id, resource_id,
+                                     access.status, access.expires_at))
+        self.changes.record(changes)
         self.db.commit()
-        self.db.refresh(access)
+
+        access_index.put(access.user_id, access.resource_id, access.status, access.expires_at)
+        change_feed.notify()
         return access
 
     def update_access(self, *, access_id, update_data):
-        access = self.repo.get_by_id(access_id)
         now = datetime.now(timezone.utc)
+        values = {}
+        expires_at = as_utc(update_data.expires_at)
+        status = status_state(update_data.status)
 
-        if access is None:
-            raise HTTPException(status_code=404, detail=f"Доступ с указанным ID не найден")
-        if access.status != AccessStatus.ACTIVE:
-            raise HTTPException(status_code=400, detail=f"Статус доступа не активен, внести изменения невозможно")
-
-        if update_data.status is not None:
-            if update_data.status == AccessStatus.REVOKED:
-                access.expires_at = now
-            if access.status == AccessStatus.ACTIVE and update_data.status == AccessStatus.EXPIRED:
-                if update_data.expires_at > now:
-                    raise HTTPException(status_code=400, detail="Текущий статус нельзя перевести в истекший")
-            if access.status == AccessStatus.EXPIRED and update_data.status == AccessStatus.ACTIVE:
-                raise HTTPException(status_code=400, detail="Нельзя активировать истекший доступ")
-            if access.status == AccessStatus.REVOKED and update_data.status == AccessStatus.ACTIVE:
-                raise HTTPException(status_code=400, detail="Текущий статус нельзя перевести в активный")
-            if access.status == AccessStatus.EXPIRED and update_data.status == AccessStatus.REVOKED:
-                raise HTTPException(status_code=400, detail="Текущий статус нельзя перевести в отозван")
-            access.status = update_data.status
-
-        if update_data.expires_at is not None:
-            if update_data.expires_at.tzinfo is None:
-                update_data.expires_at = update_data.expires_at.replace(tzinfo=timezone.utc)
-            if update_data.expires_at < now and update_data.status == AccessStatus.ACTIVE:
+        if status is not None:
+            if status == AccessState.REVOKED:
+                values["expires_at"] = now
+            if status == AccessState.EXPIRED and expires_at is not None and expires_at > now:
+                raise HTTPException(status_code=400, detail="Текущий статус нельзя перевести в истекший")
+            values["status"] = status
+
+        if expires_at is not None:
+            if expires_at < now and status == AccessState.ACTIVE:
                 raise HTTPException(
                     status_code=400,
                     detail="При указанном статусе дата окончания не может быть раньше текущей даты"
                 )
-            if update_data.expires_at.tzinfo is None:
-                update_data.expires_at = update_data.expires_at.replace(tzinfo=timezone.utc)
-            access.expires_at = update_data.expires_at
+            values["expires_at"] = expires_at
 
         if update_data.comment is not None:
-            access.comment = update_data.comment
+            values["comment"] = update_data.comment
+
+        access = self.repo.update_active(access_id, values, now) if values else None
+        if access is None:
+            current = self.repo.get_by_id(access_id)
+            if current is None:
+                raise HTTPException(status_code=404, detail=f"Доступ с указанным ID не найден")
+            if effective_status(current.status, current.expires_at, now) != AccessState.ACTIVE:
+                raise HTTPException(status_code=400, detail=f"Статус доступа не активен, внести изменения невозможно")
+            return current
+
+        if access.status == AccessState.REVOKED:
+            operation = AccessChangeOperation.REVOKE
+        elif access.status == AccessState.EXPIRED:
+            operation = AccessChangeOperation.EXPIRE
+        else:
+            operation = AccessChangeOperation.UPDATE
+        self.changes.record([access_change(operation, access.id, access.user_id, access.resource_id,
+                                           access.status, access.expires_at)])
 
         self.db.commit()
-        self.db.refresh(access)
+        access_index.put(access.user_id, access.resource_id, access.status, access.expires_at)
+        change_feed.notify()
         return access
 
     def delete_access(self, access_id):
-        access = self.repo.get_by_id(access_id)
+        access = self.repo.delete_inactive(access_id, datetime.now(timezone.utc))
+        if access is None:
+            access = self.repo.delete_archived(access_id)
 
         if access is None:
-            raise HTTPException(status_code=404, detail="Доступ с указанным ID не найден")
-        if access.status == AccessStatus.ACTIVE:
+            if self.repo.get_by_id(access_id) is None:
+                raise HTTPException(status_code=404, detail="Доступ с указанным ID не найден")
             raise HTTPException(status_code=409, detail='Нельзя удалить активный доступ')
 
-        self.repo.delete(access)
+        self.changes.record([access_change(AccessChangeOperation.DELETE, access.id, access.user_id, access.resource_id,
+                                           None, access.expires_at)])
         self.db.commit()
+        change_feed.notify()
 
         return access
 
+    def bulk_grant(self, items):
+        now = datetime.now(timezone.utc)
+        user_ids = {item.user_id for item in items}
+        resource_ids = {item.resource_id for item in items}
+
+        users = UsersRepository(self.db).get_activity(user_ids)
+        resources = ResourcesRepository(self.db).get_enabled(resource_ids)
+        active = self.repo.active_by_pairs(user_ids, resource_ids)
+
+        taken = set()
+        lapsed = {}
+        changes = []
+        for key, (access_id, expires_at) in active.items():
+            if effective_status(AccessState.ACTIVE, expires_at, now) == AccessState.ACTIVE:
+                taken.add(key)
+            else:
+                lapsed[access_id] = (key, expires_at)
+
+        results = []
+        rows = []
+        for item in items:
+            key = (item.user_id, item.resource_id)
+            expires_at = as_utc(item.expires_at)
+
+            if item.user_id not in users:
+                results.append(bulk_result(item, status_code=404, detail="Пользователь с указанным ID не найден"))
+            elif not users[item.user_id]:
+                results.append(bulk_result(item, status_code=422, detail="Пользователь с указанным ID неактивен"))
+            elif item.resource_id not in resources:
+                results.append(bulk_result(item, status_code=404, detail="Ресурс с указанным ID не найден"))
+            elif not resources[item.resource_id]:
+                results.append(bulk_result(item, status_code=422, detail="Ресурс с указанным ID неактивен"))
+            elif expires_at <= now:
+                results.append(bulk_result(item, status_code=400,
+                                           detail="Дата окончания не может быть раньше или равна дате выдачи доступа"))
+            elif key in taken:
+                results.append(bulk_result(item, status_code=400,
+                                           detail="Для указанного пользователя уже имеется доступ к данному ресурсу."))
+            else:
+                taken.add(key)
+                row = {
+                    "id": uuid.uuid4(),
+                    "user_id": item.user_id,
+                    "resource_id": item.resource_id,
+                    "expires_at": expires_at,
+                    "status": status_state(item.status),
+                    "comment": item.comment,
+                }
+                rows.append(row)
+                changes.append(access_change(AccessChangeOperation.GRANT, row["id"], item.user_id, item.resource_id,
+                                             row["status"], expires_at))
+                results.append(bulk_result(item, access_id=row["id"]))
+
+        try:
+            if lapsed:
+                changes[:0] = [
+                    access_change(AccessChangeOperation.EXPIRE, access_id, *lapsed[access_id][0], AccessState.EXPIRED,
+                                  lapsed[access_id][1])
+                    for access_id in self.repo.bulk_expire(list(lapsed), now)
+                ]
+            if rows:
+                self.repo.bulk_insert(rows)
+            self.changes.record(changes)
+            self.db.commit()
+        except IntegrityError:
+            self.db.rollback()
+            raise HTTPException(status_code=409,
+                                detail="Пакет конфликтует с параллельно выданными доступами, повторите запрос")
+
+        for row in rows:
+            access_index.put(row["user_id"], row["resource_id"], row["status"], row["expires_at"])
+        if changes:
+            change_feed.notify()
+        return results
+
+    def bulk_revoke(self, items):
+        now = datetime.now(timezone.utc)
+        active = self.repo.active_by_pairs({item.user_id for item in items}, {item.resource_id for item in items})
+
+        results = []
+        revoked = {}
+        for item in items:
+            key = (item.user_id, item.resource_id)
+            if key in revoked:
+                results.append(bulk_result(item, access_id=revoked[key]))
+            elif key in active and effective_status(AccessState.ACTIVE, active[key][1], now) == AccessState.ACTIVE:
+                revoked[key] = active[key][0]
+                results.append(bulk_result(item, access_id=revoked[key]))
+            else:
+                results.append(bulk_result(item, status_code=404, detail="Активный доступ не найден"))
+
+        if revoked:
+            self.repo.bulk_revoke(list(revoked.values()), now)
+            self.changes.record([
+                access_change(AccessChangeOperation.REVOKE, access_id, *key, AccessState.REVOKED, now)
+                for key, access_id in revoked.items()
+            ])
+        self.db.commit()
+
+        for user_id, resource_id in revoked:
+            access_index.discard(user_id, resource_id)
+        if revoked:
+            change_feed.notify()
+        return results
+
+    def bulk_extend(self, items):
+        now = datetime.now(timezone.utc)
+        active = self.repo.active_by_pairs({item.user_id for item in items}, {item.resource_id for item in items})
+
+        results = []
+        extended = {}
+        for item in items:
+            key = (item.user_id, item.resource_id)
+            expires_at = as_utc(item.expires_at)
+
+            if key not in active or effective_status(AccessState.ACTIVE, active[key][1], now) != AccessState.ACTIVE:
+                results.append(bulk_result(item, status_code=404, detail="Активный доступ не найден"))
+            elif expires_at <= now:
+                results.append(bulk_result(item, status_code=400,
+                                           detail="При указанном статусе дата окончания не может быть раньше текущей даты"))
+            else:
+                extended[key] = {"id": active[key][0], "expires_at": expires_at}
+                results.append(bulk_result(item, access_id=active[key][0]))
+
+        if extended:
+            self.repo.bulk_update(list(extended.values()))
+            self.changes.record([
+                access_change(AccessChangeOperation.UPDATE, row["id"], *key, AccessState.ACTIVE, row["expires_at"])
+                for key, row in extended.items()
+            ])
+        self.db.commit()
+
+        for (user_id, resource_id), row in extended.items():
+            access_index.put(user_id, resource_id, AccessState.ACTIVE, row["expires_at"])
+        if extended:
+            change_feed.notify()
+        return results
+
 
+def read_effective_grants(user_id, resource_id=None):
+    db = session_local()
+    try:
+        return AccessesService(db).effective_grants(user_id, resource_id)
+    finally:
+        db.close()
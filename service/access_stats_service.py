@@ -0,0 +1,73 @@
+from repository.access_stats_repository import AccessStatsRepository
+from service.resources_service import ResourcesService
+from core.access_index import as_utc
+from core.cache import access_stats_cache
+from core.pagination import split_page
+from models.accesses import AccessState
+from schemas.accesses import status_label
+from schemas.stats import ResponseStatusCount, ResponseResourceCount, ResponseExpiryBucket, ResponseResourceHolder, \
+    ResponseResourceHolders
+from datetime import datetime, timezone
+import os
+
+
+
+
+EXPIRY_BUCKET_DAYS = tuple(int(days) for days in os.getenv("EXPIRY_BUCKET_DAYS", "1,7,30,90").split(","))
+
+
+class AccessStatsService:
+
+    def __init__(self, db):
+        self.db = db
+        self.repo = AccessStatsRepository(db)
+
+    def cached(self, key, loader):
+        return access_stats_cache.get_or_load(key, loader)
+
+    def status_counts(self, *, resource_id=None, history=False):
+        def load():
+            counts = dict(self.repo.status_counts(datetime.now(timezone.utc), resource_id, history))
+            return [ResponseStatusCount(status=status_label(state), count=counts.get(state, 0)) for state in AccessState]
+
+        return self.cached(("status", resource_id, history), load)
+
+    def resource_counts(self, *, status, limit):
+        def load():
+            return [
+                ResponseResourceCount(resource_id=resource_id, count=count)
+                for resource_id, count in self.repo.resource_counts(datetime.now(timezone.utc), status, limit)
+            ]
+
+        return self.cached(("resources", status, limit), load)
+
+    def expiry_buckets(self, *, resource_id=None, days=EXPIRY_BUCKET_DAYS):
+        days = tuple(sorted({day for day in days if day > 0}))
+
+        def load():
+            counts = self.repo.expiry_buckets(datetime.now(timezone.utc), days, resource_id)
+            bounds = (0,) + days
+            return [
+                ResponseExpiryBucket(from_days=bounds[index], to_days=days[index] if index < len(days) else None,
+                                     count=counts.get(index, 0))
+                for index in range(len(bounds))
+            ]
+
+        return self.cached(("expiry", resource_id, days), load)
+
+    def resource_holders(self, *, resource_id, cursor=None, limit=None):
+        ResourcesService(self.db).get_by_id(resource_id)
+
+        def load():
+            now = datetime.now(timezone.utc)
+            total, direct, via_groups = self.repo.holder_counts(resource_id, now)
+            rows, next_cursor = split_page(self.repo.holders(resource_id, now, cursor, limit), limit, "user_id")
+            holders = [
+                ResponseResourceHolder(user_id=row.user_id, expires_at=as_utc(row.expires_at) if row.bounded else None,
+                                       direct=bool(row.direct), via_groups=not row.only_direct)
+                for row in rows
+            ]
+            return ResponseResourceHolders(resource_id=resource_id, total=total, direct=direct,
+                                           via_groups=via_groups, holders=holders), next_cursor
+
+        return self.cached(("holders", resource_id, cursor, limit), load)
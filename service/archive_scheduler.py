@@ -0,0 +1,81 @@
+from datetime import datetime, timedelta, timezone
+import asyncio
+import logging
+import os
+
+from core.database import session_local
+from core.migrations import ensure_history_partitions, month_bounds
+from service.access_service import AccessesService
+
+
+
+
+ACCESS_ARCHIVE_INTERVAL = float(os.getenv("ACCESS_ARCHIVE_INTERVAL", "300"))
+ACCESS_ARCHIVE_BATCH_SIZE = int(os.getenv("ACCESS_ARCHIVE_BATCH_SIZE", "1000"))
+ACCESS_ARCHIVE_AFTER = float(os.getenv("ACCESS_ARCHIVE_AFTER", "86400"))
+
+logger = logging.getLogger(__name__)
+
+
+class ArchiveScheduler:
+
+    def __init__(self, interval=ACCESS_ARCHIVE_INTERVAL, batch_size=ACCESS_ARCHIVE_BATCH_SIZE,
+                 retention=ACCESS_ARCHIVE_AFTER):
+        self.interval = interval
+        self.batch_size = batch_size
+        self.retention = timedelta(seconds=retention)
+        self.partitioned_month = None
+        self.task = None
+
+    def ensure_partitions(self):
+        month = month_bounds(datetime.now(timezone.utc))[0]
+        if month != self.partitioned_month:
+            ensure_history_partitions(month)
+            self.partitioned_month = month
+
+    def run_once(self):
+        self.ensure_partitions()
+
+        db = session_local()
+        try:
+            service = AccessesService(db)
+            total = 0
+
+            while True:
+                archived = service.archive_ended(self.retention, self.batch_size)
+                total += archived
+                if archived < self.batch_size:
+                    break
+
+            return total
+        finally:
+            db.close()
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+
+        while True:
+            try:
+                total = await loop.run_in_executor(None, self.run_once)
+                if total:
+                    logger.info("Archived %s ended accesses", total)
+            except Exception:
+                logger.exception("Access archive pass failed")
+
+            await asyncio.sleep(self.interval)
+
+    def start(self):
+        if self.task is None:
+            self.task = asyncio.create_task(self.run())
+
+    async def stop(self):
+        if self.task is not None:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+            self.task = None
+
+
+archive_scheduler = ArchiveScheduler()
@@ -0,0 +1,79 @@
+from datetime import datetime, timezone
+import asyncio
+import logging
+import os
+
+from core.database import session_local
+from service.access_service import AccessesService
+
+
+
+
+ACCESS_EXPIRY_INTERVAL = float(os.getenv("ACCESS_EXPIRY_INTERVAL", "60"))
+ACCESS_EXPIRY_BATCH_SIZE = int(os.getenv("ACCESS_EXPIRY_BATCH_SIZE", "1000"))
+
+logger = logging.getLogger(__name__)
+
+
+class ExpiryScheduler:
+
+    def __init__(self, interval=ACCESS_EXPIRY_INTERVAL, batch_size=ACCESS_EXPIRY_BATCH_SIZE):
+        self.interval = interval
+        self.batch_size = batch_size
+        self.task = None
+
+    def run_once(self):
+        db = session_local()
+        try:
+            service = AccessesService(db)
+            total = 0
+
+            while True:
+                expired = service.expire_due(self.batch_size)
+                total += expired
+                if expired < self.batch_size:
+                    break
+
+            return total, service.next_expiry()
+        finally:
+            db.close()
+
+    def delay_until(self, next_expiry):
+        if next_expiry is None:
+            return self.interval
+        if next_expiry.tzinfo is None:
+            next_expiry = next_expiry.replace(tzinfo=timezone.utc)
+
+        delay = (next_expiry - datetime.now(timezone.utc)).total_seconds()
+        return min(max(delay, 1.0), self.interval)
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+
+        while True:
+            delay = self.interval
+            try:
+                total, next_expiry = await loop.run_in_executor(None, self.run_once)
+                if total:
+                    logger.info("Expired %s accesses", total)
+                delay = self.delay_until(next_expiry)
+            except Exception:
+                logger.exception("Access expiry pass failed")
+
+            await asyncio.sleep(delay)
+
+    def start(self):
+        if self.task is None:
+            self.task = asyncio.create_task(self.run())
+
+    async def stop(self):
+        if self.task is not None:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+            self.task = None
+
+
+expiry_scheduler = ExpiryScheduler()
@@ -0,0 +1,155 @@
+from fastapi import HTTPException
+from sqlalchemy.exc import IntegrityError
+
+from repository.groups_repository import GroupsRepository
+from repository.access_changes_repository import AccessChangesRepository
+from service.users_service import UserService
+from service.resources_service import ResourcesService
+from core.access_index import access_index, as_utc
+from core.change_feed import change_feed
+from models.accesses import AccessState
+from schemas.accesses import AccessChangeOperation
+from datetime import datetime, timezone
+
+
+def group_change(operation, group_id, user_id=None, resource_id=None, status=None, expires_at=None):
+    return {
+        "access_id": None,
+        "group_id": group_id,
+        "user_id": user_id,
+        "resource_id": resource_id,
+        "operation": operation,
+        "status": status,
+        "expires_at": expires_at,
+    }
+
+
+class GroupsService:
+
+    def __init__(self, db):
+        self.db = db
+        self.repo = GroupsRepository(db)
+        self.changes = AccessChangesRepository(db)
+
+    def get_all_groups(self, *, cursor=None, limit=None):
+        return self.repo.get_all(cursor, limit)
+
+    def get_by_id(self, group_id):
+        group = self.repo.get_by_id(group_id)
+        if group is None:
+            raise HTTPException(status_code=404, detail="Группа с указанным ID не найдена")
+        return group
+
+    def create_group(self, group_data):
+        if self.repo.is_duplicate_name(group_data.name):
+            raise HTTPException(status_code=409, detail="Группа с указанным названием уже существует")
+
+        try:
+            group = self.repo.create_group(group_data)
+            self.db.commit()
+        except IntegrityError:
+            self.db.rollback()
+            raise HTTPException(status_code=409, detail="Группа с указанным названием уже существует")
+
+        self.db.refresh(group)
+        return group
+
+    def delete_group(self, group_id):
+        group = self.get_by_id(group_id)
+
+        self.repo.delete(group)
+        self.changes.record([group_change(AccessChangeOperation.DELETE, group.id)])
+        self.db.commit()
+        access_index.drop_group(group.id)
+        change_feed.notify()
+
+        return group
+
+    def get_members(self, group_id, *, cursor=None, limit=None):
+        self.get_by_id(group_id)
+        return self.repo.get_members(group_id, cursor, limit)
+
+    def add_member(self, group_id, user_id):
+        self.get_by_id(group_id)
+        UserService(self.db).get_user(user_id)
+
+        member = self.repo.get_member(group_id, user_id)
+        if member is None:
+            try:
+                member = self.repo.add_member(group_id, user_id)
+                self.changes.record([
+                    group_change(AccessChangeOperation.GRANT, group_id, user_id=user_id, status=AccessState.ACTIVE)
+                ])
+                self.db.commit()
+                change_feed.notify()
+            except IntegrityError:
+                self.db.rollback()
+                member = self.repo.get_member(group_id, user_id)
+
+        access_index.add_member(group_id, user_id)
+        return member
+
+    def remove_member(self, group_id, user_id):
+        member = self.repo.get_member(group_id, user_id)
+        if member is None:
+            raise HTTPException(status_code=404, detail="Пользователь не состоит в указанной группе")
+
+        self.repo.remove(member)
+        self.changes.record([
+            group_change(AccessChangeOperation.REVOKE, group_id, user_id=user_id, status=AccessState.REVOKED)
+        ])
+        self.db.commit()
+        access_index.remove_member(group_id, user_id)
+        change_feed.notify()
+
+        return member
+
+    def get_grants(self, group_id):
+        self.get_by_id(group_id)
+        return self.repo.get_grants(group_id)
+
+    def put_grant(self, group_id, grant_data):
+        self.get_by_id(group_id)
+        ResourcesService(self.db).check_resource_for_access(grant_data.resource_id)
+
+        expires_at = as_utc(grant_data.expires_at)
+        if expires_at is not None and expires_at <= datetime.now(timezone.utc):
+            raise HTTPException(status_code=400,
+                                detail="Дата окончания не может быть раньше или равна дате выдачи доступа")
+
+        grant = self.repo.get_grant(group_id, grant_data.resource_id)
+        operation = AccessChangeOperation.GRANT if grant is None else AccessChangeOperation.UPDATE
+
+        try:
+            if grant is None:
+                grant = self.repo.add_grant(group_id, grant_data.resource_id, expires_at)
+            else:
+                grant.expires_at = expires_at
+            self.changes.record([
+                group_change(operation, group_id, resource_id=grant_data.resource_id, status=AccessState.ACTIVE,
+                             expires_at=expires_at)
+            ])
+            self.db.commit()
+        except IntegrityError:
+            self.db.rollback()
+            raise HTTPException(status_code=409, detail="Доступ группы к ресурсу изменен параллельно, повторите запрос")
+
+        self.db.refresh(grant)
+        access_index.put_group_grant(group_id, grant.resource_id, grant.expires_at)
+        change_feed.notify()
+        return grant
+
+    def revoke_grant(self, group_id, resource_id):
+        grant = self.repo.get_grant(group_id, resource_id)
+        if grant is None:
+            raise HTTPException(status_code=404, detail="Доступ группы к ресурсу не найден")
+
+        self.repo.remove(grant)
+        self.changes.record([
+            group_change(AccessChangeOperation.REVOKE, group_id, resource_id=resource_id, status=AccessState.REVOKED)
+        ])
+        self.db.commit()
+        access_index.discard_group_grant(group_id, resource_id)
+        change_feed.notify()
+
+        return grant
@@ -0,0 +1,106 @@
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from threading import Lock
+import asyncio
+import logging
+import os
+import uuid
+
+from core.database import session_local
+from models.jobs import JobState
+from service.jobs_service import JobsService
+
+
+
+
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+JOB_POLL_INTERVAL = float(os.getenv("JOB_POLL_INTERVAL", "30"))
+JOB_STALE_AFTER = float(os.getenv("JOB_STALE_AFTER", "120"))
+
+logger = logging.getLogger(__name__)
+
+
+class JobRunner:
+
+    def __init__(self, workers=JOB_WORKERS, interval=JOB_POLL_INTERVAL, stale_after=JOB_STALE_AFTER):
+        self.workers = workers
+        self.interval = interval
+        self.stale_after = timedelta(seconds=stale_after)
+        self.owner = uuid.uuid4().hex
+        self.executor = None
+        self.active = set()
+        self.stopping = False
+        self.lock = Lock()
+        self.task = None
+
+    def stale_before(self):
+        return datetime.now(timezone.utc) - self.stale_after
+
+    def submit(self, job_id):
+        with self.lock:
+            if self.executor is None or self.stopping or job_id in self.active:
+                return
+            self.active.add(job_id)
+            self.executor.submit(self.run_job, job_id)
+
+    def run_job(self, job_id):
+        db = session_local()
+        service = JobsService(db)
+        try:
+            job = service.claim(job_id, self.owner, self.stale_before())
+            while job is not None and job.status == JobState.RUNNING:
+                if self.stopping:
+                    service.release(job_id, self.owner)
+                    break
+                job = service.advance(job, self.owner)
+        except Exception as error:
+            logger.exception("Job %s failed", job_id)
+            service.fail(job_id, self.owner, error)
+        finally:
+            db.close()
+            with self.lock:
+                self.active.discard(job_id)
+
+    def pending(self):
+        db = session_local()
+        try:
+            return JobsService(db).pending(self.stale_before())
+        finally:
+            db.close()
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+
+        while True:
+            try:
+                for job_id in await loop.run_in_executor(None, self.pending):
+                    self.submit(job_id)
+            except Exception:
+                logger.exception("Job poll failed")
+
+            await asyncio.sleep(self.interval)
+
+    def start(self):
+        if self.task is None:
+            self.stopping = False
+            self.active = set()
+            self.executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="job")
+            self.task = asyncio.create_task(self.run())
+
+    async def stop(self):
+        if self.task is not None:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+            self.task = None
+
+        if self.executor is not None:
+            self.stopping = True
+            executor = self.executor
+            await asyncio.get_running_loop().run_in_executor(None, lambda: executor.shutdown(cancel_futures=True))
+            self.executor = None
+
+
+job_runner = JobRunner()
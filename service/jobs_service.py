@@ -0,0 +1,118 @@
+from fastapi import HTTPException
+
+from datetime import datetime, timedelta, timezone
+import os
+import uuid
+
+from repository.jobs_repository import JobsRepository
+from repository.accesses_repository import AccessesRepository
+from service.access_service import AccessesService
+from service.archive_scheduler import ACCESS_ARCHIVE_AFTER
+from models.jobs import JobKind, JobState
+
+
+
+
+JOB_CHUNK_SIZE = int(os.getenv("JOB_CHUNK_SIZE", "1000"))
+
+
+class JobsService:
+
+    def __init__(self, database, chunk_size=JOB_CHUNK_SIZE):
+        self.db = database
+        self.repo = JobsRepository(database)
+        self.accesses = AccessesService(database)
+        self.access_repo = AccessesRepository(database)
+        self.chunk_size = chunk_size
+
+    def get_all(self, *, status=None, kind=None, cursor=None, limit=None):
+        return self.repo.get_all(status, kind, cursor, limit)
+
+    def get_by_id(self, job_id):
+        job = self.repo.get_by_id(job_id)
+        if job is None:
+            raise HTTPException(status_code=404, detail="Задача с указанным ID не найдена")
+        return job
+
+    def submit(self, create_data):
+        job = self.repo.create_job(create_data.kind, create_data.params())
+        self.db.commit()
+        return job
+
+    def cancel(self, job_id):
+        job = self.repo.cancel(job_id, datetime.now(timezone.utc))
+        if job is None:
+            self.get_by_id(job_id)
+            raise HTTPException(status_code=409, detail="Задача уже завершена")
+
+        self.db.commit()
+        return job
+
+    def pending(self, stale_before):
+        return self.repo.pending(stale_before)
+
+    def retention(self, job):
+        return timedelta(seconds=job.params.get("archive_after", ACCESS_ARCHIVE_AFTER))
+
+    @staticmethod
+    def held(job):
+        return tuple(uuid.UUID(job.params[key]) if job.params.get(key) else None for key in ("user_id", "resource_id"))
+
+    def remaining(self, job, now):
+        if job.kind == JobKind.EXPIRE_DUE:
+            criteria = self.access_repo.due(now)
+        elif job.kind == JobKind.ARCHIVE_ENDED:
+            criteria = self.access_repo.ended(now - self.retention(job))
+        elif job.kind == JobKind.REVOKE:
+            criteria = self.access_repo.held_active(*self.held(job))
+        else:
+            criteria = self.access_repo.invalid()
+        return self.access_repo.count(criteria)
+
+    def step(self, job):
+        if job.kind == JobKind.EXPIRE_DUE:
+            rows = self.accesses.expire_chunk(self.chunk_size)
+        elif job.kind == JobKind.ARCHIVE_ENDED:
+            return self.accesses.archive_ended_chunk(self.retention(job), self.chunk_size), []
+        elif job.kind == JobKind.REVOKE:
+            rows = self.accesses.revoke_chunk(*self.held(job), self.chunk_size)
+        else:
+            rows = self.accesses.revoke_invalid_chunk(self.chunk_size)
+        return len(rows), rows
+
+    def claim(self, job_id, owner, stale_before):
+        now = datetime.now(timezone.utc)
+        job = self.repo.claim(job_id, owner, now, stale_before)
+
+        if job is not None and job.started_at is None:
+            job = self.repo.update_owned(job.id, owner, {"started_at": now, "total": self.remaining(job, now)})
+
+        self.db.commit()
+        return job
+
+    def advance(self, job, owner):
+        processed, rows = self.step(job)
+        now = datetime.now(timezone.utc)
+
+        values = {"processed": job.processed + processed, "chunks": job.chunks + 1, "heartbeat_at": now}
+        if processed < self.chunk_size:
+            values.update(status=JobState.SUCCEEDED, owner=None, finished_at=now)
+
+        job = self.repo.update_owned(job.id, owner, values)
+        if job is None:
+            self.db.rollback()
+            return None
+
+        self.db.commit()
+        self.accesses.released(rows)
+        return job
+
+    def release(self, job_id, owner):
+        self.repo.update_owned(job_id, owner, {"status": JobState.QUEUED, "owner": None})
+        self.db.commit()
+
+    def fail(self, job_id, owner, error):
+        self.db.rollback()
+        self.repo.update_owned(job_id, owner, {"status": JobState.FAILED, "owner": None, "error": str(error),
+                                               "finished_at": datetime.now(timezone.utc)})
+        self.db.commit()
@@ -1,6 +1,12 @@
 from fastapi import HTTPException
 
+from service.access_service import AccessesService
 from repository.resources_repository import ResourcesRepository
+from core.access_index import access_index
+from core.search import resources_search
+from core.cache import resources_cache
+from core.http_cache import table_versions
+from schemas.resources import ResponsesResources
 
 
 
@@ -10,16 +16,31 @@ class ResourcesService:
         self.db = db
         self.repo = ResourcesRepository(db)
 
-    def get_by_id(self, resource_id):
+    def get_cached(self, resource_id):
+        return resources_cache.get_or_load(resource_id, lambda: self.load_snapshot(resource_id))
+
+    def load_snapshot(self, resource_id):
         resource = self.repo.get_by_id(resource_id)
+        return None if resource is None else ResponsesResources.model_validate(resource)
+
+    def get_by_id(self, resource_id):
+        resource = self.get_cached(resource_id)
 
         if resource is None:
             raise HTTPException(status_code=404, detail=f"Ресурс с указанным ID не найден")
 
         return resource
 
-    def get_all_resource(self, *, name = None, is_enabled = None):
-        return self.repo.get_all(name, is_enabled)
+    def get_all_resource(self, *, name = None, is_enabled = None, cursor = None, limit = None):
+        return self.repo.get_all(name, is_enabled, cursor, limit)
+
+    def search_resources(self, *, name, is_enabled = None, prefix = False, cursor = None, limit = None):
+        if cursor is not None:
+            raise HTTPException(status_code=400, detail="Параметр cursor нельзя использовать вместе с name")
+        return self.repo.search(name, is_enabled, prefix, limit)
+
+    def stream_resources(self, *, name = None, is_enabled = None, cursor = None):
+        return self.repo.stream(name, is_enabled, cursor)
 
     def create_resource(self, create_data):
         resource = self.repo.is_duplicate_name(create_data.name)
@@ -27,42 +48,63 @@ class ResourcesService:
             raise HTTPException(status_code=409, detail="Ресурс с указанным названием уже существует")
 
         resource = self.repo.create_resource(create_data)
+        if resource is None:
+            self.db.rollback()
+            raise HTTPException(status_code=409, detail="Ресурс с указанным названием уже существует")
+
         self.db.commit()
-        self.db.refresh(resource)
+        access_index.set_resource_enabled(resource.id, resource.is_enabled)
+        resources_search.add(resource.id, resource.name)
+        table_versions.bump("resources")
+        resources_cache.invalidate(resource.id)
         return resource
 
     def update_resource(self, *, resource_id, update_data):
 
-        resource = self.repo.get_by_id(resource_id)
+        values = {}
+        if update_data.description is not None:
+            values["description"] = update_data.description
+        if update_data.is_enabled is not None:
+            values["is_enabled"] = update_data.is_enabled
+
+        resource = self.repo.update_resource(resource_id, values) if values else self.repo.get_by_id(resource_id)
         if not resource:
             raise HTTPException(status_code=404, detail=f"Ресурс с указанным ID {resource_id} не найден")
 
-        if update_data.description is not None:
-            resource.description = update_data.description
-        if update_data.is_enabled is not None:
-            resource.is_enabled = update_data.is_enabled
+        accesses = AccessesService(self.db)
+        revoked = [] if resource.is_enabled else accesses.revoke_chunk(resource_id=resource.id)
 
         self.db.commit()
-        self.db.refresh(resource)
+        access_index.set_resource_enabled(resource.id, resource.is_enabled)
+        table_versions.bump("resources")
+        resources_cache.invalidate(resource.id)
+        accesses.cascade_revoke(revoked, resource_id=resource.id)
         return resource
 
     def check_resource_for_access(self, resource_id):
-        resource = self.repo.get_by_id(resource_id)
+        resource = self.get_cached(resource_id)
 
         if resource is None:
             raise HTTPException(status_code=404, detail="Ресурс с указанным ID не найден")
-        if resource == "not enabled":
+        if not resource.is_enabled:
             raise HTTPException(status_code=422, detail="Ресурс с указанным ID неактивен")
 
         return resource
 
     def delete_resource(self, resource_id):
-        resource = self.repo.get_by_id(resource_id)
+        accesses = AccessesService(self.db)
+        archived = accesses.archive_held(resource_id=resource_id)
+        resource = self.repo.delete(resource_id)
 
         if resource is None:
+            self.db.rollback()
             raise HTTPException(status_code=404, detail="Ресурс с указанным ID не найден")
 
-        self.repo.delete(resource)
         self.db.commit()
+        accesses.released(archived)
+        access_index.set_resource_enabled(resource.id, False)
+        resources_search.discard(resource.id)
+        table_versions.bump("resources")
+        resources_cache.invalidate(resource.id)
 
         return resource
\ No newline at end of file
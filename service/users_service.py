@@ -1,6 +1,14 @@
 from fastapi import HTTPException
 
+import hashlib
+
+from service.access_service import AccessesService
 from repository.users_repository import UsersRepository
+from core.access_index import access_index
+from core.search import users_search
+from core.cache import users_cache
+from core.http_cache import table_versions
+from schemas.users import ResponsesUsers
 
 
 class UserService:
@@ -10,60 +18,108 @@ class UserService:
         self.repo = UsersRepository(database)
 
     def create_user(self, user_data):
+        email_taken, name_taken = self.repo.taken(user_data.email.strip(), user_data.full_name.strip())
 
-        if self.repo.get_by_email(user_data.email):
+        if email_taken:
             raise HTTPException(status_code=409, detail='Пользователь с указанным значением email уже существует')
 
-        if self.repo.get_by_name(user_data.full_name):
+        if name_taken:
             raise HTTPException(status_code=409, detail='Пользователь с указанным значением full_name уже существует')
 
         user = self.repo.create_user(user_data)
+        if user is None:
+            self.db.rollback()
+            raise HTTPException(status_code=409, detail='Пользователь с указанным значением email уже существует')
 
         self.db.commit()
-        self.db.refresh(user)
+        access_index.set_user_active(user.id, user.is_active)
+        users_search.add(user.id, user.full_name, user.email)
+        table_versions.bump("users")
+        users_cache.invalidate(user.id)
         return user
 
     def update_user(self, *, user_id, update_data):
 
-        user = self.repo.get_by_id(user_id)
+        if update_data.is_active is None:
+            raise HTTPException(status_code=400, detail='Параметр is_active должен хранить булевое значение')
+
+        user = self.repo.update_user(user_id, {"is_active": update_data.is_active})
         if user is None:
             raise HTTPException(status_code=404, detail=f"Пользователь с указанным ID не найден")
 
-        if update_data.is_active is None:
-            raise HTTPException(status_code=400, detail='Параметр is_active должен хранить булевое значение')
-        user.is_active = update_data.is_active
+        accesses = AccessesService(self.db)
+        revoked = [] if user.is_active else accesses.revoke_chunk(user_id=user.id)
 
         self.db.commit()
-        self.db.refresh(user)
+        access_index.set_user_active(user.id, user.is_active)
+        table_versions.bump("users")
+        users_cache.invalidate(user.id)
+        accesses.cascade_revoke(revoked, user_id=user.id)
         return user
 
-    def get_user(self, user_id):
+    def get_cached(self, user_id):
+        return users_cache.get_or_load(user_id, lambda: self.load_snapshot(user_id))
+
+    def load_snapshot(self, user_id):
         user = self.repo.get_by_id(user_id)
+        return None if user is None else ResponsesUsers.model_validate(user)
+
+    def get_user(self, user_id):
+        user = self.get_cached(user_id)
         if user is None:
             raise HTTPException(status_code=404, detail=f"Пользователь с указанным ID не найден")
         return user
 
-    def get_all_users(self, *, search, is_active):
-        return self.repo.get_all(search, is_active)
+    def get_effective_access(self, user_id):
+        self.get_user(user_id)
+
+        if access_index.ensure_loaded():
+            grants = access_index.effective(user_id)
+        else:
+            grants = AccessesService(self.db).effective_grants(user_id)
+        digest = hashlib.sha1()
+        for resource_id, expires_at in grants:
+            digest.update(f"{resource_id}:{expires_at.isoformat() if expires_at else ''};".encode())
+
+        return [{"resource_id": resource_id, "expires_at": expires_at} for resource_id, expires_at in grants], \
+            f'"{digest.hexdigest()}"'
+
+    def get_all_users(self, *, search, is_active, cursor=None, limit=None):
+        return self.repo.get_all(search, is_active, cursor, limit)
+
+    def search_users(self, *, search, is_active, prefix=False, cursor=None, limit=None):
+        if cursor is not None:
+            raise HTTPException(status_code=400, detail="Параметр cursor нельзя использовать вместе с search")
+        return self.repo.search(search, is_active, prefix, limit)
+
+    def stream_users(self, *, search, is_active, cursor=None):
+        return self.repo.stream(search, is_active, cursor)
 
     def check_user_for_access(self, user_id):
-        user = self.repo.get_by_id(user_id)
+        user = self.get_cached(user_id)
 
         if user is None:
             raise HTTPException(status_code=404, detail=f"Пользователь с указанным ID не найден")
-        if user == "not active":
+        if not user.is_active:
             raise HTTPException(status_code=422, detail=f"Пользователь с указанным ID неактивен")
 
-        return "not active"
+        return user
 
     def delete_user(self, user_id):
-        user = self.repo.get_by_id(user_id)
+        accesses = AccessesService(self.db)
+        archived = accesses.archive_held(user_id=user_id)
+        user = self.repo.delete(user_id)
 
         if user is None:
+            self.db.rollback()
             raise HTTPException(status_code=404, detail="Пользователь с указанным ID не найден")
 
-        self.repo.delete(user)
         self.db.commit()
+        accesses.released(archived)
+        access_index.set_user_active(user.id, False)
+        users_search.discard(user.id)
+        table_versions.bump("users")
+        users_cache.invalidate(user.id)
 
         return user
 
@@ -0,0 +1,11 @@
+import os
+import tempfile
+
+
+
+
+TEST_DATABASE_DIR = tempfile.mkdtemp(prefix="acm-tests-")
+
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(TEST_DATABASE_DIR, 'acm.db')}"
+os.environ["DATABASE_REPLICA_URLS"] = ""
+os.environ["CACHE_BACKEND"] = "local"
@@ -0,0 +1,23 @@
+import pytest
+from sqlalchemy import create_engine
+
+from core.migrations import migrate, hot_queries, explain, sequential_scans
+from models.accesses import AccessModel
+
+
+
+
+@pytest.fixture(scope="module")
+def plan_engine(tmp_path_factory):
+    engine = create_engine(f"sqlite:///{tmp_path_factory.mktemp('plans') / 'plans.db'}")
+    migrate(bind=engine)
+    yield engine
+    engine.dispose()
+
+
+@pytest.mark.parametrize("name", list(hot_queries()))
+def test_hot_query_avoids_sequential_scan(plan_engine, name):
+    with plan_engine.connect() as connection:
+        plan = explain(connection, hot_queries()[name])
+
+    assert sequential_scans(plan, AccessModel.__tablename__) == [], plan
@@ -0,0 +1,85 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.app import app
+from core.database import get_db
+from core.migrations import migrate
+from schemas.accesses import AccessStatus
+
+
+
+
+QUERY_COUNTS = {
+    "POST /v1/users": 2,
+    "PATCH /v1/users/{id}": 1,
+    "POST /v1/resources": 2,
+    "PATCH /v1/resources/{id}": 1,
+    "POST /v1/accesses": 3,
+    "POST /v1/accesses (duplicate)": 1,
+    "PATCH /v1/accesses/{id}": 2,
+    "DELETE /v1/accesses/{id}": 2,
+    "DELETE /v1/resources/{id}": 2,
+    "PATCH /v1/users/{id} (deactivate)": 2,
+    "DELETE /v1/users/{id}": 2,
+}
+
+
+@pytest.fixture(scope="module")
+def client(tmp_path_factory):
+    engine = create_engine(f"sqlite:///{tmp_path_factory.mktemp('budget') / 'budget.db'}")
+    migrate(bind=engine)
+    sessions = sessionmaker(autoflush=False, autocommit=False, bind=engine)
+
+    def get_budget_db():
+        db = sessions()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app.dependency_overrides[get_db] = get_budget_db
+    yield TestClient(app)
+    app.dependency_overrides.pop(get_db, None)
+    engine.dispose()
+
+
+@pytest.fixture(scope="module")
+def responses(client):
+    expires_at = (datetime.now(timezone.utc) + timedelta(days=30)).isoformat()
+    measured = {}
+
+    def call(name, method, path, payload=None):
+        response = client.request(method, path, json=payload)
+        measured[name] = response
+        return response.json()
+
+    user = call("POST /v1/users", "POST", "/v1/users",
+                {"email": "budget@example.com", "full_name": "Budget User"})
+    call("PATCH /v1/users/{id}", "PATCH", f"/v1/users/{user['id']}", {"is_active": True})
+    resource = call("POST /v1/resources", "POST", "/v1/resources",
+                    {"name": "budget", "description": "query budget"})
+    call("PATCH /v1/resources/{id}", "PATCH", f"/v1/resources/{resource['id']}",
+         {"description": "query budget, updated"})
+
+    grant = {"user_id": user["id"], "resource_id": resource["id"], "expires_at": expires_at}
+    access = call("POST /v1/accesses", "POST", "/v1/accesses", grant)
+    call("POST /v1/accesses (duplicate)", "POST", "/v1/accesses", grant)
+    call("PATCH /v1/accesses/{id}", "PATCH", f"/v1/accesses/{access['id']}", {"status": AccessStatus.REVOKED.value})
+    call("DELETE /v1/accesses/{id}", "DELETE", f"/v1/accesses/{access['id']}")
+    call("DELETE /v1/resources/{id}", "DELETE", f"/v1/resources/{resource['id']}")
+    call("PATCH /v1/users/{id} (deactivate)", "PATCH", f"/v1/users/{user['id']}", {"is_active": False})
+    call("DELETE /v1/users/{id}", "DELETE", f"/v1/users/{user['id']}")
+
+    return measured
+
+
+@pytest.mark.parametrize("name", list(QUERY_COUNTS))
+def test_mutation_query_count(responses, name):
+    response = responses[name]
+
+    assert response.status_code == (400 if name.endswith("(duplicate)") else 200), response.text
+    assert int(response.headers["x-query-count"]) == QUERY_COUNTS[name]